@@ -0,0 +1,141 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+from DataManagement.data_reader import read_data_file, read_data_header, file_identity
+from DataManagement.minmax_pyramid import build_pyramid
+from DataManagement.column_index import monotonic_direction, INCREASING
+from localvars import CACHE_DIR, PYRAMID_MIN_POINTS
+from logger import get_logger
+from tracing import span
+
+logger = get_logger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+CACHE_VERSION = 1
+
+# Valid manifests already loaded in this process, keyed by file identity
+_manifests = {}
+_lock = threading.Lock()
+
+def cache_dir_for(filepath):
+    """Sidecar directory holding the binary cache of filepath (one .npy per column plus a manifest)."""
+    path = os.path.abspath(filepath)
+    digest = hashlib.sha1(path.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"{digest}_{os.path.basename(path)}")
+
+def load_manifest(filepath):
+    """Manifest of a valid (up to date) cache for filepath, or None."""
+    identity = file_identity(filepath)
+    with _lock:
+        manifest = _manifests.get(identity)
+    if manifest is not None:
+        return manifest
+    manifest_path = os.path.join(cache_dir_for(filepath), MANIFEST_NAME)
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != CACHE_VERSION or tuple(manifest.get('identity', ())) != identity:
+        logger.debug('Stale binary cache for %s', filepath)
+        return None
+    with _lock:
+        _manifests[identity] = manifest
+    return manifest
+
+def write_cache(filepath, df, comments, meta, filetype):
+    """
+    Write df as one .npy per column next to a manifest, plus a min/max pyramid for long numeric columns.
+    Returns the manifest.
+    """
+    identity = file_identity(filepath)
+    cache_dir = cache_dir_for(filepath)
+    os.makedirs(cache_dir, exist_ok=True)
+    columns = []
+    with span('cache_write', file=filepath):
+        for i, name in enumerate(df.columns):
+            values = df[name].to_numpy()
+            entry = {'name': str(name), 'file': f"{i}.npy", 'dtype': str(values.dtype), 'length': len(values)}
+            if values.dtype == object:
+                np.save(os.path.join(cache_dir, entry['file']), values, allow_pickle=True)
+            else:
+                np.save(os.path.join(cache_dir, entry['file']), values)
+                if np.issubdtype(values.dtype, np.number):
+                    # Recorded for the column index (range limits by binary search), so readers never rescan
+                    entry['sorted'] = monotonic_direction(values)
+                if len(values) >= PYRAMID_MIN_POINTS and np.issubdtype(values.dtype, np.number):
+                    pyramid = build_pyramid(values)
+                    np.save(os.path.join(cache_dir, f"{i}.pyr.npy"), pyramid['data'])
+                    entry['pyramid'] = {'file': f"{i}.pyr.npy", 'base': pyramid['base'], 'factor': pyramid['factor'], 'levels': pyramid['levels']}
+                    entry['monotonic'] = entry['sorted'] == INCREASING
+            columns.append(entry)
+        manifest = {
+            'version': CACHE_VERSION,
+            'identity': list(identity),
+            'filetype': filetype,
+            'comments': comments,
+            'meta': meta,
+            'columns': columns,
+        }
+        # Write the manifest last (atomically) so a partial cache is never considered valid
+        manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+        with open(manifest_path + '.tmp', 'w') as f:
+            json.dump(manifest, f, default=str)
+        os.replace(manifest_path + '.tmp', manifest_path)
+    with _lock:
+        _manifests[identity] = manifest
+    logger.info('Wrote binary cache for %s (%d columns)', filepath, len(columns))
+    return manifest
+
+def ensure_cache(filepath, filetype=None):
+    """Manifest of the binary cache of filepath, parsing the text file and building the cache if needed."""
+    manifest = load_manifest(filepath)
+    if manifest is None:
+        df, comments, meta, filetype = read_data_file(filepath, filetype=filetype)
+        manifest = write_cache(filepath, df, comments, meta, filetype)
+    return manifest
+
+def read_header(filepath, filetype=None):
+    """Like read_data_header, but answered from the cache manifest (no file access beyond a stat) when the cache is valid."""
+    manifest = load_manifest(filepath)
+    if manifest is None:
+        return read_data_header(filepath, filetype)
+    return [entry['name'] for entry in manifest['columns']], manifest['comments'], manifest['meta'], manifest['filetype']
+
+def column_directions(manifest):
+    """{column: monotonic direction} recorded in a manifest (columns cached before it was recorded are left out)."""
+    return {entry['name']: entry['sorted'] for entry in manifest['columns'] if 'sorted' in entry}
+
+def column_entry(manifest, name):
+    for entry in manifest['columns']:
+        if entry['name'] == name:
+            return entry
+    return None
+
+def column_array(filepath, manifest, name):
+    """Memory-mapped values of a cached column (None if the column is not cached)."""
+    entry = column_entry(manifest, name)
+    if entry is None:
+        return None
+    path = os.path.join(cache_dir_for(filepath), entry['file'])
+    if entry['dtype'] == 'object':
+        return np.load(path, allow_pickle=True)
+    return np.load(path, mmap_mode='r')
+
+def read_cached(filepath, filetype=None, usecols=None):
+    """
+    Like read_data_file, but served from the binary cache (building it on first use).
+    Columns are memory-mapped, so only the pages actually touched are read from disk.
+    Returns: (df, comments, metadata/header_cols, filetype)
+    """
+    manifest = ensure_cache(filepath, filetype)
+    names = [entry['name'] for entry in manifest['columns']]
+    if usecols is not None:
+        wanted = set(usecols)
+        names = [name for name in names if name in wanted] or names
+    with span('cache_read', file=filepath):
+        df = pd.DataFrame({name: column_array(filepath, manifest, name) for name in names}, copy=False)
+    return df, manifest['comments'], manifest['meta'], manifest['filetype']
@@ -0,0 +1,123 @@
+"""
+Binary data files: same columns, comments and metadata as the two-space text format, without text parsing.
+
+Formats (selected with OUTPUT_FORMAT in localvars, per module, or by file extension):
+- 'npz':     numpy only (always available); one array per column plus a JSON header
+- 'feather': Arrow IPC file, requires pyarrow; header stored in the schema metadata
+- 'hdf5':    requires h5py; one dataset per column, header stored as an attribute
+Reading returns exactly what read_data_file returns for the equivalent text file.
+"""
+import json
+import os
+import numpy as np
+import pandas as pd
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+BINARY_FORMATS = {'npz': '.npz', 'feather': '.feather', 'hdf5': '.h5'}
+BINARY_EXTENSIONS = {ext: fmt for fmt, ext in BINARY_FORMATS.items()}
+BINARY_EXTENSIONS['.hdf5'] = 'hdf5'
+HEADER_KEY = 'data_analysis_header'
+
+def binary_format_of(filepath):
+    """Binary format name for a path based on its extension, or None for text files."""
+    return BINARY_EXTENSIONS.get(os.path.splitext(filepath)[1].lower())
+
+def _require(module, fmt):
+    try:
+        return __import__(module, fromlist=['_'])
+    except ImportError:
+        raise ImportError(f"The '{fmt}' format requires {module.split('.')[0]} (pip install {module.split('.')[0]}); 'npz' needs only numpy")
+
+def _header(df, comments, metadata):
+    return json.dumps({'columns': [str(c) for c in df.columns], 'comments': comments or [], 'metadata': metadata}, default=str)
+
+def _column_values(series):
+    values = series.to_numpy()
+    if values.dtype == object:
+        values = values.astype(str) # Fixed-width unicode, so nothing needs pickling
+    return values
+
+def write_binary_file(df, filepath, comments=None, metadata=None, fmt='npz'):
+    """Write df with its comments/metadata in a binary format."""
+    header = _header(df, comments, metadata)
+    if fmt == 'npz':
+        arrays = {f"c{i}": _column_values(df[name]) for i, name in enumerate(df.columns)}
+        with open(filepath, 'wb') as f: # A file object keeps numpy from appending .npz to the name
+            np.savez(f, **{HEADER_KEY: np.array(header)}, **arrays)
+    elif fmt == 'feather':
+        pa = _require('pyarrow', fmt)
+        feather = _require('pyarrow.feather', fmt)
+        table = pa.table({f"c{i}": _column_values(df[name]) for i, name in enumerate(df.columns)})
+        table = table.replace_schema_metadata({HEADER_KEY: header})
+        feather.write_feather(table, filepath)
+    elif fmt == 'hdf5':
+        h5py = _require('h5py', fmt)
+        with h5py.File(filepath, 'w') as f:
+            f.attrs[HEADER_KEY] = header
+            for i, name in enumerate(df.columns):
+                values = _column_values(df[name])
+                f.create_dataset(f"c{i}", data=values.astype('S') if values.dtype.kind == 'U' else values)
+    else:
+        raise ValueError(f"Unknown binary format: {fmt}")
+
+def _read_header(filepath, fmt):
+    if fmt == 'npz':
+        with np.load(filepath) as f:
+            return json.loads(str(f[HEADER_KEY]))
+    if fmt == 'feather':
+        pa = _require('pyarrow', fmt)
+        with pa.memory_map(filepath) as source:
+            schema = pa.ipc.open_file(source).schema
+        return json.loads(schema.metadata[HEADER_KEY.encode()].decode())
+    if fmt == 'hdf5':
+        h5py = _require('h5py', fmt)
+        with h5py.File(filepath, 'r') as f:
+            return json.loads(f.attrs[HEADER_KEY])
+    raise ValueError(f"Unknown binary format: {fmt}")
+
+def _as_text_read(header):
+    """
+    (comments, metadata/header_cols, filetype) as read_data_file would return them for the text version:
+    files written with LabGUI metadata read back as 'raw', others as 'processed' (comment lines keep their '#',
+    and the last one is the column header line).
+    """
+    metadata = header['metadata']
+    if isinstance(metadata, dict) and any(k in metadata for k in ('channels', 'instruments', 'units')):
+        comments = [c[1:].strip() if c.startswith('#') else c for c in header['comments']]
+        return comments, metadata, 'raw'
+    comments = [c if c.startswith('#') else f"# {c}" for c in header['comments']]
+    comments.append('#' + '  '.join(f"'{col}'" for col in header['columns']))
+    return comments, list(header['columns']), 'processed'
+
+def read_binary_header(filepath):
+    """Returns: (columns, comments, metadata/header_cols, filetype), like read_data_header."""
+    header = _read_header(filepath, binary_format_of(filepath))
+    return (list(header['columns']),) + _as_text_read(header)
+
+def read_binary_file(filepath, usecols=None):
+    """
+    usecols: optional iterable of column names; only these columns are loaded
+    Returns: (df, comments, metadata/header_cols, filetype), like read_data_file
+    """
+    fmt = binary_format_of(filepath)
+    header = _read_header(filepath, fmt)
+    names = header['columns']
+    wanted = [i for i, name in enumerate(names) if usecols is None or name in set(usecols)] or range(len(names))
+    if fmt == 'npz':
+        with np.load(filepath) as f:
+            columns = {names[i]: f[f"c{i}"] for i in wanted}
+    elif fmt == 'feather':
+        feather = _require('pyarrow.feather', fmt)
+        table = feather.read_table(filepath, columns=[f"c{i}" for i in wanted], memory_map=True)
+        columns = {names[i]: table.column(f"c{i}").to_numpy() for i in wanted}
+    else:
+        h5py = _require('h5py', fmt)
+        with h5py.File(filepath, 'r') as f:
+            columns = {}
+            for i in wanted:
+                values = f[f"c{i}"][()]
+                columns[names[i]] = values.astype(str) if values.dtype.kind == 'S' else values
+    df = pd.DataFrame(columns, copy=False)
+    return (df,) + _as_text_read(header)
@@ -0,0 +1,145 @@
+"""
+Per-file column order index, so range limits (minx/maxx) select rows without scanning the column.
+
+- Monotonic columns (non-decreasing or non-increasing, no NaN) are detected once per file and column; the binary
+  cache records the direction of every numeric column in its manifest, so cached files never rescan.
+  A range on a monotonic column is a slice found by binary search: a view, no mask allocated.
+- Other columns can get a cached stable sort permutation (COLUMN_SORT_INDEX in localvars). A narrow range then
+  costs two binary searches plus sorting the selected row numbers, instead of a full-column comparison.
+- Columns swept up and down repeatedly are split into monotonic segments once (see sweeps.py), so a sweep or
+  branch is a slice of the rows.
+"""
+import threading
+import numpy as np
+from DataManagement.sweeps import find_segments
+from localvars import COLUMN_SORT_INDEX, COLUMN_SORT_MAX_FRACTION, PYRAMID_CHUNK
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+INCREASING, DECREASING = 'increasing', 'decreasing'
+
+def monotonic_direction(values, chunk=PYRAMID_CHUNK):
+    """INCREASING (non-decreasing), DECREASING (non-increasing) or None, checked chunk by chunk. NaN means None."""
+    values = np.asarray(values)
+    if values.dtype.kind not in 'iuf' or len(values) == 0:
+        return None
+    up = down = True
+    previous = None
+    for start in range(0, len(values), chunk):
+        block = values[start:start + chunk]
+        if block.dtype.kind == 'f' and np.isnan(block).any():
+            return None
+        if previous is not None:
+            up &= bool(block[0] >= previous)
+            down &= bool(block[0] <= previous)
+        steps = np.diff(block)
+        up = up and not (steps < 0).any()
+        down = down and not (steps > 0).any()
+        if not (up or down):
+            return None
+        previous = block[-1]
+    return INCREASING if up else DECREASING
+
+def _first(n, predicate):
+    """First position in range(n) where predicate holds, for a predicate that is False then True."""
+    lo, hi = 0, n
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if predicate(mid):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+def range_slice(values, direction, low=None, high=None):
+    """Slice of the rows with low <= value <= high (either bound may be None) in a monotonic column."""
+    values = np.asarray(values)
+    n = len(values)
+    if direction == INCREASING:
+        start = 0 if low is None else int(np.searchsorted(values, low, side='left'))
+        stop = n if high is None else int(np.searchsorted(values, high, side='right'))
+    else:
+        # Non-increasing: searchsorted needs ascending contiguous data, so bisect directly
+        start = 0 if high is None else _first(n, lambda i: values[i] <= high)
+        stop = n if low is None else _first(n, lambda i: values[i] < low)
+    return slice(start, max(start, stop))
+
+class ColumnIndex:
+    """
+    Order information for the columns of one file version.
+    known: {column: direction} already recorded elsewhere (e.g. the binary cache manifest).
+    """
+
+    def __init__(self, known=None):
+        self._direction = dict(known or {})
+        self._orders = {}  # column: (stable argsort, number of non-NaN values)
+        self._segments = {}  # (column, hysteresis): sweep segments
+        self._lock = threading.Lock()
+
+    def direction(self, name, values):
+        """Monotonic direction of a column (computed on first use)."""
+        if name not in self._direction:
+            direction = monotonic_direction(values)
+            with self._lock:
+                self._direction[name] = direction
+            logger.debug("Column %s: %s", name, direction or 'not monotonic')
+        return self._direction[name]
+
+    def order(self, name, values):
+        """Cached (stable sort permutation, count of non-NaN values) of a column."""
+        entry = self._orders.get(name)
+        if entry is None:
+            values = np.asarray(values)
+            order = np.argsort(values, kind='stable')
+            valid = int(np.count_nonzero(~np.isnan(values))) if values.dtype.kind == 'f' else len(values)
+            entry = (order, valid)
+            with self._lock:
+                self._orders[name] = entry
+        return entry
+
+    def segments(self, name, values, hysteresis=None):
+        """Cached sweep segments of a column (see sweeps.find_segments)."""
+        key = (name, hysteresis)
+        segments = self._segments.get(key)
+        if segments is None:
+            segments = find_segments(values, hysteresis)
+            with self._lock:
+                self._segments[key] = segments
+            logger.debug("Column %s: %d sweep segments", name, len(segments))
+        return segments
+
+    def select(self, name, values, low=None, high=None, sort_index=COLUMN_SORT_INDEX):
+        """
+        Rows of a column with low <= value <= high: a slice for monotonic columns, an ascending array of row
+        numbers from the sort permutation when sort_index is on and the range is narrow, else None
+        (the caller filters with a mask).
+        """
+        low = None if low in (None, '') else float(low)
+        high = None if high in (None, '') else float(high)
+        values = np.asarray(values)
+        if values.dtype.kind not in 'iuf':
+            return None
+        direction = self.direction(name, values)
+        if direction is not None:
+            return range_slice(values, direction, low, high)
+        if not sort_index:
+            return None
+        order, valid = self.order(name, values)
+        start = 0 if low is None else _first(valid, lambda k: values[order[k]] >= low)
+        stop = valid if high is None else _first(valid, lambda k: values[order[k]] > high)
+        if stop - start > COLUMN_SORT_MAX_FRACTION * len(values):
+            return None # A wide range is cheaper to mask than to gather and sort
+        return np.sort(order[start:max(start, stop)])
+
+    def memory_report(self):
+        """(column, array) of the cached sort permutations."""
+        with self._lock:
+            return [(name, order) for name, (order, _) in self._orders.items()]
+
+    def drop_orders(self):
+        """Forget the sort permutations (they are rebuilt on demand). Returns the bytes released."""
+        with self._lock:
+            freed = sum(order.nbytes for order, _ in self._orders.values())
+            self._orders.clear()
+        return freed
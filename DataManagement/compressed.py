@@ -0,0 +1,123 @@
+"""
+Transparent reading of compressed data files (.dat.gz, .dat.zst, .dat.xz).
+
+Headers are parsed through a streaming decompressor, so only the first blocks of an archive are decompressed.
+For the data, decompression runs in a background thread that fills a bounded queue of blocks while pandas
+parses the previous ones; zlib, lzma and zstd release the GIL while decompressing, so the two overlap on
+separate cores. The parsed result goes through the binary cache (see data_cache), so each archive is
+decompressed at most once per version.
+"""
+import gzip
+import io
+import lzma
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from localvars import DECOMPRESS_BLOCK_SIZE, DECOMPRESS_QUEUE_BLOCKS
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+COMPRESSED_EXTENSIONS = {'.gz': 'gzip', '.zst': 'zstd', '.zstd': 'zstd', '.xz': 'xz'}
+
+def compression_of(filepath):
+    """Compression of a file based on its extension ('gzip', 'zstd', 'xz'), or None."""
+    return COMPRESSED_EXTENSIONS.get(os.path.splitext(filepath)[1].lower())
+
+def _open_zstd(filepath):
+    try:
+        from compression import zstd # Python 3.14+
+        return zstd.open(filepath, 'rb')
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Reading .zst files requires zstandard (pip install zstandard)")
+    return zstandard.ZstdDecompressor().stream_reader(open(filepath, 'rb'), closefd=True)
+
+def open_binary(filepath):
+    """Streaming decompressed binary file object."""
+    compression = compression_of(filepath)
+    if compression == 'gzip':
+        return gzip.open(filepath, 'rb')
+    if compression == 'xz':
+        return lzma.open(filepath, 'rb')
+    if compression == 'zstd':
+        return _open_zstd(filepath)
+    return open(filepath, 'rb')
+
+def open_text(filepath):
+    """Open a data file for reading text, decompressing on the fly if needed (drop-in for open(filepath, 'r'))."""
+    if compression_of(filepath) is None:
+        return open(filepath, 'r')
+    return io.TextIOWrapper(open_binary(filepath))
+
+class ThreadedDecompressor(io.RawIOBase):
+    """Read-only stream whose blocks are decompressed ahead of the reader by a background thread."""
+
+    def __init__(self, filepath, block_size=DECOMPRESS_BLOCK_SIZE, max_blocks=DECOMPRESS_QUEUE_BLOCKS):
+        super().__init__()
+        self.filepath = filepath
+        self._blocks = queue.Queue(maxsize=max_blocks)
+        self._pending = memoryview(b'')
+        self._stop = threading.Event()
+        self._eof = False
+        self._thread = threading.Thread(target=self._produce, args=(block_size,), daemon=True,
+                                        name=f"decompress-{os.path.basename(filepath)}")
+        self._thread.start()
+
+    def _produce(self, block_size):
+        try:
+            with open_binary(self.filepath) as f:
+                while not self._stop.is_set():
+                    block = f.read(block_size)
+                    self._put(block)
+                    if not block:
+                        return
+        except BaseException as e:
+            self._put(e)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._blocks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending and not self._eof:
+            block = self._blocks.get()
+            if isinstance(block, BaseException):
+                raise block
+            if not block:
+                self._eof = True
+            self._pending = memoryview(block)
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+        super().close()
+
+@contextmanager
+def csv_source(filepath):
+    """
+    What to hand to pd.read_csv for filepath: the path itself for plain files, or a text stream fed by a
+    background decompression thread for compressed ones.
+    """
+    if compression_of(filepath) is None:
+        yield filepath
+        return
+    logger.debug('Decompressing %s', filepath)
+    with io.TextIOWrapper(io.BufferedReader(ThreadedDecompressor(filepath), DECOMPRESS_BLOCK_SIZE)) as source:
+        yield source
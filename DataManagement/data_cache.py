@@ -0,0 +1,278 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from DataManagement.data_reader import read_data_file, file_identity
+from DataManagement.binary_cache import read_cached, ensure_cache, write_cache, load_manifest, column_directions
+from DataManagement.column_index import ColumnIndex
+from DataManagement.memory_manager import memory_manager, frame_arrays, resident_nbytes
+from DataManagement.compressed import compression_of
+from DataManagement.minmax_pyramid import lod_source
+from DataManagement.expressions import required_columns
+from DataManagement.plot_data import prepare_plot_data, prepare_plot_lines
+from localvars import DATA_CACHE_FILES, DATA_CACHE_DERIVED, BINARY_CACHE_MIN_BYTES
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# Params that affect the prepared arrays (style and legend do not)
+DERIVED_KEYS = ('x', 'y', 'calc_x', 'calc_y', 'minx', 'maxx', 'miny', 'maxy', 'mask_exprs', 'sweep', 'sweep_branch', 'sweep_column', 'resample',
+                'resample_grid')
+
+def derived_key(params):
+    return json.dumps({k: params[k] for k in DERIVED_KEYS if k in params}, sort_keys=True, default=str)
+
+def uses_binary_cache(file_path, identity):
+    """
+    Large files, compressed files of any size (so each archive is decompressed at most once) and files
+    that already have a valid cache (e.g. ingested ahead of time) are served from the binary cache.
+    """
+    return identity[2] >= BINARY_CACHE_MIN_BYTES or compression_of(file_path) is not None or load_manifest(file_path) is not None
+
+class DataCache:
+    """
+    Shared in-memory cache of parsed files and derived (prepared) plot arrays.
+    - Parsed frames are keyed by file identity (path, mtime, size) and grow column by column:
+      asking for columns that are not cached yet parses them together with the cached ones (so malformed rows
+      are rejected consistently across all the columns) and replaces the frame.
+    - Derived arrays are keyed by file identity and the params that affect prepare_plot_data.
+    - Column indexes (sortedness, sort permutations, sweep segments) are kept per file identity, so range limits never rescan.
+    All are LRU-bounded (DATA_CACHE_FILES / DATA_CACHE_DERIVED in localvars).
+    """
+
+    def __init__(self, max_files=DATA_CACHE_FILES, max_derived=DATA_CACHE_DERIVED):
+        self.max_files = max_files
+        self.max_derived = max_derived
+        self._frames = OrderedDict()   # identity: {'df', 'comments', 'meta', 'filetype', 'complete'}
+        self._derived = OrderedDict()  # (identity, key): (x, y)
+        self._indexes = OrderedDict()  # identity: ColumnIndex
+        self._lock = threading.RLock()
+
+    def _touch(self, cache, key, limit):
+        cache.move_to_end(key)
+        while len(cache) > limit:
+            cache.popitem(last=False)
+
+    def get_frame(self, file_path, columns=None):
+        """
+        Return (df, comments, meta, filetype) for file_path containing at least `columns` (None: all columns).
+        The returned frame may contain more columns than requested.
+        """
+        identity = file_identity(file_path)
+        with self._lock:
+            entry = self._frames.get(identity)
+            if entry is not None:
+                missing = None if columns is None else [c for c in columns if c not in entry['df'].columns]
+                if entry['complete'] or (missing is not None and not missing):
+                    self._touch(self._frames, identity, self.max_files)
+                    return entry['df'], entry['comments'], entry['meta'], entry['filetype']
+        # Parse outside the lock; only the columns we do not have yet
+        if uses_binary_cache(file_path, identity):
+            # Large files go through the memory-mapped binary cache (parsed once, then shared across sessions)
+            df, comments, meta, filetype = read_cached(file_path)
+            entry = {'df': df, 'comments': comments, 'meta': meta, 'filetype': filetype, 'complete': True}
+        elif entry is not None and columns is not None:
+            # Re-read the cached columns together with the new ones: each read rejects the rows that are malformed
+            # in its own columns, so frames from separate reads would not be row-aligned
+            df, comments, meta, filetype = read_data_file(file_path, filetype=entry['filetype'], usecols=list(entry['df'].columns) + missing)
+            entry = dict(entry, df=df, comments=comments, meta=meta)
+        else:
+            df, comments, meta, filetype = read_data_file(file_path, usecols=columns)
+            entry = {'df': df, 'comments': comments, 'meta': meta, 'filetype': filetype, 'complete': columns is None}
+        with self._lock:
+            self._frames[identity] = entry
+            self._touch(self._frames, identity, self.max_files)
+        return entry['df'], entry['comments'], entry['meta'], entry['filetype']
+
+    def column_index(self, file_path, identity=None):
+        """ColumnIndex of the current version of file_path, seeded from the binary cache manifest when there is one."""
+        identity = identity or file_identity(file_path)
+        with self._lock:
+            index = self._indexes.get(identity)
+            if index is not None:
+                self._touch(self._indexes, identity, self.max_files)
+                return index
+        manifest = load_manifest(file_path)
+        index = ColumnIndex(column_directions(manifest) if manifest is not None else None)
+        with self._lock:
+            index = self._indexes.setdefault(identity, index)
+            self._touch(self._indexes, identity, self.max_files)
+        return index
+
+    def sweep_segments(self, file_path, column, hysteresis=None):
+        """Sweep segments of a column of file_path (see sweeps.find_segments), found once per file version."""
+        identity = file_identity(file_path)
+        df, _, _, _ = self.get_frame(file_path, [column])
+        return self.column_index(file_path, identity).segments(column, df[column], hysteresis)
+
+    def plot_arrays(self, file_path, params):
+        """
+        Prepared (x, y) arrays for a plot line, computed at most once per file version and params.
+        Lines that can be drawn from min/max pyramids get memory-mapped views of the cached columns instead.
+        """
+        identity = file_identity(file_path)
+        if uses_binary_cache(file_path, identity):
+            ensure_cache(file_path) # The cache step also builds the pyramids
+            source = lod_source(file_path, params)
+            if source is not None:
+                return source.x, source.y
+        key = (identity, derived_key(params))
+        with self._lock:
+            cached = self._derived.get(key)
+            if cached is not None:
+                self._touch(self._derived, key, self.max_derived)
+                return cached
+        df, _, _, _ = self.get_frame(file_path, required_columns(params))
+        x, y = prepare_plot_data(df, params, logger, index=self.column_index(file_path, identity))
+        cached = (np.asarray(x), np.asarray(y))
+        self.put_plot_arrays(file_path, params, *cached)
+        return cached
+
+    def plot_arrays_many(self, file_path, params_list):
+        """
+        plot_arrays for several lines of one file. Lines not cached yet are prepared together, so the file's
+        columns are fetched once and subexpressions the lines share are evaluated once.
+        Returns a list with (x, y) or the Exception raised for each line.
+        """
+        try:
+            identity = file_identity(file_path)
+            binary = uses_binary_cache(file_path, identity)
+            if binary:
+                ensure_cache(file_path)
+        except Exception as e:
+            return [e] * len(params_list)
+        results = [None] * len(params_list)
+        missing = []
+        for i, params in enumerate(params_list):
+            source = lod_source(file_path, params) if binary else None
+            if source is not None:
+                results[i] = (source.x, source.y)
+                continue
+            key = (identity, derived_key(params))
+            with self._lock:
+                cached = self._derived.get(key)
+                if cached is not None:
+                    self._touch(self._derived, key, self.max_derived)
+            if cached is not None:
+                results[i] = cached
+            else:
+                missing.append(i)
+        if not missing:
+            return results
+        columns = set()
+        for i in missing:
+            needed = required_columns(params_list[i])
+            if needed is None:
+                columns = None
+                break
+            columns.update(needed)
+        try:
+            df, _, _, _ = self.get_frame(file_path, None if columns is None else sorted(columns))
+        except Exception as e:
+            for i in missing:
+                results[i] = e
+            return results
+        prepared = prepare_plot_lines(df, [params_list[i] for i in missing], logger, self.column_index(file_path, identity))
+        for i, result in zip(missing, prepared):
+            if not isinstance(result, Exception):
+                result = (np.asarray(result[0]), np.asarray(result[1]))
+                self.put_plot_arrays(file_path, params_list[i], *result)
+            results[i] = result
+        return results
+
+    def rejected_rows(self, file_path):
+        """Malformed-row report of the cached frame of file_path (see schema.apply_schema), or None."""
+        with self._lock:
+            entry = self._frames.get(file_identity(file_path))
+        if entry is None:
+            return None
+        meta = entry['meta']
+        return entry['df'].attrs.get('rejected') or (meta.get('rejected') if isinstance(meta, dict) else None)
+
+    def put_plot_arrays(self, file_path, params, x, y):
+        """Store arrays computed elsewhere (e.g. in a worker process)."""
+        key = (file_identity(file_path), derived_key(params))
+        with self._lock:
+            self._derived[key] = (x, y)
+            self._touch(self._derived, key, self.max_derived)
+
+    def invalidate(self, file_path=None):
+        """Drop everything cached for file_path (all versions), or the whole cache."""
+        with self._lock:
+            if file_path is None:
+                self._frames.clear()
+                self._derived.clear()
+                self._indexes.clear()
+                return
+            path = file_identity(file_path)[0]
+            for identity in [k for k in self._frames if k[0] == path]:
+                del self._frames[identity]
+            for key in [k for k in self._derived if k[0][0] == path]:
+                del self._derived[key]
+            for identity in [k for k in self._indexes if k[0] == path]:
+                del self._indexes[identity]
+
+    def memory_report(self):
+        """(kind, label, file, arrays) for every cached frame and derived array, for the memory manager."""
+        with self._lock:
+            frames = list(self._frames.items())
+            derived = list(self._derived.items())
+            indexes = list(self._indexes.items())
+        for identity, entry in frames:
+            yield 'file', os.path.basename(identity[0]), identity[0], frame_arrays(entry['df'])
+        for (identity, key), (x, y) in derived:
+            yield 'derived', f"{os.path.basename(identity[0])} {key}", identity[0], (x, y)
+        for identity, index in indexes:
+            for name, order in index.memory_report():
+                yield 'index', f"{os.path.basename(identity[0])} {name} sort order", identity[0], (order,)
+
+    def reclaim(self, excess):
+        """
+        Free about `excess` bytes, least recently used first: drop derived arrays (cheap to recompute) and sort
+        permutations, then spill complete frames to the memory-mapped binary cache and drop partial ones
+        (re-parsed on demand).
+        """
+        freed = 0
+        while freed < excess:
+            with self._lock:
+                if not self._derived:
+                    break
+                _, arrays = self._derived.popitem(last=False)
+            freed += sum(resident_nbytes(a) for a in arrays)
+        with self._lock:
+            indexes = list(self._indexes.values())
+        for index in indexes:
+            if freed >= excess:
+                break
+            freed += index.drop_orders()
+        with self._lock:
+            frames = list(self._frames.items())
+        for identity, entry in frames:
+            if freed >= excess:
+                break
+            nbytes = sum(resident_nbytes(a) for a in frame_arrays(entry['df']))
+            if not nbytes:
+                continue # Already memory-mapped
+            file_path = identity[0]
+            spilled = None
+            if entry['complete']:
+                try:
+                    if file_identity(file_path) == identity:
+                        write_cache(file_path, entry['df'], entry['comments'], entry['meta'], entry['filetype'])
+                        spilled = dict(entry, df=read_cached(file_path)[0])
+                except Exception as e:
+                    logger.warning("Could not spill %s to the binary cache: %s", file_path, e)
+            with self._lock:
+                if self._frames.get(identity) is not entry:
+                    continue # Replaced or evicted meanwhile
+                if spilled is not None:
+                    self._frames[identity] = spilled
+                else:
+                    del self._frames[identity]
+            logger.info("%s %s (%d bytes)", "Spilled" if spilled is not None else "Dropped", file_path, nbytes)
+            freed += nbytes
+        return freed
+
+data_cache = DataCache()
+memory_manager.register('data_cache', data_cache.memory_report, data_cache.reclaim, priority=0)
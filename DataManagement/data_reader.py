@@ -1,118 +1,224 @@
+import os
 import pandas as pd
 import re
 from logger import get_logger
+from tracing import span, metrics
+from DataManagement.compressed import open_text, csv_source
+from DataManagement.binary_format import binary_format_of, read_binary_file, read_binary_header
+from DataManagement.schema import declared_dtypes, apply_schema, bad_line_collector
 from localvars import RAW_DATA_DIR, POSTPROCESSED_DATA_DIR, DATA_DELIMITER
 
 logger = get_logger(__name__)
 
-def read_raw_file(filepath):
+def file_identity(filepath):
+    """Identity of a file's current contents: (absolute path, mtime in ns, size). Raises OSError if it does not exist."""
+    st = os.stat(filepath)
+    return (os.path.abspath(filepath), st.st_mtime_ns, st.st_size)
+
+def _parse_raw_header(f):
     """
-    Note: This function is designed for use with LabGUI data files. Any other data file formats need to be custom coded here
+    Parse the LabGUI header from an open file handle.
+    Returns: (comments, metadata, channel_names, data_start)
     """
     comments = []
     metadata = {'channels': [], 'instruments': [], 'units': [], 'start_time': None}
     data_start = 0
     channel_names = None
-    with open(filepath, 'r') as f:
-        for i, line in enumerate(f):
-            if not line.startswith('#'):
-                data_start = i
-                break
-            
-            if line.startswith("#C'"):
-                # Channel names
-                chs = re.findall(r"'([^']+)'", line)
-                if len(chs):
-                    metadata['channels'].extend(chs)
-                    channel_names = chs
-                    continue
-            elif line.startswith("#I'"):
-                # Instruments
-                insts = re.findall(r"'([^']+)'", line)
-                if len(insts):
-                    metadata['instruments'].extend(insts)
-                    continue
-            elif line.startswith("#P'"):
-                # Units
-                units = re.findall(r"'([^']+)'", line)
-                if len(units):
-                    metadata['units'].extend(units)
+    for i, line in enumerate(f):
+        if not line.startswith('#'):
+            data_start = i
+            break
+
+        if line.startswith("#C'"):
+            # Channel names
+            chs = re.findall(r"'([^']+)'", line)
+            if len(chs):
+                metadata['channels'].extend(chs)
+                channel_names = chs
+                continue
+        elif line.startswith("#I'"):
+            # Instruments
+            insts = re.findall(r"'([^']+)'", line)
+            if len(insts):
+                metadata['instruments'].extend(insts)
+                continue
+        elif line.startswith("#P'"):
+            # Units
+            units = re.findall(r"'([^']+)'", line)
+            if len(units):
+                metadata['units'].extend(units)
+                continue
+        elif line.startswith("#T'"):
+            # Start time
+            try:
+                start_time = re.findall(r"'([^']+)'", line)
+                if len(start_time) == 1:
+                    #metadata['start_time'] = float(line[2:].strip().strip('\''))
+                    metadata['start_time'] = float(start_time[0])
                     continue
-            elif line.startswith("#T'"):
-                # Start time
-                try:
-                    start_time = re.findall(r"'([^']+)'", line)
-                    if len(start_time) == 1:
-                        #metadata['start_time'] = float(line[2:].strip().strip('\''))
-                        metadata['start_time'] = float(start_time[0])
-                        continue
-                except Exception as e:
-                    logger.warning(f"Could not parse start time from line: {line}") # Must be a comment then
-                    print(e)
-            
-            
-            comments.append(line[1:].strip()) # remove the #
-            
+            except Exception as e:
+                logger.warning(f"Could not parse start time from line: {line}") # Must be a comment then
+                print(e)
+
+
+        comments.append(line[1:].strip()) # remove the #
+    return comments, metadata, channel_names, data_start
+
+def _raw_column_names(filepath, channel_names, data_start):
+    """Channel names actually present in the data, based on the column count of the first data row."""
+    if not channel_names:
+        return []
+    with open_text(filepath) as f:
+        for _ in range(data_start):
+            next(f)
+        first_data_line = next(f)
+        ncols = len(first_data_line.split())
+    return [str(name) for name in channel_names[:ncols]]
+
+def _parse_processed_header(f):
+    """
+    Parse the comment header of a processed file from an open file handle.
+    Returns: (comments, header_cols, data_start)
+    """
+    comments = []
+    header_cols = []
+    data_start = 0
+    for i, line in enumerate(f):
+        if not line.startswith('#'):
+            data_start = i
+            break
+        comments.append(line.strip())
+        if line.startswith('#'): # The last line of the comments should conain the header labels
+            # Header columns (e.g. # 'T' 'B' 'R' 'U' 'V')
+            header_cols = re.findall(r"'([^']+)'", line) # If using quotes, this will work
+            if not len(header_cols): # If re could not match any quotes, we try without quotes
+                header_cols = [x.strip('\'"') for x in line[1:].strip().split(DATA_DELIMITER if DATA_DELIMITER != '\s+' else ' ') if x]
+    return comments, header_cols, data_start
+
+def _project_columns(names, usecols):
+    """
+    Restrict usecols to the columns that actually exist in names, preserving file order.
+    Returns None (read everything) if no projection is possible.
+    """
+    if usecols is None or not names:
+        return None
+    wanted = set(usecols)
+    projected = [name for name in names if name in wanted]
+    missing = wanted.difference(projected)
+    if missing:
+        logger.warning(f"Requested columns not found in file, ignoring: {sorted(missing)}")
+    return projected if projected else None
+
+def _bad_line_options(bad_lines):
+    """read_csv options that skip rows with the wrong number of fields, collecting them into bad_lines."""
+    if bad_lines is None:
+        return {}
+    if DATA_DELIMITER == r'\s+' or len(DATA_DELIMITER) == 1:
+        return {'on_bad_lines': 'warn'} # The C engine cannot hand rejected lines back
+    return {'engine': 'python', 'on_bad_lines': bad_line_collector(bad_lines)}
+
+def read_raw_file(filepath, usecols=None, bad_lines=None):
+    """
+    Note: This function is designed for use with LabGUI data files. Any other data file formats need to be custom coded here
+    usecols: optional iterable of column names; only these columns are parsed
+    bad_lines: optional list; rows with the wrong number of fields are skipped and appended to it instead of failing the read
+    """
+    with open_text(filepath) as f:
+        comments, metadata, channel_names, data_start = _parse_raw_header(f)
+
     # Read data
-    if channel_names:
-        # Count columns in first data row
-        with open(filepath, 'r') as f:
-            for _ in range(data_start):
-                next(f)
-            first_data_line = next(f)
-            ncols = len(first_data_line.split())
-        use_names = [str(name) for name in channel_names[:ncols]]
+    use_names = _raw_column_names(filepath, channel_names, data_start)
+    with span('parse', file=filepath), csv_source(filepath) as source:
         if use_names:
-            df = pd.read_csv(filepath, comment='#', skiprows=data_start, sep=DATA_DELIMITER, names=use_names)
+            df = pd.read_csv(source, comment='#', skiprows=data_start, sep=DATA_DELIMITER, names=use_names,
+                             usecols=_project_columns(use_names, usecols), **_bad_line_options(bad_lines))
         else:
-            df = pd.read_csv(filepath, comment='#', skiprows=data_start, sep=DATA_DELIMITER)
-    else:
-        df = pd.read_csv(filepath, comment='#', skiprows=data_start, sep=DATA_DELIMITER)
+            df = pd.read_csv(source, comment='#', skiprows=data_start, sep=DATA_DELIMITER, **_bad_line_options(bad_lines))
     return df, comments, metadata
 
-def read_processed_file(filepath):
-    comments = []
-    header_cols = []
-    data_start = 0
-    with open(filepath, 'r') as f:
-        for i, line in enumerate(f):
-            if not line.startswith('#'):
-                data_start = i
-                break
-            comments.append(line.strip())
-            if line.startswith('#'): # The last line of the comments should conain the header labels
-                # Header columns (e.g. # 'T' 'B' 'R' 'U' 'V')
-                header_cols = re.findall(r"'([^']+)'", line) # If using quotes, this will work
-                if not len(header_cols): # If re could not match any quotes, we try without quotes
-                    header_cols = [x.strip('\'"') for x in line[1:].strip().split(DATA_DELIMITER if DATA_DELIMITER != '\s+' else ' ') if x]
-                
-    df = pd.read_csv(filepath, comment='#', skiprows=data_start, sep=DATA_DELIMITER, names=header_cols if header_cols else None)
+def read_processed_file(filepath, usecols=None, bad_lines=None):
+    """
+    usecols: optional iterable of column names; only these columns are parsed (requires a header line)
+    bad_lines: as for read_raw_file
+    """
+    with open_text(filepath) as f:
+        comments, header_cols, data_start = _parse_processed_header(f)
+
+    with span('parse', file=filepath), csv_source(filepath) as source:
+        df = pd.read_csv(source, comment='#', skiprows=data_start, sep=DATA_DELIMITER, names=header_cols if header_cols else None,
+                         usecols=_project_columns(header_cols, usecols), **_bad_line_options(bad_lines))
     return df, comments, header_cols
 
-def read_data_file(filepath, filetype=None):
+def _detect_filetype(filepath):
+    # Auto-detect: if file has #C, #I, #P, treat as raw
+    with open_text(filepath) as f:
+        head = f.read(4096)
+        if any(tag in head for tag in ['#C', '#I', '#P']):
+            return 'raw'
+    return 'processed'
+
+def read_data_header(filepath, filetype=None):
+    """
+    Read only the header of a data file, without parsing any data.
+    filetype: 'raw', 'processed', or None (auto-detect)
+    Returns: (columns, comments, metadata/header_cols, filetype)
+    """
+    logger.debug('Reading data file header: %s', filepath)
+    if binary_format_of(filepath):
+        return read_binary_header(filepath)
+    if filetype is None:
+        filetype = _detect_filetype(filepath)
+    if filetype == 'raw':
+        with open_text(filepath) as f:
+            comments, metadata, channel_names, data_start = _parse_raw_header(f)
+        columns = _raw_column_names(filepath, channel_names, data_start)
+        if not columns:
+            # No channel names, the column names come from the data itself
+            with open_text(filepath) as f:
+                columns = [str(c) for c in pd.read_csv(f, comment='#', skiprows=data_start, sep=DATA_DELIMITER, nrows=0).columns]
+        return columns, comments, metadata, 'raw'
+    with open_text(filepath) as f:
+        comments, header_cols, data_start = _parse_processed_header(f)
+    columns = list(header_cols)
+    if not columns:
+        with open_text(filepath) as f:
+            columns = [str(c) for c in pd.read_csv(f, comment='#', skiprows=data_start, sep=DATA_DELIMITER, nrows=0).columns]
+    return columns, comments, header_cols, 'processed'
+
+def read_data_file(filepath, filetype=None, usecols=None, dtypes=None, float32=False):
     """
     filetype: 'raw', 'processed', or None (auto-detect)
+    usecols: optional iterable of column names to parse; None parses every column
+    dtypes: optional {column: dtype} overriding the declared schema (DTYPE_MAP/UNIT_DTYPES, see schema.py)
+    float32: downcast float columns not declared float64 to float32 (for plotting-only loads)
+    Malformed rows are rejected and reported in df.attrs['rejected'] (and metadata['rejected'] for raw files).
     Returns: (df, comments, metadata/header_cols, filetype)
     """
-    logger.debug(f'Reading data file: {filepath}')
+    logger.debug('Reading data file: %s', filepath)
     try:
-        if filetype is None:
-            # Auto-detect: if file has #C, #I, #P, treat as raw
-            with open(filepath, 'r') as f:
-                head = f.read(4096)
-                if any(tag in head for tag in ['#C', '#I', '#P']):
-                    filetype = 'raw'
+        with span('read', file=filepath):
+            metrics.add_bytes('read', os.path.getsize(filepath))
+            bad_lines = []
+            if binary_format_of(filepath):
+                # Binary files carry their own filetype, columns and metadata; no text parsing needed
+                df, comments, metadata, filetype = read_binary_file(filepath, usecols=usecols)
+            else:
+                if filetype is None:
+                    filetype = _detect_filetype(filepath)
+                if filetype == 'raw':
+                    logger.debug('Reading raw file: %s', filepath)
+                    df, comments, metadata = read_raw_file(filepath, usecols=usecols, bad_lines=bad_lines)
                 else:
+                    df, comments, metadata = read_processed_file(filepath, usecols=usecols, bad_lines=bad_lines)
                     filetype = 'processed'
-        if filetype == 'raw':
-            logger.debug(f"Reading raw file: {filepath}")
-            df, comments, metadata = read_raw_file(filepath)
-            logger.info(f'Successfully read raw file: {filepath}')
-            return df, comments, metadata, 'raw'
-        else:
-            df, comments, header_cols = read_processed_file(filepath)
-            logger.info(f'Successfully read processed file: {filepath}')
-            return df, comments, header_cols, 'processed'
+            df, report = apply_schema(df, declared_dtypes(df.columns, metadata, dtypes), float32=float32, bad_lines=bad_lines)
+            if report:
+                logger.warning('Rejected %d malformed rows in %s: %s', report['rows'], filepath, report)
+                df.attrs['rejected'] = report
+                if isinstance(metadata, dict):
+                    metadata['rejected'] = report
+            logger.info('Successfully read %s file: %s', filetype, filepath)
+            return df, comments, metadata, filetype
     except Exception as e:
         logger.error(f'Error reading data file {filepath}: {e}')
-        raise e
\ No newline at end of file
+        raise e
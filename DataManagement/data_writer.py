@@ -1,16 +1,38 @@
+import os
 import numpy as np
+from DataManagement.binary_format import BINARY_FORMATS, binary_format_of, write_binary_file
+from localvars import OUTPUT_FORMAT
 from logger import get_logger
+from tracing import span, metrics
 
 logger = get_logger(__name__)
 
-def save_data_file(df, filepath, comments=None, metadata=None):
+@span('save')
+def save_data_file(df, filepath, comments=None, metadata=None, fmt=None):
     """
     Save a DataFrame in the same format as read by data_reader.py:
     - Two-space separated
     - Header line for columns
     - Optional comments/metadata at the top
+    fmt: 'text', or a binary format ('npz', 'feather', 'hdf5') which replaces the file extension.
+    None uses the extension of filepath if it is a binary one, else OUTPUT_FORMAT.
+    Returns the path written.
     """
-    logger.debug(f"Saving data file: {filepath}")
+    fmt = fmt or binary_format_of(filepath) or OUTPUT_FORMAT
+    if fmt != 'text':
+        if fmt not in BINARY_FORMATS:
+            raise ValueError(f"Unknown output format: {fmt}")
+        filepath = os.path.splitext(filepath)[0] + BINARY_FORMATS[fmt]
+        logger.debug("Saving %s data file: %s", fmt, filepath)
+        try:
+            write_binary_file(df, filepath, comments=comments, metadata=metadata, fmt=fmt)
+        except Exception as e:
+            logger.error("Error saving data file %s: %s", filepath, e)
+            raise
+        metrics.add_bytes('save', os.path.getsize(filepath))
+        logger.info("Successfully saved data file: %s", filepath)
+        return filepath
+    logger.debug("Saving data file: %s", filepath)
     lines = []
     if comments:
         for c in comments:
@@ -29,9 +51,13 @@ def save_data_file(df, filepath, comments=None, metadata=None):
     data_str = '\n'.join('  '.join(map(str, row)) for row in df.values)
     lines.append(data_str)
     try:
+        text = '\n'.join(lines) + '\n'
         with open(filepath, 'w') as f:
-            f.write('\n'.join(lines) + '\n')
-        logger.info(f"Successfully saved data file: {filepath}")
+            f.write(text)
+        metrics.add_bytes('save', len(text))
+        logger.info("Successfully saved data file: %s", filepath)
     except Exception as e:
         logger.error(f"Error saving data file {filepath}: {e}")
-        raise 
\ No newline at end of file
+        raise
+    return filepath
+ 
\ No newline at end of file
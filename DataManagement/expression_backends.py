@@ -0,0 +1,197 @@
+"""
+Backends evaluating elementwise column expressions (see expressions.ExpressionEvaluator).
+
+- 'numpy': plain eval over whole columns; one full-size temporary per operation, single-threaded.
+- 'chunked': the same compiled expression evaluated block by block (EXPRESSION_BLOCK_ROWS rows, sized so the
+  temporaries stay in cache) into a preallocated output, with the blocks split across EXPRESSION_THREADS threads
+  (numpy releases the GIL inside ufuncs).
+- 'numexpr': numexpr's multithreaded virtual machine, when the numexpr package is installed.
+'auto' (the default EXPRESSION_BACKEND) picks numexpr if available, else chunked.
+
+Only elementwise expressions (arithmetic, comparisons and elementwise numpy functions) over same-length columns
+of at least EXPRESSION_MIN_ROWS rows go through a backend; anything else (reductions, Series methods, indexing)
+is evaluated with plain eval as before.
+"""
+import ast
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from localvars import EXPRESSION_BACKEND, EXPRESSION_BLOCK_ROWS, EXPRESSION_THREADS, EXPRESSION_MIN_ROWS
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# Numpy functions that map arrays elementwise (so an expression using only these can be evaluated in blocks)
+ELEMENTWISE_FUNCTIONS = {
+    'sqrt', 'abs', 'absolute', 'fabs', 'sign', 'square', 'exp', 'expm1', 'exp2', 'log', 'log10', 'log1p', 'log2',
+    'sin', 'cos', 'tan', 'arcsin', 'arccos', 'arctan', 'arctan2', 'sinh', 'cosh', 'tanh', 'arcsinh', 'arccosh',
+    'arctanh', 'hypot', 'floor', 'ceil', 'trunc', 'rint', 'minimum', 'maximum', 'fmin', 'fmax', 'where', 'real',
+    'imag', 'conj', 'conjugate', 'deg2rad', 'rad2deg', 'degrees', 'radians', 'isnan', 'isfinite', 'isinf',
+    'logical_and', 'logical_or', 'logical_not', 'reciprocal', 'power', 'clip',
+}
+ELEMENTWISE_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.BitAnd, ast.BitOr,
+                   ast.BitXor, ast.USub, ast.UAdd, ast.Invert, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+
+# numpy name: numexpr name, for the functions numexpr implements
+NUMEXPR_FUNCTIONS = {
+    'where': 'where', 'sin': 'sin', 'cos': 'cos', 'tan': 'tan', 'arcsin': 'arcsin', 'arccos': 'arccos',
+    'arctan': 'arctan', 'arctan2': 'arctan2', 'sinh': 'sinh', 'cosh': 'cosh', 'tanh': 'tanh', 'arcsinh': 'arcsinh',
+    'arccosh': 'arccosh', 'arctanh': 'arctanh', 'log': 'log', 'log10': 'log10', 'log1p': 'log1p', 'exp': 'exp',
+    'expm1': 'expm1', 'sqrt': 'sqrt', 'abs': 'abs', 'absolute': 'abs', 'real': 'real', 'imag': 'imag',
+    'conj': 'conj', 'conjugate': 'conj',
+}
+NUMEXPR_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod, ast.Pow, ast.BitAnd, ast.BitOr, ast.USub, ast.UAdd,
+               ast.Invert, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+
+def is_elementwise(body, functions=ELEMENTWISE_FUNCTIONS, ops=ELEMENTWISE_OPS):
+    """True if a compiled expression body only combines its inputs elementwise."""
+    for node in ast.walk(body):
+        if isinstance(node, (ast.Expression, ast.Name, ast.Load, ast.BinOp, ast.UnaryOp)) or isinstance(node, ops):
+            continue
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, complex, bool)):
+            continue
+        if isinstance(node, ast.Compare) and len(node.ops) == 1:
+            continue
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in functions
+                and not node.keywords and not any(isinstance(a, ast.Starred) for a in node.args)):
+            continue
+        return False
+    return True
+
+class NotElementwise(ValueError):
+    """The expression did not map a block of rows to as many results; evaluate it whole instead."""
+
+class NumpyBackend:
+    name = 'numpy'
+
+    def __init__(self, min_rows=EXPRESSION_MIN_ROWS):
+        self.min_rows = min_rows
+
+    def accepts(self, entry):
+        return False # Everything goes through plain eval
+
+    def evaluate(self, entry, inputs, n, namespace):
+        return eval(entry['code'], namespace)
+
+class ChunkedBackend(NumpyBackend):
+    name = 'chunked'
+
+    def __init__(self, block_rows=EXPRESSION_BLOCK_ROWS, threads=EXPRESSION_THREADS, min_rows=EXPRESSION_MIN_ROWS):
+        super().__init__(min_rows)
+        self.block_rows = max(int(block_rows), 1)
+        self.threads = threads or os.cpu_count() or 1
+        self._pool = None
+
+    def accepts(self, entry):
+        return entry['elementwise']
+
+    def _blocks(self, code, inputs, namespace, out, start, stop):
+        namespace = dict(namespace) # Per thread: the block slices are bound in it
+        for lo in range(start, stop, self.block_rows):
+            hi = min(lo + self.block_rows, stop)
+            for name, values in inputs.items():
+                namespace[name] = values[lo:hi]
+            result = eval(code, namespace)
+            if np.ndim(result) != 1 or len(result) != hi - lo:
+                raise NotElementwise()
+            out[lo:hi] = result
+
+    def evaluate(self, entry, inputs, n, namespace):
+        code = entry['code']
+        # The first block fixes the output dtype
+        first = min(self.block_rows, n)
+        head = dict(namespace)
+        head.update({name: values[:first] for name, values in inputs.items()})
+        result = np.asarray(eval(code, head))
+        if result.ndim != 1 or len(result) != first:
+            raise NotElementwise()
+        out = np.empty(n, dtype=result.dtype)
+        out[:first] = result
+        rest = n - first
+        if rest <= 0:
+            return out
+        tasks = min(self.threads, math.ceil(rest / self.block_rows))
+        if tasks <= 1:
+            self._blocks(code, inputs, namespace, out, first, n)
+            return out
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='expr')
+        # Contiguous ranges of whole blocks, one per thread
+        per_task = math.ceil(rest / self.block_rows / tasks) * self.block_rows
+        futures = [self._pool.submit(self._blocks, code, inputs, namespace, out, lo, min(lo + per_task, n))
+                   for lo in range(first, n, per_task)]
+        for future in futures:
+            future.result()
+        return out
+
+class NumexprBackend(ChunkedBackend):
+    """numexpr for what it supports; other elementwise expressions fall back to chunked evaluation."""
+    name = 'numexpr'
+
+    def __init__(self, threads=EXPRESSION_THREADS, **kwargs):
+        super().__init__(threads=threads, **kwargs)
+        import numexpr
+        self.numexpr = numexpr
+        self.numexpr.set_num_threads(self.threads)
+
+    def _source(self, entry):
+        if 'numexpr' not in entry:
+            body = entry['body']
+            source = None
+            if is_elementwise(body, NUMEXPR_FUNCTIONS, NUMEXPR_OPS):
+                class Rename(ast.NodeTransformer):
+                    def visit_Call(self, node):
+                        self.generic_visit(node)
+                        node.func = ast.Name(id=NUMEXPR_FUNCTIONS[node.func.id], ctx=ast.Load())
+                        return node
+                source = ast.unparse(Rename().visit(ast.parse(ast.unparse(body), mode='eval')))
+            entry['numexpr'] = source
+        return entry['numexpr']
+
+    def evaluate(self, entry, inputs, n, namespace):
+        source = self._source(entry)
+        if source is not None:
+            try:
+                return self.numexpr.evaluate(source, local_dict=inputs)
+            except Exception as e:
+                logger.debug("numexpr could not evaluate %s (%s), using chunked evaluation", source, e)
+                entry['numexpr'] = None
+        return super().evaluate(entry, inputs, n, namespace)
+
+BACKENDS = {'numpy': NumpyBackend, 'chunked': ChunkedBackend, 'numexpr': NumexprBackend}
+
+def numexpr_available():
+    try:
+        import numexpr  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def available_backends():
+    return [name for name in BACKENDS if name != 'numexpr' or numexpr_available()]
+
+def make_backend(name=EXPRESSION_BACKEND, **kwargs):
+    """Backend instance by name ('auto': numexpr if installed, else chunked)."""
+    if name == 'auto':
+        name = 'numexpr' if numexpr_available() else 'chunked'
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown expression backend '{name}' (choose from auto, {', '.join(BACKENDS)})")
+    if name == 'numexpr' and not numexpr_available():
+        raise ImportError("The numexpr expression backend requires numexpr: pip install numexpr")
+    return BACKENDS[name](**kwargs)
+
+_default = None
+
+def get_backend():
+    """The process-wide backend (EXPRESSION_BACKEND unless changed with set_backend)."""
+    global _default
+    if _default is None:
+        _default = make_backend()
+        logger.debug("Expression backend: %s", _default.name)
+    return _default
+
+def set_backend(name, **kwargs):
+    global _default
+    _default = make_backend(name, **kwargs)
+    return _default
@@ -0,0 +1,316 @@
+"""
+Expressions over data columns (calc_x/calc_y/mask_exprs of plot lines, ExtractColumnsWithMath columns).
+
+Any column can be referenced by name; names that are not identifiers are quoted with backticks,
+e.g. `I (A)` * 1e9. Which columns an expression needs is worked out statically (required_columns).
+
+ExpressionGraph collects the expressions of many lines into one DAG: variable aliases are substituted by the
+expressions they stand for (x in calc_y is calc_x, x and y in a mask are the calculated ones), so identical
+subexpressions get identical keys across lines. Subexpressions occurring more than once are evaluated once per
+file by an ExpressionEvaluator and reused, e.g. ten lines plotting variants of V/I divide once.
+"""
+import ast
+import builtins
+import copy
+import re
+import numpy as np
+import pandas as pd
+from DataManagement.expression_backends import get_backend, is_elementwise, NotElementwise
+from DataManagement.sweeps import sweep_params
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# Names that are always available to user expressions (numpy namespace), built once
+NUMPY_NAMESPACE = {k: getattr(np, k) for k in dir(np) if not k.startswith('_')}
+
+# Names that let an expression reach data in ways we cannot see statically
+DYNAMIC_NAMES = {'eval', 'exec', 'compile', 'getattr', 'globals', 'locals', 'vars', '__import__'}
+
+# Builtins available while evaluating: none for expressions themselves (parse() rejects the name), but numpy's
+# array methods (x.mean(), x.std(), ...) import lazily and fail without __import__
+EVAL_BUILTINS = {'__import__': builtins.__import__}
+
+# `column name` references, for columns whose names are not identifiers
+QUOTED_COLUMN = re.compile(r'`([^`]+)`')
+
+# Subexpressions worth sharing (names and constants cost nothing to re-evaluate)
+SHAREABLE = (ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.Call, ast.Subscript, ast.IfExp)
+
+def column_variable(name):
+    """Identifier standing for a column inside compiled expressions."""
+    return f"_col_{name}" if name.isidentifier() else "_col_" + name.encode('utf-8').hex()
+
+def quote_columns(expr):
+    """Replace `quoted` column names by identifiers. Returns (source, {identifier: column name})."""
+    quoted = {}
+    def replace(match):
+        var = column_variable(match.group(1))
+        quoted[var] = match.group(1)
+        return var
+    return QUOTED_COLUMN.sub(replace, expr.strip()), quoted
+
+def referenced_names(expr):
+    """
+    Statically collect the free variable names used by an expression (`quoted` column names included).
+    Returns a set of names, or None if the expression is dynamic (unparsable or
+    uses indirect name lookups), in which case callers must assume it can touch any column.
+    """
+    source, quoted = quote_columns(expr)
+    try:
+        tree = ast.parse(source, mode='eval')
+    except SyntaxError:
+        return None
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            if node.id in DYNAMIC_NAMES:
+                return None
+            names.add(quoted.get(node.id, node.id))
+        elif isinstance(node, ast.Attribute) and node.attr.startswith('_'):
+            return None
+    return names
+
+def expression_columns(expr, aliases=None):
+    """
+    Columns needed to evaluate expr. aliases maps expression variables (e.g. 'x') to column names.
+    Names that are neither aliases nor numpy names are treated as column references.
+    Returns a set of column names, or None if the expression is dynamic.
+    """
+    aliases = aliases or {}
+    names = referenced_names(expr)
+    if names is None:
+        return None
+    columns = set()
+    for name in names:
+        if name in aliases:
+            columns.add(aliases[name])
+        elif name not in NUMPY_NAMESPACE:
+            columns.add(name)
+    return columns
+
+def required_columns(params):
+    """
+    Work out which columns a plot line needs from its params (x, y, calc_x, calc_y, mask_exprs, sweep_column).
+    Returns a sorted list of column names, or None if a full read is needed.
+    """
+    if 'x' not in params or 'y' not in params:
+        return None
+    aliases = {'x': params['x'], 'y': params['y']}
+    columns = {params['x'], params['y']}
+    sweeps = sweep_params(params)
+    if sweeps is not None:
+        columns.add(sweeps[0])
+    exprs = [params[key] for key in ('calc_x', 'calc_y') if params.get(key)]
+    mask_exprs = params.get('mask_exprs', [])
+    if isinstance(mask_exprs, str):
+        mask_exprs = [mask_exprs]
+    exprs.extend(mask_exprs)
+    for expr in exprs:
+        cols = expression_columns(expr, aliases)
+        if cols is None:
+            logger.debug("Dynamic expression, falling back to full read: %s", expr)
+            return None
+        columns |= cols
+    return sorted(columns)
+
+class ExpressionGraph:
+    """
+    DAG of the expressions of many plot lines (or processing columns) over one kind of file.
+    parse() turns an expression into a tree over column variables, with aliases (e.g. x, y) substituted;
+    add() registers a tree so repeated subtrees are recognised as shared; evaluator() evaluates trees
+    against the columns of one file, computing each shared subtree once.
+    """
+
+    def __init__(self):
+        self.columns = {}     # column variable: column name
+        self._counts = {}     # subtree key: occurrences in registered trees
+        self._shared = {}     # subtree key: variable holding its value
+        self._trees = {}      # subtree key: tree, for shared subtrees
+        self._compiled = {}   # tree key: (code, shared keys it reads, column variables it reads)
+
+    def column(self, name):
+        """Tree referencing a column."""
+        var = column_variable(name)
+        self.columns[var] = name
+        return ast.Name(id=var, ctx=ast.Load())
+
+    def parse(self, expr, aliases=None):
+        """
+        Tree of expr. aliases maps variable names to trees (see column()); other names are numpy names or
+        columns. Raises SyntaxError for invalid expressions.
+        """
+        aliases = aliases or {}
+        source, quoted = quote_columns(expr)
+        graph = self
+        class Resolve(ast.NodeTransformer):
+            def visit_Name(self, node):
+                if node.id in quoted:
+                    return graph.column(quoted[node.id])
+                if node.id in aliases:
+                    return aliases[node.id]
+                if node.id in EVAL_BUILTINS:
+                    raise SyntaxError(f"'{node.id}' is not allowed in expressions")
+                if node.id in NUMPY_NAMESPACE or node.id in DYNAMIC_NAMES:
+                    return node
+                return graph.column(node.id)
+        return Resolve().visit(ast.parse(source, mode='eval')).body
+
+    def add(self, tree):
+        """
+        Register a tree; subtrees seen more than once (here or in earlier trees) become shared.
+        A repeated subtree's own children are not counted again, so only the largest common subexpressions
+        are kept, not every intermediate inside them.
+        """
+        def walk(node):
+            if isinstance(node, SHAREABLE):
+                key = ast.dump(node)
+                self._counts[key] = self._counts.get(key, 0) + 1
+                if self._counts[key] == 2:
+                    self._shared[key] = f"_sub{len(self._shared)}"
+                    self._trees[key] = node
+                    self._compiled.clear() # Compiled trees may now read the new shared value
+                if self._counts[key] > 1:
+                    return
+            for child in ast.iter_child_nodes(node):
+                walk(child)
+        walk(tree)
+        return tree
+
+    def line_trees(self, params):
+        """
+        Trees of a plot line's x, y and mask expressions, as prepare_plot_data evaluates them
+        (calc_y sees the calculated x; masks see both calculated values).
+        """
+        x = self.column(params['x'])
+        y = self.column(params['y'])
+        if params.get('calc_x'):
+            x = self.parse(params['calc_x'], {'x': x, 'y': y})
+        if params.get('calc_y'):
+            y = self.parse(params['calc_y'], {'x': x, 'y': y})
+        mask_exprs = params.get('mask_exprs', [])
+        if isinstance(mask_exprs, str):
+            mask_exprs = [mask_exprs]
+        return x, y, [self.parse(expr, {'x': x, 'y': y}) for expr in mask_exprs]
+
+    def add_line(self, params):
+        """Register the expressions of a plot line. Invalid expressions are left for prepare_plot_data to report."""
+        try:
+            x, y, masks = self.line_trees(params)
+        except (KeyError, SyntaxError):
+            return
+        for tree in [x, y] + masks:
+            self.add(tree)
+
+    def source(self, tree):
+        """Expression source of a tree, with column names restored."""
+        columns = self.columns
+        class Restore(ast.NodeTransformer):
+            def visit_Name(self, node):
+                name = columns.get(node.id)
+                if name is None:
+                    return node
+                return ast.Name(id=name if name.isidentifier() else f"`{name}`", ctx=ast.Load())
+        return ast.unparse(Restore().visit(copy.deepcopy(tree)))
+
+    def shared(self):
+        """Source of every shared subexpression (for diagnostics)."""
+        return [self.source(self._trees[key]) for key in self._shared]
+
+    def _collapse(self, node, reads, top=False):
+        """Copy of node with shared subtrees (other than node itself) replaced by their variables."""
+        if not top and isinstance(node, SHAREABLE):
+            key = ast.dump(node)
+            if key in self._shared:
+                reads.append(key)
+                return ast.Name(id=self._shared[key], ctx=ast.Load())
+        new = copy.copy(node)
+        for field, value in ast.iter_fields(node):
+            if isinstance(value, list):
+                setattr(new, field, [self._collapse(v, reads) if isinstance(v, ast.AST) else v for v in value])
+            elif isinstance(value, ast.AST):
+                setattr(new, field, self._collapse(value, reads))
+        return new
+
+    def compiled(self, tree):
+        """{code, reads (shared keys), columns (column variables), body, elementwise} of a tree."""
+        key = ast.dump(tree)
+        entry = self._compiled.get(key)
+        if entry is None:
+            reads = []
+            body = self._collapse(tree, reads, top=True)
+            columns = sorted({n.id for n in ast.walk(body) if isinstance(n, ast.Name) and n.id in self.columns})
+            code = compile(ast.fix_missing_locations(ast.Expression(body)), '<expression>', 'eval')
+            entry = self._compiled[key] = {'code': code, 'reads': reads, 'columns': columns, 'body': body,
+                                           'elementwise': is_elementwise(body)}
+        return entry
+
+    def evaluator(self, columns, backend=None):
+        """
+        Evaluator over columns (a DataFrame or a dict of arrays, e.g. one chunk of a file).
+        backend: expression backend for elementwise expressions (default: expression_backends.get_backend()).
+        """
+        return ExpressionEvaluator(self, columns, backend)
+
+class ExpressionEvaluator:
+    """Evaluates trees of an ExpressionGraph against the columns of one file; shared values are computed once."""
+
+    def __init__(self, graph, columns, backend=None):
+        self.graph = graph
+        self.data = columns
+        self.backend = backend or get_backend()
+        self.values = {}  # shared subtree key: value
+        self._namespace = dict(NUMPY_NAMESPACE)
+        self._namespace['__builtins__'] = EVAL_BUILTINS
+
+    def _column(self, var):
+        name = self.graph.columns[var]
+        try:
+            return self.data[name]
+        except KeyError:
+            raise KeyError(f"Column '{name}' not found") from None
+
+    def _backend_inputs(self, entry, namespace):
+        """Input arrays of an elementwise expression the backend can take, else None."""
+        names = entry['columns'] + [self.graph._shared[key] for key in entry['reads']]
+        inputs, n = {}, None
+        for name in names:
+            values = np.asarray(namespace[name])
+            if values.ndim != 1 or values.dtype.kind not in 'biufc' or (n is not None and len(values) != n):
+                return None, None
+            inputs[name], n = values, len(values)
+        if n is None or n < self.backend.min_rows:
+            return None, None
+        return inputs, n
+
+    def _evaluate(self, entry, namespace):
+        if self.backend.accepts(entry):
+            inputs, n = self._backend_inputs(entry, namespace)
+            if inputs is not None:
+                try:
+                    result = self.backend.evaluate(entry, inputs, n, namespace)
+                except NotElementwise:
+                    entry['elementwise'] = False
+                else:
+                    # Keep pandas semantics for callers (and later expressions) that use Series methods
+                    for name in entry['columns'] + [self.graph._shared[key] for key in entry['reads']]:
+                        if isinstance(namespace[name], pd.Series):
+                            return pd.Series(result, index=namespace[name].index, copy=False)
+                    return result
+        return eval(entry['code'], namespace)
+
+    def value(self, tree):
+        """Value of a tree; shared trees are evaluated once and remembered."""
+        key = ast.dump(tree)
+        if key in self.values:
+            return self.values[key]
+        entry = self.graph.compiled(tree)
+        namespace = self._namespace
+        for read in entry['reads']:
+            namespace[self.graph._shared[read]] = self.value(self.graph._trees[read])
+        for var in entry['columns']:
+            namespace[var] = self._column(var)
+        value = self._evaluate(entry, namespace)
+        if key in self.graph._shared:
+            self.values[key] = value
+        return value
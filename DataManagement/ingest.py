@@ -0,0 +1,135 @@
+"""
+Ingest a directory ahead of time: parse every data file under it once, in a process pool, into the binary cache,
+so later opens never parse text (headers come from the cache manifests, see binary_cache.read_header).
+
+Files whose binary cache is already valid are skipped, and each file's cache is complete once its manifest is
+written, so an interrupted ingest resumes where it stopped. At most max_workers files are parsed at once, with a bounded
+number queued, so memory stays flat however many files the directory holds.
+
+Run from the repository root:
+    python -m DataManagement.ingest data/raw/cooldown1 --workers 8
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from DataManagement.binary_cache import ensure_cache, load_manifest
+from DataManagement.binary_format import binary_format_of
+from DataManagement.compressed import compression_of
+from localvars import CACHE_DIR, INGEST_EXTENSIONS, MAX_WORKERS
+from logger import get_logger
+from tracing import span
+
+logger = get_logger(__name__)
+
+def is_data_file(path):
+    """True for data files (INGEST_EXTENSIONS, optionally compressed, or binary data files)."""
+    name = os.path.basename(path)
+    if name.startswith('.'):
+        return False
+    if binary_format_of(path):
+        return True
+    if compression_of(path):
+        name = os.path.splitext(name)[0]
+    return os.path.splitext(name)[1].lower() in INGEST_EXTENSIONS
+
+def discover(root):
+    """All data files under root, recursively (hidden directories and the cache directory are skipped)."""
+    cache_dir = os.path.abspath(CACHE_DIR)
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.') and os.path.abspath(os.path.join(dirpath, d)) != cache_dir)
+        found.extend(os.path.join(dirpath, name) for name in sorted(filenames) if is_data_file(name))
+    return found
+
+def _ingest_file(filepath):
+    """Worker: build the binary cache of one file. Returns (size of the file in bytes, seconds)."""
+    start = time.perf_counter()
+    manifest = ensure_cache(filepath)
+    return manifest['identity'][2], time.perf_counter() - start
+
+def _stats(done, total, skipped, failed, nbytes, start):
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    return {
+        'done': done, 'total': total, 'skipped': skipped, 'failed': failed, 'bytes': nbytes, 'elapsed': elapsed,
+        'files_per_s': (done - skipped - failed) / elapsed, 'mb_per_s': nbytes / 2**20 / elapsed,
+    }
+
+def ingest_directory(root, max_workers=MAX_WORKERS, force=False, progress=None, cancel=None):
+    """
+    Binary-cache every data file under root.
+    force: re-ingest files whose cache is valid
+    progress: optional callback(stats) after each file; stats has done/total/skipped/failed/bytes/elapsed/files_per_s/mb_per_s
+    cancel: optional threading.Event; when set, no new files are started and the ingest stops after the running ones
+    Returns the final stats, plus 'errors': {path: message}.
+    """
+    start = time.perf_counter()
+    files = discover(root)
+    todo, skipped = [], 0
+    for path in files:
+        if not force and load_manifest(path) is not None:
+            skipped += 1
+        else:
+            todo.append(path)
+    logger.info("Ingesting %s: %d files, %d already cached", root, len(files), skipped)
+    notify = progress or (lambda stats: None)
+    done, failed, nbytes = skipped, 0, 0
+    errors = {}
+    workers = max_workers or os.cpu_count() or 1
+    pending = iter(todo)
+    running = {}
+    with span('ingest', files=len(todo)), \
+            ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        try:
+            while True:
+                # Keep a bounded number of files queued ahead of the workers
+                while len(running) < 2 * workers and not (cancel is not None and cancel.is_set()):
+                    path = next(pending, None)
+                    if path is None:
+                        break
+                    running[pool.submit(_ingest_file, path)] = path
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    path = running.pop(future)
+                    done += 1
+                    try:
+                        size, _ = future.result()
+                        nbytes += size
+                    except Exception as e:
+                        failed += 1
+                        errors[path] = str(e)
+                        logger.error("Could not ingest %s: %s", path, e)
+                    notify(_stats(done, len(files), skipped, failed, nbytes, start))
+        finally:
+            for future in running:
+                future.cancel()
+    stats = _stats(done, len(files), skipped, failed, nbytes, start)
+    stats['errors'] = errors
+    logger.info("Ingested %s: %d files in %.1f s (%.1f files/s, %.1f MB/s), %d skipped, %d failed",
+                root, done - skipped - failed, stats['elapsed'], stats['files_per_s'], stats['mb_per_s'], skipped, failed)
+    return stats
+
+def format_stats(stats):
+    return (f"{stats['done']}/{stats['total']} files, {stats['files_per_s']:.1f} files/s, {stats['mb_per_s']:.1f} MB/s"
+            f" ({stats['skipped']} cached, {stats['failed']} failed)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parse every data file under a directory into the binary cache.")
+    parser.add_argument('root', help="Directory to ingest (e.g. data/raw/cooldown1)")
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help="Files parsed concurrently (default: one per CPU core)")
+    parser.add_argument('--force', action='store_true', help="Re-ingest files whose cache is already valid")
+    args = parser.parse_args(argv)
+    stats = ingest_directory(args.root, max_workers=args.workers, force=args.force,
+                             progress=lambda stats: print('\r' + format_stats(stats), end='', file=sys.stderr, flush=True))
+    print(file=sys.stderr)
+    for path, message in stats['errors'].items():
+        print(f"{path}: {message}", file=sys.stderr)
+    print(format_stats(stats))
+    return 1 if stats['errors'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Memory accounting and budget enforcement for loaded data.
+
+Everything that holds data arrays (the data cache, the plotted lines) registers a provider:
+    memory_manager.register('data_cache', report, reclaim, priority=0)
+- report(): iterable of (kind, label, file_path, arrays) describing what it currently holds
+- reclaim(excess): free roughly `excess` bytes (spill, drop or decimate), cheapest first
+usage() measures the arrays on demand: memory-mapped arrays cost nothing resident, and an array shared by
+several holders (e.g. a cached plot line also held by the plotted line) is counted once, for the first provider
+that reports it. enforce() calls the reclaimers in priority order until the total is back under the budget.
+Measuring and enforcing are driven by the caller (the GUI polls once a second), never from worker threads.
+"""
+import mmap
+import threading
+import numpy as np
+from localvars import MEMORY_BUDGET
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+def _root(array):
+    """The object that owns an array's memory."""
+    while getattr(array, 'base', None) is not None:
+        array = array.base
+    return array
+
+def resident_nbytes(array, seen=None):
+    """Bytes an array keeps in memory: 0 if memory-mapped or (with seen, a set of owner ids) already counted."""
+    if array is None:
+        return 0
+    if not isinstance(array, np.ndarray):
+        array = np.asarray(array)
+    root = _root(array)
+    if isinstance(root, (np.memmap, mmap.mmap)):
+        return 0
+    if seen is not None:
+        if id(root) in seen:
+            return 0
+        seen.add(id(root))
+    return getattr(root, 'nbytes', array.nbytes)
+
+def frame_arrays(df):
+    """The column arrays of a DataFrame (views, no copies for numeric columns)."""
+    return [df[name].to_numpy(copy=False) for name in df.columns]
+
+def format_bytes(n):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(n) < 1024 or unit == 'GB':
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024
+
+class MemoryManager:
+    def __init__(self, budget=MEMORY_BUDGET):
+        self.budget = budget  # Bytes, or None for no limit
+        self._providers = {}  # name: (report, reclaim, priority)
+        self._lock = threading.Lock()
+
+    def register(self, name, report, reclaim=None, priority=0):
+        with self._lock:
+            self._providers[name] = (report, reclaim, priority)
+
+    def unregister(self, name):
+        with self._lock:
+            self._providers.pop(name, None)
+
+    def _ordered(self):
+        with self._lock:
+            return sorted(self._providers.items(), key=lambda item: item[1][2])
+
+    def usage(self):
+        """One record per holder: {'provider', 'kind', 'label', 'file', 'bytes'}."""
+        seen = set()
+        records = []
+        for name, (report, _, _) in self._ordered():
+            for kind, label, file_path, arrays in report():
+                nbytes = sum(resident_nbytes(a, seen) for a in arrays)
+                records.append({'provider': name, 'kind': kind, 'label': label, 'file': file_path, 'bytes': nbytes})
+        return records
+
+    def totals(self, records=None):
+        """{'total': bytes, 'by_kind': {kind: bytes}, 'by_file': {file: bytes}}"""
+        records = self.usage() if records is None else records
+        by_kind, by_file = {}, {}
+        for rec in records:
+            by_kind[rec['kind']] = by_kind.get(rec['kind'], 0) + rec['bytes']
+            if rec['file']:
+                by_file[rec['file']] = by_file.get(rec['file'], 0) + rec['bytes']
+        return {'total': sum(by_kind.values()), 'by_kind': by_kind, 'by_file': by_file}
+
+    def total(self):
+        return self.totals()['total']
+
+    def enforce(self, budget=None):
+        """Reclaim memory until the total is under budget (default: self.budget). Returns the bytes freed."""
+        budget = self.budget if budget is None else budget
+        if budget is None:
+            return 0
+        start = total = self.total()
+        for name, (_, reclaim, _) in self._ordered():
+            if total <= budget:
+                break
+            if reclaim is None:
+                continue
+            logger.info("Over memory budget by %s, reclaiming from %s", format_bytes(total - budget), name)
+            try:
+                reclaim(total - budget)
+            except Exception as e:
+                logger.error("Reclaiming memory from %s failed: %s", name, e)
+            total = self.total()
+        if total > budget:
+            logger.warning("Still %s over the memory budget after reclaiming", format_bytes(total - budget))
+        return start - total
+
+memory_manager = MemoryManager()
@@ -0,0 +1,187 @@
+import os
+import numpy as np
+from localvars import PYRAMID_BASE, PYRAMID_FACTOR, PYRAMID_CHUNK, LOD_OVERSAMPLE
+from logger import get_logger
+from tracing import span
+
+logger = get_logger(__name__)
+
+def _reduce_minmax(mins, maxs, factor):
+    """Combine every `factor` consecutive buckets into one (the tail bucket may be partial)."""
+    n = -(-len(mins) // factor)
+    pad = n * factor - len(mins)
+    if pad:
+        mins = np.concatenate([mins, np.full(pad, np.nan)])
+        maxs = np.concatenate([maxs, np.full(pad, np.nan)])
+    return np.fmin.reduce(mins.reshape(n, factor), axis=1), np.fmax.reduce(maxs.reshape(n, factor), axis=1)
+
+def build_pyramid(values, base=PYRAMID_BASE, factor=PYRAMID_FACTOR, chunk=PYRAMID_CHUNK):
+    """
+    Multi-resolution min/max pyramid of a 1D array.
+    Level 0 buckets hold `base` consecutive samples, each further level combines `factor` buckets of the level below,
+    until a level has a single bucket. NaNs are ignored (a bucket of only NaNs is NaN).
+    Level 0 is computed chunk by chunk so values can be a memory-mapped array larger than RAM.
+    Returns {'data': (n_buckets_total, 2) float64 array of [min, max], 'base', 'factor', 'levels': [[offset, count], ...]}
+    """
+    chunk = max(base, chunk - chunk % base)
+    mins, maxs = [], []
+    with span('pyramid', n=len(values)):
+        for start in range(0, len(values), chunk):
+            block = np.asarray(values[start:start + chunk], dtype=np.float64)
+            n = -(-len(block) // base)
+            pad = n * base - len(block)
+            if pad:
+                block = np.concatenate([block, np.full(pad, np.nan)])
+            block = block.reshape(n, base)
+            mins.append(np.fmin.reduce(block, axis=1))
+            maxs.append(np.fmax.reduce(block, axis=1))
+        level_mins = [np.concatenate(mins) if mins else np.empty(0)]
+        level_maxs = [np.concatenate(maxs) if maxs else np.empty(0)]
+        while len(level_mins[-1]) > 1:
+            lo, hi = _reduce_minmax(level_mins[-1], level_maxs[-1], factor)
+            level_mins.append(lo)
+            level_maxs.append(hi)
+        levels, offset = [], 0
+        for lo in level_mins:
+            levels.append([offset, len(lo)])
+            offset += len(lo)
+        data = np.column_stack([np.concatenate(level_mins), np.concatenate(level_maxs)])
+    return {'data': data, 'base': base, 'factor': factor, 'levels': levels}
+
+def decimate_minmax(x, y, points):
+    """
+    Keep the samples holding the min and max of y in each of points/2 consecutive index buckets, in order.
+    Preserves the visual envelope of a line with a fixed number of points; NaNs are ignored.
+    """
+    n = len(y)
+    if n <= points:
+        return np.asarray(x), np.asarray(y)
+    buckets = max(points // 2, 1)
+    size = -(-n // buckets)
+    pad = size * buckets - n
+    values = np.asarray(y, dtype=np.float64)
+    nan = np.isnan(values)
+    lo = np.concatenate([np.where(nan, np.inf, values), np.full(pad, np.inf)]).reshape(buckets, size)
+    hi = np.concatenate([np.where(nan, -np.inf, values), np.full(pad, -np.inf)]).reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    keep = np.unique(np.minimum(np.concatenate([offsets + lo.argmin(axis=1), offsets + hi.argmax(axis=1)]), n - 1))
+    return np.asarray(x)[keep], np.asarray(y)[keep]
+
+class Pyramid:
+    """Read-only view of a pyramid stored as a (memory-mapped) [min, max] array."""
+
+    def __init__(self, data, base, factor, levels, length):
+        self.data = data
+        self.base = base
+        self.factor = factor
+        self.levels = levels
+        self.length = length  # Number of samples in the column
+
+    @classmethod
+    def load(cls, cache_dir, entry):
+        pyr = entry['pyramid']
+        data = np.load(os.path.join(cache_dir, pyr['file']), mmap_mode='r')
+        return cls(data, pyr['base'], pyr['factor'], pyr['levels'], entry['length'])
+
+    def bucket_size(self, level):
+        return self.base * self.factor ** level
+
+    def level_for(self, rows, max_points):
+        """Finest level with at most max_points buckets for `rows` samples, or -1 if raw samples fit."""
+        if rows <= max_points:
+            return -1
+        for level in range(len(self.levels)):
+            if -(-rows // self.bucket_size(level)) <= max_points:
+                return level
+        return len(self.levels) - 1
+
+    def buckets(self, level, start, stop):
+        """(first bucket index, mins, maxs) of the buckets covering samples start:stop at a level."""
+        size = self.bucket_size(level)
+        offset, count = self.levels[level]
+        b0 = start // size
+        b1 = min(-(-stop // size), count)
+        block = self.data[offset + b0:offset + b1]
+        return b0, block[:, 0], block[:, 1]
+
+class LodSource:
+    """
+    A plot line drawn straight from cached columns: x is monotonic and both columns have pyramids.
+    x, y are memory-mapped views restricted to rows start:stop (the line's minx/maxx range).
+    """
+
+    def __init__(self, x, y, xpyr, ypyr, start, stop):
+        self.x_full = x
+        self.y_full = y
+        self.xpyr = xpyr
+        self.ypyr = ypyr
+        self.start = start
+        self.stop = stop
+
+    @property
+    def x(self):
+        return self.x_full[self.start:self.stop]
+
+    @property
+    def y(self):
+        return self.y_full[self.start:self.stop]
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def rows_in(self, xlim):
+        """Row range whose x falls within xlim, clipped to the line's own range (binary search on x)."""
+        lo, hi = sorted(xlim)
+        start = max(self.start, int(np.searchsorted(self.x_full, lo, side='left')) - 1)
+        stop = min(self.stop, int(np.searchsorted(self.x_full, hi, side='right')) + 1)
+        return start, max(stop, start)
+
+    def envelope(self, xlim=None, pixels=1000):
+        """
+        Arrays to draw for the visible x range at a resolution of about `pixels` columns.
+        Uses raw samples when few enough rows are visible, otherwise the finest pyramid level that fits,
+        drawn as one vertical min-max stroke per bucket. Cost is O(pixels), independent of the column length.
+        """
+        start, stop = (self.start, self.stop) if xlim is None else self.rows_in(xlim)
+        max_points = max(int(pixels * LOD_OVERSAMPLE), 2)
+        level = self.ypyr.level_for(stop - start, max_points)
+        if level < 0:
+            return np.asarray(self.x_full[start:stop]), np.asarray(self.y_full[start:stop])
+        b0, ymin, ymax = self.ypyr.buckets(level, start, stop)
+        _, xmin, xmax = self.xpyr.buckets(level, start, stop)
+        xmid = (np.asarray(xmin) + np.asarray(xmax)) / 2
+        x = np.repeat(xmid, 2)
+        y = np.column_stack([ymin, ymax]).ravel()
+        return x, y
+
+# Params that change the arrays in ways a min/max pyramid cannot represent
+_NON_LOD_PARAMS = ('calc_x', 'calc_y', 'mask_exprs', 'miny', 'maxy', 'sweep', 'sweep_branch', 'resample')
+
+def lod_source(file_path, params):
+    """
+    LodSource for a plot line if it can be drawn from the binary cache's pyramids, else None.
+    Only lines plotting raw columns (optionally cut by minx/maxx) against a monotonic x qualify,
+    and only when the cache already exists; building it is left to the parse/cache step.
+    """
+    from DataManagement.binary_cache import load_manifest, column_entry, column_array, cache_dir_for
+    if any(params.get(key) for key in _NON_LOD_PARAMS) or 'x' not in params or 'y' not in params:
+        return None
+    try:
+        manifest = load_manifest(file_path)
+    except OSError:
+        return None
+    if manifest is None:
+        return None
+    xentry = column_entry(manifest, params['x'])
+    yentry = column_entry(manifest, params['y'])
+    if not xentry or not yentry or 'pyramid' not in xentry or 'pyramid' not in yentry or not xentry.get('monotonic'):
+        return None
+    cache_dir = cache_dir_for(file_path)
+    x = column_array(file_path, manifest, params['x'])
+    y = column_array(file_path, manifest, params['y'])
+    start, stop = 0, len(x)
+    if params.get('minx') not in (None, ''):
+        start = int(np.searchsorted(x, float(params['minx']), side='left'))
+    if params.get('maxx') not in (None, ''):
+        stop = int(np.searchsorted(x, float(params['maxx']), side='right'))
+    return LodSource(x, y, Pyramid.load(cache_dir, xentry), Pyramid.load(cache_dir, yentry), start, max(start, stop))
@@ -0,0 +1,183 @@
+"""
+Run processing modules in worker processes.
+
+Each job runs one module's load -> process -> save in its own (spawned) process, so a slow, hung or crashing
+module never blocks or kills the caller. The input DataFrame is handed over through shared memory instead of
+being pickled, progress reported by the module (BaseProcessingModule.report_progress) is streamed back, and
+jobs can be cancelled or time out individually. At most max_workers jobs run at once; the rest wait in a queue.
+
+Jobs submitted with the same DataFrame share one shared-memory copy of it. Workers see it read-only, so modules
+must copy self.data before modifying it in place.
+
+The executor is polled (poll()) rather than threaded, so a GUI can drive it from a timer.
+"""
+import importlib.util
+import itertools
+import multiprocessing
+import os
+import queue
+import sys
+import time
+import traceback
+from DataManagement.shared_frames import shared_frames, attach
+from localvars import MAX_WORKERS, PROCESSING_TIMEOUT
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# Job states
+QUEUED, RUNNING, DONE, FAILED, CANCELLED, TIMED_OUT = 'queued', 'running', 'done', 'failed', 'cancelled', 'timed out'
+FINAL_STATES = (DONE, FAILED, CANCELLED, TIMED_OUT)
+
+def _load_module_class(module_file, class_name):
+    mod_name = os.path.splitext(os.path.basename(module_file))[0]
+    spec = importlib.util.spec_from_file_location(mod_name, module_file)
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[mod_name] = mod
+    spec.loader.exec_module(mod)
+    return getattr(mod, class_name)
+
+def _worker_main(job_id, module_file, class_name, input_file, output_dir, params, manifest, events):
+    """Entry point of a job process: attach the input, run the module, report back through events."""
+    attached = None
+    try:
+        module_cls = _load_module_class(module_file, class_name)
+        attached = attach(manifest)
+        module = module_cls(input_file, output_dir, params, attached.df)
+        module.progress_callback = lambda fraction, message: events.put(('progress', job_id, fraction, message))
+        module.load()
+        module.process()
+        module.save()
+        events.put(('done', job_id, f"Output saved to {output_dir}"))
+    except BaseException as e:
+        events.put(('failed', job_id, f"{e}\n{traceback.format_exc()}"))
+    finally:
+        module = None
+        if attached is not None:
+            attached.close()
+
+class ModuleJob:
+    def __init__(self, job_id, module_cls, input_file, output_dir, params, data, timeout):
+        self.id = job_id
+        self.module_file = sys.modules[module_cls.__module__].__file__
+        self.class_name = module_cls.__name__
+        self.name = getattr(module_cls, 'name', module_cls.__name__)
+        self.input_file = input_file
+        self.output_dir = output_dir
+        self.params = params
+        self.data = data
+        self.timeout = timeout
+        self.state = QUEUED
+        self.progress = 0.0
+        self.message = ''
+        self.process = None
+        self.shared_key = None
+        self.started = None
+        self.dead_since = None
+
+    def __repr__(self):
+        return f"<ModuleJob {self.id} {self.name} {os.path.basename(self.input_file)} {self.state}>"
+
+class ModuleExecutor:
+    def __init__(self, max_workers=MAX_WORKERS):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._ctx = multiprocessing.get_context('spawn') # Never fork a process that runs Qt
+        self._events = self._ctx.Queue()
+        self._ids = itertools.count(1)
+        self.jobs = {}  # job_id: ModuleJob
+
+    def submit(self, module_cls, input_file, output_dir, params, data, timeout=PROCESSING_TIMEOUT):
+        """Queue a module run on data (a DataFrame). timeout: seconds, or None for no limit. Returns the job id."""
+        job = ModuleJob(next(self._ids), module_cls, input_file, output_dir, params, data, timeout)
+        self.jobs[job.id] = job
+        logger.info("Queued job %s", job)
+        self._start_queued()
+        return job.id
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or job.state in FINAL_STATES:
+            return False
+        self._finish(job, CANCELLED, "Cancelled")
+        return True
+
+    def active(self):
+        return [job for job in self.jobs.values() if job.state not in FINAL_STATES]
+
+    def poll(self):
+        """
+        Collect progress and results, enforce timeouts, reap dead workers and start queued jobs.
+        Returns a list of (job, event) with event 'progress' or a final state.
+        """
+        changes = []
+        while True:
+            try:
+                event = self._events.get_nowait()
+            except queue.Empty:
+                break
+            kind, job_id = event[0], event[1]
+            job = self.jobs.get(job_id)
+            if job is None or job.state in FINAL_STATES:
+                continue
+            if kind == 'progress':
+                job.progress, job.message = event[2], event[3]
+                changes.append((job, 'progress'))
+            else:
+                self._finish(job, DONE if kind == 'done' else FAILED, event[2])
+                changes.append((job, job.state))
+        now = time.monotonic()
+        for job in list(self.jobs.values()):
+            if job.state != RUNNING:
+                continue
+            if job.timeout and now - job.started > job.timeout:
+                self._finish(job, TIMED_OUT, f"Timed out after {job.timeout:g} s")
+                changes.append((job, job.state))
+            elif not job.process.is_alive():
+                # Give a final event still in the queue a moment to arrive before declaring a crash
+                job.dead_since = job.dead_since or now
+                if now - job.dead_since > 1.0:
+                    self._finish(job, FAILED, f"Worker exited with code {job.process.exitcode}")
+                    changes.append((job, job.state))
+        self._start_queued()
+        return changes
+
+    def _start_queued(self):
+        running = sum(1 for job in self.jobs.values() if job.state == RUNNING)
+        for job in self.jobs.values():
+            if running >= self.max_workers:
+                break
+            if job.state != QUEUED:
+                continue
+            try:
+                job.shared_key = ('module_input', id(job.data)) # The registry keeps the frame alive, so its id stays unique
+                manifest = shared_frames.publish(job.shared_key, job.data).manifest
+                job.process = self._ctx.Process(target=_worker_main, daemon=True,
+                                                args=(job.id, job.module_file, job.class_name, job.input_file, job.output_dir, job.params, manifest, self._events))
+                job.process.start()
+            except Exception as e:
+                self._finish(job, FAILED, f"Could not start worker: {e}")
+                continue
+            job.state, job.started = RUNNING, time.monotonic()
+            job.data = None # The worker reads the shared copy
+            running += 1
+            logger.info("Started job %s (pid %s)", job, job.process.pid)
+
+    def _finish(self, job, state, message):
+        job.state, job.message = state, message
+        started = job.process is not None and job.process.pid is not None
+        if started and state in (DONE, FAILED):
+            job.process.join(1) # Reported its result, let it exit on its own
+        if started and job.process.is_alive():
+            job.process.terminate()
+            job.process.join(1)
+            if job.process.is_alive():
+                job.process.kill()
+        if job.shared_key is not None:
+            shared_frames.release(job.shared_key)
+        job.shared_key, job.data = None, None
+        log = logger.info if state == DONE else logger.warning
+        log("Job %s finished: %s", job, message.splitlines()[0] if message else '')
+
+    def shutdown(self):
+        for job in self.active():
+            self._finish(job, CANCELLED, "Shut down")
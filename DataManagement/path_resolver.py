@@ -0,0 +1,87 @@
+"""
+Shared path resolution for processing: cooldown names, date prefixes and output directories.
+
+- The cooldown of a file is the first folder after 'raw', 'preprocessed' or 'postprocessed' in its path
+  (checked in that order), memoized per directory, so resolving 10k files of one cooldown splits one path.
+- The date prefix is the 6 leading digits of a file name (e.g. 240101_sweep.dat -> '240101').
+- Output directories are created once per process; later saves to the same directory make no syscall.
+ProcessingDialog and BaseProcessingModule both use the module instance path_resolver.
+"""
+import os
+import re
+import threading
+from functools import lru_cache
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+COOLDOWN_PARENTS = ('raw', 'preprocessed', 'postprocessed')
+DATE_PREFIX = re.compile(r'(\d{6})')
+
+@lru_cache(maxsize=65536)
+def _date_prefix(filename):
+    m = DATE_PREFIX.match(filename)
+    return m.group(1) if m else None
+
+class PathResolver:
+    def __init__(self):
+        self._cooldowns = {}   # normalized directory: cooldown
+        self._existing = set() # directories known to exist
+        self._lock = threading.Lock()
+
+    def _directory_cooldown(self, directory):
+        parts = directory.split(os.sep)
+        for key in COOLDOWN_PARENTS:
+            if key in parts:
+                idx = parts.index(key)
+                if idx + 1 < len(parts):
+                    return parts[idx + 1]
+        logger.debug("No cooldown folder in %s", directory)
+        return ''
+
+    def cooldown(self, file_path):
+        """Cooldown name of a file ('' if it is not inside <raw|preprocessed|postprocessed>/<cooldown>/)."""
+        directory = os.path.dirname(os.path.normpath(file_path))
+        cooldown = self._cooldowns.get(directory)
+        if cooldown is None:
+            cooldown = self._directory_cooldown(directory)
+            with self._lock:
+                self._cooldowns[directory] = cooldown
+        return cooldown
+
+    def date_prefix(self, file_path):
+        """Date prefix of a file name, or None."""
+        return _date_prefix(os.path.basename(file_path))
+
+    def prefix_options(self, file_path):
+        prefix = self.date_prefix(file_path)
+        return [prefix] if prefix else []
+
+    def ensure_dir(self, directory):
+        """Create directory (and parents) unless this process already did or saw it."""
+        directory = os.path.normpath(directory)
+        if directory in self._existing:
+            return directory
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._existing.add(directory)
+        return directory
+
+    def forget_dir(self, directory):
+        """Drop a directory from the existence cache (e.g. after it was deleted behind our back)."""
+        with self._lock:
+            self._existing.discard(os.path.normpath(directory))
+
+    def output_dir(self, output_dir, cooldown='', subfolder=None, create=True):
+        """output_dir/cooldown[/subfolder], created on first use."""
+        parts = [output_dir, cooldown] + ([subfolder] if subfolder else [])
+        directory = os.path.join(*parts)
+        return self.ensure_dir(directory) if create else directory
+
+    def clear(self):
+        with self._lock:
+            self._cooldowns.clear()
+            self._existing.clear()
+        _date_prefix.cache_clear()
+
+path_resolver = PathResolver()
@@ -0,0 +1,182 @@
+"""
+Processing pipelines: chain BaseProcessingModule steps in memory.
+
+A pipeline file (JSON, or YAML if PyYAML is installed) looks like:
+    {
+        "input": "data/raw/cooldown1/240101_sweep.dat",
+        "steps": [
+            {"id": "clean", "module": "ExtractColumnsWithMath", "mode": "pre", "params": {...}},
+            {"id": "sheet", "module": "ExtractColumnsWithMath", "mode": "post", "input": "clean", "params": {...}},
+            {"id": "hall", "module": "ExtractColumnsWithMath", "mode": "post", "input": "clean", "params": {...}}
+        ],
+        "outputs": ["sheet", "hall"]
+    }
+- module: a module's display name or class name, discovered in PROCESSING_MODULES_DIR for the step's mode
+- input: id of the step whose result feeds this one; omitted means the pipeline's input file
+- outputs: steps whose save() is called. Defaults to steps marked "save": true, or else the final steps (no dependents)
+Intermediate results are passed as DataFrames and never written to disk. Steps whose inputs are ready run
+concurrently in a thread pool, so independent branches (e.g. "sheet" and "hall" above) overlap.
+
+Run from the repository root:
+    python -m DataManagement.pipeline pipeline.json --input data/raw/cooldown1/240101_sweep.dat
+"""
+import argparse
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from DataManagement.data_reader import read_data_file
+from DataManagement.module_loader import discover_modules
+from localvars import PROCESSING_MODULES_DIR, PREPROCESSED_DATA_DIR, POSTPROCESSED_DATA_DIR, MAX_WORKERS
+from logger import get_logger
+from tracing import span
+
+logger = get_logger(__name__)
+
+def load_pipeline(path):
+    """Read a pipeline definition from a .json or .yaml/.yml file."""
+    with open(path, 'r') as f:
+        if path.lower().endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("PyYAML is required for YAML pipelines (pip install pyyaml), or use JSON")
+            pipeline = yaml.safe_load(f)
+        else:
+            pipeline = json.load(f)
+    validate_pipeline(pipeline)
+    return pipeline
+
+def validate_pipeline(pipeline):
+    """
+    Check step ids and inputs, and return the steps in dependency order.
+    Raises ValueError for duplicate or unknown ids and for cycles.
+    """
+    steps = pipeline.get('steps', [])
+    if not steps:
+        raise ValueError("Pipeline has no steps")
+    by_id = {}
+    for i, step in enumerate(steps):
+        step_id = step.setdefault('id', f"step{i + 1}")
+        if step_id in by_id:
+            raise ValueError(f"Duplicate pipeline step id: {step_id}")
+        if 'module' not in step:
+            raise ValueError(f"Pipeline step '{step_id}' has no module")
+        by_id[step_id] = step
+    for step in steps:
+        if step.get('input') is not None and step['input'] not in by_id:
+            raise ValueError(f"Pipeline step '{step['id']}' has unknown input '{step['input']}'")
+    for output in pipeline.get('outputs', []):
+        if output not in by_id:
+            raise ValueError(f"Unknown pipeline output '{output}'")
+    ordered, visiting, done = [], set(), set()
+    def visit(step_id):
+        if step_id in done:
+            return
+        if step_id in visiting:
+            raise ValueError(f"Pipeline has a cycle through step '{step_id}'")
+        visiting.add(step_id)
+        upstream = by_id[step_id].get('input')
+        if upstream is not None:
+            visit(upstream)
+        visiting.discard(step_id)
+        done.add(step_id)
+        ordered.append(by_id[step_id])
+    for step in steps:
+        visit(step['id'])
+    return ordered
+
+def output_steps(pipeline):
+    """Ids of the steps whose results are saved."""
+    steps = pipeline['steps']
+    if pipeline.get('outputs'):
+        return set(pipeline['outputs'])
+    marked = {step['id'] for step in steps if step.get('save')}
+    if marked:
+        return marked
+    upstream = {step.get('input') for step in steps}
+    return {step['id'] for step in steps if step['id'] not in upstream}
+
+def resolve_module(name, mode):
+    """Module class for a display name or class name in the given mode."""
+    for display_name, cls, _ in discover_modules(PROCESSING_MODULES_DIR, mode):
+        if name in (display_name, cls.__name__):
+            return cls
+    raise ValueError(f"No {mode}processing module named '{name}' in {PROCESSING_MODULES_DIR}")
+
+def _run_step(step, module_cls, input_file, data, save):
+    output_dir = PREPROCESSED_DATA_DIR if step.get('mode', 'pre') == 'pre' else POSTPROCESSED_DATA_DIR
+    with span('pipeline_step', step=step['id']):
+        module = module_cls(input_file, output_dir, dict(step.get('params', {})), data)
+        module.load()
+        module.process()
+        if save:
+            module.save()
+    return module.result
+
+def run_pipeline(pipeline, input_file=None, max_workers=MAX_WORKERS, progress=None):
+    """
+    Run every step of a pipeline on input_file (defaults to the pipeline's "input").
+    progress: optional callback(step_id, state) with state 'started', 'done', 'failed' or 'skipped'.
+    Returns a dict step_id -> result DataFrame, or the Exception the step raised (dependents of a
+    failed step are skipped and get the same exception).
+    """
+    ordered = validate_pipeline(pipeline)
+    input_file = input_file or pipeline.get('input')
+    if not input_file:
+        raise ValueError("Pipeline has no input file")
+    # Resolve every module up front: discovery imports module files and must not run concurrently
+    classes = {step['id']: resolve_module(step['module'], step.get('mode', 'pre')) for step in ordered}
+    outputs = output_steps(pipeline)
+    notify = progress or (lambda step_id, state: None)
+
+    data, _, _, _ = read_data_file(input_file)
+    results = {}
+    pending = list(ordered)
+    running = {}
+    with span('pipeline', steps=len(ordered)), ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            # Submit every step whose input is available; skip those whose input failed
+            for step in list(pending):
+                upstream = step.get('input')
+                if upstream is not None and upstream not in results:
+                    continue
+                pending.remove(step)
+                source = data if upstream is None else results[upstream]
+                if isinstance(source, Exception):
+                    results[step['id']] = source
+                    notify(step['id'], 'skipped')
+                    continue
+                notify(step['id'], 'started')
+                # Shallow copy so a step replacing columns of its input cannot affect sibling branches
+                future = pool.submit(_run_step, step, classes[step['id']], input_file, source.copy(deep=False), step['id'] in outputs)
+                running[future] = step['id']
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                step_id = running.pop(future)
+                try:
+                    results[step_id] = future.result()
+                    notify(step_id, 'done')
+                except Exception as e:
+                    logger.error("Pipeline step '%s' failed: %s", step_id, e)
+                    results[step_id] = e
+                    notify(step_id, 'failed')
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a processing pipeline on a data file.")
+    parser.add_argument('pipeline', help="Pipeline definition (.json, or .yaml with PyYAML)")
+    parser.add_argument('--input', default=None, help="Input data file (overrides the pipeline's input)")
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help="Steps run concurrently (default: one per CPU core)")
+    args = parser.parse_args(argv)
+    pipeline = load_pipeline(args.pipeline)
+    results = run_pipeline(pipeline, args.input, max_workers=args.workers,
+                           progress=lambda step_id, state: print(f"{step_id}: {state}"))
+    failed = [step_id for step_id, res in results.items() if isinstance(res, Exception)]
+    for step_id in failed:
+        print(f"{step_id} failed: {results[step_id]}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,298 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import numpy as np
+from DataManagement.data_reader import read_data_file
+from DataManagement.compressed import compression_of
+from DataManagement.expressions import required_columns, ExpressionGraph
+from DataManagement.expression_backends import is_elementwise
+from DataManagement.column_index import ColumnIndex
+from DataManagement.resample import parse_grid, resample
+from DataManagement.sweeps import sweep_params, select_segments, segment_rows
+from localvars import MAX_WORKERS, PLOT_FLOAT32
+from logger import get_logger
+from tracing import span
+
+logger = get_logger(__name__)
+
+class _Rows:
+    """Columns of df restricted to some rows; a slice gives views."""
+
+    def __init__(self, df, rows):
+        self.df = df
+        self.rows = rows
+
+    def __getitem__(self, name):
+        return self.df[name].iloc[self.rows]
+
+def _elementwise_line(graph, params):
+    """True if a line's x, y and mask expressions are all elementwise, so they can be evaluated on a subset of rows."""
+    try:
+        x, y, masks = graph.line_trees(params)
+    except (KeyError, SyntaxError):
+        return False # Reported when evaluated
+    return all(is_elementwise(tree) for tree in [x, y] + masks)
+
+def _and(mask, condition):
+    return condition if mask is None else mask & condition
+
+@span('prepare')
+def prepare_plot_data(df, params, logger=None, evaluator=None, index=None):
+    """
+    Given a DataFrame and params dict, return processed x, y arrays for plotting.
+    Handles calculation fields, min/max masks, and custom mask expressions.
+    Expressions may reference any column by name. evaluator: an ExpressionEvaluator over df shared by
+    several lines (see prepare_plot_lines), so subexpressions they have in common are computed once.
+    index: ColumnIndex of df's file; minx/maxx on a sorted x column then select rows by binary search,
+    and everything else is computed for those rows only, provided every expression of the line is elementwise
+    (otherwise, e.g. 'y - y.mean()', they are evaluated over whole columns and the range is applied as a mask).
+    sweep / sweep_branch restrict the line to sweep segments of sweep_column (default x), e.g. sweep 3 with
+    branch 'up' is the third up sweep; the segments are found once per file (cached in index) and are slices.
+    resample ('interp' or 'mean') puts y on the grid resample_grid ("start:stop:step", see resample.parse_grid).
+    """
+    if 'x' not in params or 'y' not in params:
+        raise ValueError("x and y must be specified in params")
+    if evaluator is None:
+        graph = ExpressionGraph()
+        graph.add_line(params)
+        evaluator = graph.evaluator(df)
+    graph = evaluator.graph
+    rows = None
+    x_selected = False # minx/maxx already applied by the row selection
+    sweeps = sweep_params(params)
+    if sweeps is not None:
+        column, sweep, branch = sweeps
+        try:
+            values = df[column]
+        except KeyError:
+            raise ValueError(f"Sweep column '{column}' not found")
+        index = index if index is not None else ColumnIndex()
+        rows = segment_rows(select_segments(index.segments(column, values), sweep, branch))
+    elif (index is not None and not params.get('calc_x') and ('minx' in params or 'maxx' in params)
+          and _elementwise_line(graph, params)):
+        try:
+            values = df[params['x']]
+        except KeyError:
+            values = None # Reported below
+        if values is not None:
+            rows = index.select(params['x'], values, params.get('minx'), params.get('maxx'))
+            x_selected = rows is not None
+    if rows is not None:
+        evaluator = graph.evaluator(_Rows(df, rows), evaluator.backend)
+    x_tree, y_tree = graph.column(params['x']), graph.column(params['y'])
+    x = evaluator.value(x_tree)
+    y = evaluator.value(y_tree)
+    if x is None or y is None:
+        raise ValueError("x and y must be valid columns in the DataFrame")
+    # Calculation for x
+    if 'calc_x' in params:
+        try:
+            tree = graph.parse(params['calc_x'], {'x': x_tree, 'y': y_tree})
+            x, x_tree = evaluator.value(tree), tree
+        except Exception as e:
+            if logger:
+                logger.error(f"X calculation error: {params['calc_x']}: {e}")
+    # Calculation for y
+    if 'calc_y' in params:
+        try:
+            tree = graph.parse(params['calc_y'], {'x': x_tree, 'y': y_tree})
+            y, y_tree = evaluator.value(tree), tree
+        except Exception as e:
+            if logger:
+                logger.error(f"Y calculation error: {params['calc_y']}: {e}")
+    mask = None
+    if not x_selected:
+        if 'minx' in params:
+            mask = _and(mask, x >= float(params['minx']))
+        if 'maxx' in params:
+            mask = _and(mask, x <= float(params['maxx']))
+    if 'miny' in params:
+        mask = _and(mask, y >= float(params['miny']))
+    if 'maxy' in params:
+        mask = _and(mask, y <= float(params['maxy']))
+    # Custom mask expressions
+    if 'mask_exprs' in params:
+        for expr in params['mask_exprs']:
+            try:
+                mask_expr = evaluator.value(graph.parse(expr, {'x': x_tree, 'y': y_tree}))
+                mask = _and(mask, mask_expr)
+            except Exception as e:
+                if logger:
+                    logger.error(f"Mask expression error: {expr}: {e}")
+    if mask is not None:
+        x = x[mask]
+        y = y[mask]
+    # Otherwise nothing to filter beyond the selected rows: views, no copy
+    if params.get('resample'):
+        grid = parse_grid(params.get('resample_grid', '::'), x)
+        return grid, resample(x, y, grid, params['resample'])
+    return x, y
+
+def prepare_plot_lines(df, params_list, logger=None, index=None):
+    """
+    prepare_plot_data for several lines of the same file, evaluating the subexpressions they share once.
+    Returns a list with (x, y) or the Exception raised for each line.
+    """
+    graph = ExpressionGraph()
+    for params in params_list:
+        if 'x' in params and 'y' in params:
+            graph.add_line(params)
+    evaluator = graph.evaluator(df)
+    results = []
+    for params in params_list:
+        try:
+            results.append(prepare_plot_data(df, params, logger, evaluator, index))
+        except Exception as e:
+            results.append(e)
+    return results
+
+def read_plot_data(file_path, params):
+    """
+    Read only the columns a plot line needs (x, y and anything its expressions reference).
+    Falls back to a full read when an expression is dynamic.
+    """
+    df, _, _, _ = read_data_file(file_path, usecols=required_columns(params), float32=PLOT_FLOAT32)
+    return df
+
+def load_plot_line(file_path, params):
+    """
+    Read and prepare one plot line. Runs in worker processes, so only plain arrays are returned.
+    Compressed files go through the binary cache, so they are decompressed once and not once per line.
+    Returns: (x, y, comments, metadata)
+    """
+    if compression_of(file_path) is not None:
+        from DataManagement.binary_cache import read_cached
+        df, comments, meta, _ = read_cached(file_path, usecols=required_columns(params))
+    else:
+        df, comments, meta, _ = read_data_file(file_path, usecols=required_columns(params), float32=PLOT_FLOAT32)
+    x, y = prepare_plot_data(df, params, logger, index=ColumnIndex())
+    return np.asarray(x), np.asarray(y), comments, meta
+
+def load_file_lines(file_path, params_list):
+    """
+    Read one file once and prepare several plot lines from it, evaluating shared subexpressions once.
+    Runs in worker processes. Returns a list with (x, y) or the Exception raised for each line.
+    """
+    columns = set()
+    for params in params_list:
+        needed = required_columns(params)
+        if needed is None:
+            columns = None
+            break
+        columns.update(needed)
+    usecols = None if columns is None else sorted(columns)
+    if compression_of(file_path) is not None:
+        from DataManagement.binary_cache import read_cached
+        df, _, _, _ = read_cached(file_path, usecols=usecols)
+    else:
+        df, _, _, _ = read_data_file(file_path, usecols=usecols, float32=PLOT_FLOAT32)
+    return [r if isinstance(r, Exception) else (np.asarray(r[0]), np.asarray(r[1]))
+            for r in prepare_plot_lines(df, params_list, logger, ColumnIndex())]
+
+def load_plot_lines(file_paths, params, max_workers=MAX_WORKERS, progress=None):
+    """
+    Read and prepare the same plot line for many files in parallel.
+    progress: optional callable(done, total) called as files complete
+    Returns: dict file_path -> (x, y, comments, metadata) or the Exception raised for that file
+    """
+    results = {}
+    workers = min(len(file_paths), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        for i, fp in enumerate(file_paths):
+            try:
+                results[fp] = load_plot_line(fp, params)
+            except Exception as e:
+                results[fp] = e
+            if progress:
+                progress(i + 1, len(file_paths))
+        return results
+    # spawn: never fork the GUI process
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = {pool.submit(load_plot_line, fp, params): fp for fp in file_paths}
+        for done, future in enumerate(as_completed(futures), start=1):
+            fp = futures[future]
+            try:
+                results[fp] = future.result()
+            except Exception as e:
+                results[fp] = e
+            if progress:
+                progress(done, len(file_paths))
+    return results
+
+class PlotLineJobs:
+    """
+    load_plot_line for many files in spawned worker processes, for callers that must not wait (the GUI polls from a
+    QTimer). Batches are dicts {id, files, params, total, done}; poll() returns (batch, position in files, result) for
+    the files that finished since the last call, result being (x, y, comments, metadata) or the Exception raised.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool = None
+        self._futures = {}  # future: (batch id, position in the batch's files)
+        self.batches = {}
+        self._next_id = 0
+
+    def submit(self, file_paths, params):
+        """Queue one plot line per file. Returns the batch id."""
+        if self._pool is None:
+            # spawn: never fork the GUI process
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+        self._next_id += 1
+        batch = {'id': self._next_id, 'files': list(file_paths), 'params': params, 'total': len(file_paths), 'done': 0}
+        self.batches[batch['id']] = batch
+        for i, fp in enumerate(batch['files']):
+            self._futures[self._pool.submit(load_plot_line, fp, params)] = (batch['id'], i)
+        return batch['id']
+
+    def poll(self):
+        finished = []
+        for future, (batch_id, i) in list(self._futures.items()):
+            if not future.done():
+                continue
+            del self._futures[future]
+            batch = self.batches[batch_id]
+            batch['done'] += 1
+            if future.cancelled():
+                result = RuntimeError("Cancelled")
+            else:
+                result = future.exception() or future.result()
+            finished.append((batch, i, result))
+        for batch_id in {batch['id'] for batch, _, _ in finished}:
+            if self.batches[batch_id]['done'] == self.batches[batch_id]['total']:
+                del self.batches[batch_id]
+        return finished
+
+    def pending(self):
+        return len(self._futures)
+
+    def cancel(self):
+        """Cancel the files that have not started loading."""
+        for future in self._futures:
+            future.cancel()
+
+    def shutdown(self):
+        self.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+class _LegendFields(dict):
+    def __missing__(self, key):
+        return '{' + key + '}'
+
+def format_legend(template, file_path, metadata=None):
+    """
+    Fill a legend template such as "{stem} ({start_time})" from the file name and metadata.
+    Available fields: filename, stem, folder, plus any scalar metadata entry (e.g. start_time). Unknown fields are left as-is.
+    """
+    filename = os.path.basename(file_path)
+    fields = _LegendFields(filename=filename, stem=os.path.splitext(filename)[0], folder=os.path.basename(os.path.dirname(file_path)))
+    if isinstance(metadata, dict):
+        for k, v in metadata.items():
+            if not isinstance(v, (list, dict)):
+                fields.setdefault(k, v)
+    try:
+        return template.format_map(fields)
+    except (ValueError, IndexError):
+        return template
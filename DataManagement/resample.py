@@ -0,0 +1,252 @@
+"""
+Resampling onto a common x grid, so sweeps from different files can be compared or subtracted point by point.
+
+- 'interp': linear interpolation at the grid points. Where x is not monotonic (a field swept up and down), every
+  pass of x through a grid point is interpolated and the passes are averaged.
+- 'mean': the average of the samples in each grid point's bin (bins end halfway between grid points), with
+  np.add.reduceat over sorted x and np.bincount otherwise.
+Rows with NaN in x or y are skipped, grid points with no data are NaN. Resampler accumulates the same results chunk by
+chunk, so a file larger than memory is resampled in one pass over its memory-mapped columns (resample_file).
+"""
+import numpy as np
+import pandas as pd
+from DataManagement.column_index import monotonic_direction, INCREASING, DECREASING
+from localvars import RESAMPLE_CHUNK_ROWS
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+INTERP, MEAN = 'interp', 'mean'
+METHODS = (INTERP, MEAN)
+
+def make_grid(start, stop, step):
+    """Evenly spaced grid from start to stop (included when it falls on the grid)."""
+    start, stop, step = float(start), float(stop), float(step)
+    if step <= 0 or stop < start:
+        raise ValueError(f"Invalid resampling grid {start}:{stop}:{step}")
+    count = int(np.floor((stop - start) / step + 1e-9)) + 1
+    return start + step * np.arange(count)
+
+def check_grid(text):
+    """Raise ValueError unless text is a grid parse_grid accepts for some data (start and stop may be empty)."""
+    parts = [p.strip() for p in str(text).split(':')]
+    if len(parts) != 3 or not parts[2]:
+        raise ValueError(f"Resampling grid must be 'start:stop:step', got '{text}'")
+    try:
+        start, stop, step = [float(p) if p else None for p in parts]
+    except ValueError:
+        raise ValueError(f"Resampling grid must be numbers 'start:stop:step', got '{text}'")
+    if step <= 0 or (start is not None and stop is not None and stop < start):
+        raise ValueError(f"Invalid resampling grid {text}")
+
+def parse_grid(text, x=None):
+    """
+    Grid from "start:stop:step". start and stop may be left empty ("::0.01") to use the finite range of x.
+    """
+    check_grid(text)
+    parts = [p.strip() for p in str(text).split(':')]
+    if not (parts[0] and parts[1]):
+        if x is None:
+            raise ValueError("Resampling grid needs start and stop when there is no data")
+        x = np.asarray(x, dtype=np.float64)
+        finite = x[np.isfinite(x)]
+        if len(finite) == 0:
+            raise ValueError("Cannot resample: x has no finite values")
+        parts[0] = parts[0] or finite.min()
+        parts[1] = parts[1] or finite.max()
+    return make_grid(parts[0], parts[1], parts[2])
+
+def bin_edges(grid):
+    """Bin edges around the grid points: halfway between neighbours, half a step beyond the ends."""
+    grid = np.asarray(grid, dtype=np.float64)
+    if len(grid) < 2:
+        raise ValueError("Resampling grid needs at least two points")
+    middle = (grid[:-1] + grid[1:]) / 2
+    return np.concatenate(([2 * grid[0] - middle[0]], middle, [2 * grid[-1] - middle[-1]]))
+
+def _finite(x, y):
+    """x and y as float64 without the rows where either is NaN (views when there are none)."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    valid = np.isfinite(x) & np.isfinite(y)
+    if valid.all():
+        return x, y
+    return x[valid], y[valid]
+
+def _ascending(x, y):
+    """(x, y) with x ascending if x is monotonic (reversed views for decreasing x), else None."""
+    direction = monotonic_direction(x)
+    if direction == INCREASING:
+        return x, y
+    if direction == DECREASING:
+        return x[::-1], y[::-1]
+    return None
+
+def bin_mean(x, y, grid):
+    """(mean of y in each grid point's bin, number of samples per bin)."""
+    edges = bin_edges(grid)
+    x, y = _finite(x, y)
+    ordered = _ascending(x, y)
+    if ordered is None:
+        sums, counts = _bin_sums(x, y, edges)
+    else:
+        x, y = ordered
+        bounds = np.searchsorted(x, edges, side='left')
+        counts = np.diff(bounds)
+        sums = np.zeros(len(counts))
+        filled = counts > 0
+        if filled.any():
+            # reduceat sums from each start to the next; only the filled bins start a run, and y is cut to the
+            # rows inside the grid, so every run ends at its own bin's edge
+            inside = y[bounds[0]:bounds[-1]]
+            sums[filled] = np.add.reduceat(inside, bounds[:-1][filled] - bounds[0])
+    return _mean(sums, counts), counts
+
+def _bin_sums(x, y, edges):
+    """Per-bin sums and counts of finite x/y in any order."""
+    bins = len(edges) - 1
+    index = np.searchsorted(edges, x, side='right') - 1
+    inside = (index >= 0) & (index < bins)
+    if not inside.all():
+        index, y = index[inside], y[inside]
+    return np.bincount(index, weights=y, minlength=bins), np.bincount(index, minlength=bins)
+
+def _mean(sums, counts):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+def _crossing_sums(x, y, grid):
+    """
+    Per-grid-point sums and counts of finite y linearly interpolated along consecutive (x, y) pairs, one term for
+    every pair whose closed x interval contains the grid point (a grid point hit exactly by a sample counts once per
+    neighbouring pair, with the sample's value).
+    """
+    points = len(grid)
+    xa, xb, ya, yb = x[:-1], x[1:], y[:-1], y[1:]
+    usable = xa != xb
+    low = np.searchsorted(grid, np.minimum(xa, xb), side='left')
+    high = np.searchsorted(grid, np.maximum(xa, xb), side='right')
+    per_pair = np.where(usable, high - low, 0)
+    total = int(per_pair.sum())
+    if total == 0:
+        return np.zeros(points), np.zeros(points, dtype=np.intp)
+    pair = np.repeat(np.arange(len(per_pair)), per_pair)
+    offset = np.arange(total) - np.repeat(np.cumsum(per_pair) - per_pair, per_pair)
+    k = low[pair] + offset
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = (yb - ya) / (xb - xa)
+    values = ya[pair] + (grid[k] - xa[pair]) * slope[pair]
+    return np.bincount(k, weights=values, minlength=points), np.bincount(k, minlength=points)
+
+def interpolate(x, y, grid):
+    """y linearly interpolated at the grid points (NaN outside the data; passes of non-monotonic x are averaged)."""
+    grid = np.asarray(grid, dtype=np.float64)
+    x, y = _finite(x, y)
+    if len(x) == 0:
+        return np.full(len(grid), np.nan)
+    ordered = _ascending(x, y)
+    if ordered is not None:
+        return np.interp(grid, *ordered, left=np.nan, right=np.nan)
+    sums, counts = _crossing_sums(x, y, grid)
+    return _mean(sums, counts)
+
+def resample(x, y, grid, method=INTERP):
+    """y on the grid by interpolation ('interp') or bin averaging ('mean')."""
+    if method == INTERP:
+        return interpolate(x, y, grid)
+    if method == MEAN:
+        return bin_mean(x, y, grid)[0]
+    raise ValueError(f"Unknown resampling method '{method}' (choose from {', '.join(METHODS)})")
+
+class Resampler:
+    """
+    Streaming resample of one or more y columns against a shared x, fed chunk by chunk in row order.
+    Gives the same result as resample() over the concatenated chunks; only the per-grid-point sums are kept.
+    """
+
+    def __init__(self, grid, method=INTERP, columns=1):
+        if method not in METHODS:
+            raise ValueError(f"Unknown resampling method '{method}' (choose from {', '.join(METHODS)})")
+        self.grid = np.asarray(grid, dtype=np.float64)
+        self.method = method
+        self.edges = bin_edges(self.grid) if method == MEAN else None
+        self.sums = [np.zeros(len(self.grid)) for _ in range(columns)]
+        self.counts = [np.zeros(len(self.grid), dtype=np.intp) for _ in range(columns)]
+        self._last = [None] * columns # Last finite (x, y) of each column so far, so pairs spanning chunks are interpolated
+
+    def add(self, x, *ys):
+        """Accumulate a chunk: x and one array per y column, all of the same length."""
+        x = np.asarray(x, dtype=np.float64)
+        ys = [np.asarray(y, dtype=np.float64) for y in ys]
+        if len(ys) != len(self.sums):
+            raise ValueError(f"Expected {len(self.sums)} y columns, got {len(ys)}")
+        if len(x) == 0:
+            return
+        if self.method == MEAN:
+            for i, y in enumerate(ys):
+                sums, counts = _bin_sums(*_finite(x, y), self.edges)
+                self.sums[i] += sums
+                self.counts[i] += counts
+            return
+        for i, y in enumerate(ys):
+            x_i, y_i = _finite(x, y)
+            if len(x_i) == 0:
+                continue
+            last = self._last[i]
+            self._last[i] = (x_i[-1:], y_i[-1:])
+            if last is not None:
+                x_i, y_i = np.concatenate((last[0], x_i)), np.concatenate((last[1], y_i))
+            sums, counts = _crossing_sums(x_i, y_i, self.grid)
+            self.sums[i] += sums
+            self.counts[i] += counts
+
+    def result(self):
+        """([y on the grid] per column, [samples or passes per grid point] per column)."""
+        return [_mean(s, c) for s, c in zip(self.sums, self.counts)], self.counts
+
+def resample_frame(df, x_column, y_columns, grid, method=INTERP, chunk_rows=None, progress=None):
+    """
+    DataFrame of the grid (as x_column) and every y column resampled onto it; with method 'mean' a 'count'
+    column holds the number of samples of the first y column per bin.
+    chunk_rows: process the rows in chunks of this size (for memory-mapped or very large frames); None resamples
+    the whole columns at once. progress: optional callable(fraction, message).
+    """
+    missing = [c for c in [x_column] + list(y_columns) if c not in df.columns]
+    if missing:
+        raise ValueError(f"Column(s) not found: {', '.join(missing)}")
+    grid = np.asarray(grid, dtype=np.float64)
+    n = len(df)
+    columns = {x_column: grid}
+    if chunk_rows and chunk_rows < n:
+        resampler = Resampler(grid, method, len(y_columns))
+        arrays = [df[c].to_numpy() for c in [x_column] + list(y_columns)]
+        for start in range(0, n, chunk_rows):
+            stop = min(start + chunk_rows, n)
+            if progress:
+                progress(start / n, f"Rows {start}-{stop}")
+            resampler.add(*(a[start:stop] for a in arrays))
+        values, counts = resampler.result()
+        columns.update(zip(y_columns, values))
+    else:
+        x = df[x_column].to_numpy()
+        counts = []
+        for name in y_columns:
+            if method == MEAN:
+                mean, count = bin_mean(x, df[name].to_numpy(), grid)
+                columns[name] = mean
+                counts.append(count)
+            else:
+                columns[name] = resample(x, df[name].to_numpy(), grid, method)
+    if method == MEAN and counts:
+        columns['count'] = counts[0]
+    return pd.DataFrame(columns)
+
+def resample_file(file_path, x_column, y_columns, grid, method=INTERP, chunk_rows=RESAMPLE_CHUNK_ROWS, progress=None):
+    """
+    resample_frame over a file of any size: the columns are memory-mapped from the binary cache (built on first use)
+    and streamed chunk_rows rows at a time, so only one chunk is resident.
+    """
+    from DataManagement.binary_cache import read_cached
+    df, _, _, _ = read_cached(file_path, usecols=[x_column] + list(y_columns))
+    logger.debug("Resampling %s (%d rows) onto %d points by %s", file_path, len(df), len(grid), method)
+    return resample_frame(df, x_column, y_columns, grid, method, chunk_rows, progress)
@@ -0,0 +1,86 @@
+"""
+Declared column dtypes for parsed data files.
+
+Every column gets a dtype from (in order) an explicit dtypes argument, DTYPE_MAP (by column name),
+UNIT_DTYPES (by the channel's #P unit in raw files). Undeclared columns keep the numeric dtype they parsed
+as, or become DEFAULT_DTYPE if they did not parse as numbers. Columns are converted after parsing; values that do not parse are rejected row by row (MALFORMED_ROWS) and reported,
+instead of pandas silently turning the whole column into Python objects.
+
+With float32=True (plotting-only loads), columns whose dtype was not declared explicitly as float64 are
+downcast to float32, halving their memory. Declare time-like columns as float64 to keep their resolution.
+"""
+import numpy as np
+import pandas as pd
+from localvars import DTYPE_MAP, UNIT_DTYPES, DEFAULT_DTYPE, MALFORMED_ROWS
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+TEXT_DTYPES = ('str', 'object', 'string')
+MAX_REPORTED_ROWS = 10
+
+def declared_dtypes(columns, metadata=None, dtypes=None):
+    """Declared dtype for each column: {name: dtype string, or None if not declared}."""
+    units = {}
+    if isinstance(metadata, dict) and metadata.get('units'):
+        units = dict(zip(metadata.get('channels', []), metadata['units']))
+    dtypes = dtypes or {}
+    declared = {}
+    for name in columns:
+        declared[name] = dtypes.get(name) or DTYPE_MAP.get(name) or UNIT_DTYPES.get(units.get(name))
+    return declared
+
+def bad_line_collector(bad_lines):
+    """on_bad_lines callable for pd.read_csv (python engine): appends each rejected line's fields and skips it."""
+    def collect(fields):
+        bad_lines.append(fields)
+        return None
+    return collect
+
+def apply_schema(df, declared, float32=False, bad_lines=None):
+    """
+    Convert df's columns to their declared dtypes.
+    Rows with values that cannot be converted are dropped (MALFORMED_ROWS = 'drop') or kept as NaN ('nan').
+    A column in which most values fail to parse is assumed to be text and left alone.
+    Returns: (df, report) with report None if nothing was rejected, else
+    {'rows': rejected row count, 'bad_lines': lines the parser skipped, 'columns': {name: bad values}, 'examples': [row numbers]}
+    """
+    bad = pd.Series(False, index=df.index)
+    bad_columns = {}
+    converted = {}
+    for name in df.columns:
+        dtype = declared.get(name)
+        if dtype in TEXT_DTYPES:
+            continue
+        values = df[name]
+        parsed_numeric = pd.api.types.is_numeric_dtype(values.dtype)
+        if not parsed_numeric:
+            numeric = pd.to_numeric(values, errors='coerce')
+            failed = numeric.isna() & values.notna()
+            n_failed = int(failed.sum())
+            if n_failed * 2 > len(values):
+                logger.debug('Column %s does not look numeric, keeping it as text', name)
+                continue
+            if n_failed:
+                bad |= failed
+                bad_columns[str(name)] = n_failed
+            values = numeric
+        # Undeclared columns that parsed as numbers keep their dtype
+        target = np.dtype(dtype or (values.dtype if parsed_numeric else DEFAULT_DTYPE))
+        if float32 and dtype != 'float64' and target.kind == 'f':
+            target = np.dtype('float32')
+        if target.kind in 'iub' and values.isna().any():
+            target = np.dtype('float64') # Integers cannot hold NaN; keep the rows and the values instead of failing
+        converted[name] = values.astype(target)
+    if converted:
+        df = df.copy(deep=False)
+        for name, values in converted.items():
+            df[name] = values
+    n_lines = len(bad_lines) if bad_lines else 0
+    if not bad_columns and not n_lines:
+        return df, None
+    examples = [int(i) for i in np.flatnonzero(bad.to_numpy())[:MAX_REPORTED_ROWS]]
+    if MALFORMED_ROWS == 'drop' and bad_columns:
+        df = df[~bad.to_numpy()].reset_index(drop=True)
+    report = {'rows': int(bad.sum()) + n_lines, 'bad_lines': n_lines, 'columns': bad_columns, 'examples': examples}
+    return df, report
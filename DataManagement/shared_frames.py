@@ -0,0 +1,188 @@
+"""
+Zero-copy sharing of parsed data between processes.
+
+The owning process publishes a DataFrame (plus its comments/metadata) into multiprocessing.shared_memory
+blocks, one per numeric column, and hands the small, picklable manifest to other processes. They attach to
+the same memory as numpy arrays or a DataFrame view without copying or unpickling the data.
+
+    shared = shared_frames.publish('key', df, comments, metadata)   # owner, refcount 1
+    attached = attach(shared.manifest)                               # any process
+    attached.df, attached.arrays, attached.comments, attached.metadata
+    attached.close()                                                 # attacher is done
+    shared_frames.release('key')                                     # owner: unlinked when the refcount hits 0
+
+Publications are reference counted per key in the owning process, so several consumers of the same file share
+one copy; whatever is still published when the process exits is unlinked.
+"""
+import atexit
+import os
+import sys
+import threading
+from multiprocessing import shared_memory, resource_tracker, parent_process
+import numpy as np
+import pandas as pd
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_VERSION = 1
+
+def _shares_tracker(owner_pid):
+    """True if this process uses the owner's resource tracker (it is the owner or a child it spawned)."""
+    parent = parent_process()
+    return os.getpid() == owner_pid or (parent is not None and parent.pid == owner_pid)
+
+def _open_block(name, owner_pid):
+    """Attach to an existing block without letting this process's resource tracker unlink it on exit."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    if not _shares_tracker(owner_pid):
+        # Before 3.13 attaching registers the block, and an unrelated process's tracker would destroy it at exit
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+class SharedFrame:
+    """Owner side of a published frame. Create with SharedFrame.publish; free with close()."""
+
+    def __init__(self, manifest, blocks, source=None):
+        self.manifest = manifest
+        self.blocks = blocks
+        self.source = source  # Keeps the published frame alive (and its id unique) while shared
+
+    @classmethod
+    def publish(cls, df, comments=None, metadata=None, filetype=None):
+        """Copy the columns of df into shared memory. Non-numeric columns travel inside the manifest."""
+        columns, blocks = [], []
+        try:
+            for name in df.columns:
+                values = df[name].to_numpy()
+                if values.dtype == object or values.nbytes == 0:
+                    columns.append({'name': name, 'values': values})
+                    continue
+                values = np.ascontiguousarray(values)
+                shm = shared_memory.SharedMemory(create=True, size=values.nbytes)
+                blocks.append(shm)
+                np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[...] = values
+                columns.append({'name': name, 'shm': shm.name, 'dtype': values.dtype.str, 'shape': values.shape})
+        except Exception:
+            _release_blocks(blocks, unlink=True)
+            raise
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'owner_pid': os.getpid(),
+            'columns': columns,
+            'comments': comments or [],
+            'metadata': metadata,
+            'filetype': filetype,
+        }
+        return cls(manifest, blocks, df)
+
+    @property
+    def nbytes(self):
+        return sum(shm.size for shm in self.blocks)
+
+    def close(self):
+        """Free the shared memory. Processes still attached keep their mapping until they close it."""
+        _release_blocks(self.blocks, unlink=True)
+        self.blocks, self.source = [], None
+
+class AttachedFrame:
+    """
+    Attacher side: zero-copy views of a published frame.
+    arrays: {column name: numpy array}, df: DataFrame over the same memory. Arrays are read-only unless
+    writable=True, since every process attached to the publication sees the same memory.
+    """
+
+    def __init__(self, manifest, writable=False):
+        if manifest.get('version') != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported shared frame manifest version: {manifest.get('version')}")
+        self.comments = manifest['comments']
+        self.metadata = manifest['metadata']
+        self.filetype = manifest['filetype']
+        self.arrays = {}
+        self._blocks = []
+        try:
+            for col in manifest['columns']:
+                if 'shm' not in col:
+                    self.arrays[col['name']] = col['values']
+                    continue
+                shm = _open_block(col['shm'], manifest['owner_pid'])
+                self._blocks.append(shm)
+                array = np.ndarray(col['shape'], dtype=np.dtype(col['dtype']), buffer=shm.buf)
+                array.flags.writeable = writable
+                self.arrays[col['name']] = array
+        except Exception:
+            self.close()
+            raise
+        self._df = None
+
+    @property
+    def df(self):
+        if self._df is None:
+            self._df = pd.DataFrame(self.arrays, copy=False)
+        return self._df
+
+    def close(self):
+        """Drop the views and unmap the blocks (never frees them; that is the owner's job)."""
+        self.arrays, self._df = {}, None
+        _release_blocks(self._blocks, unlink=False)
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def attach(manifest, writable=False):
+    return AttachedFrame(manifest, writable)
+
+def _release_blocks(blocks, unlink):
+    for shm in blocks:
+        try:
+            shm.close()
+            if unlink:
+                shm.unlink()
+        except (FileNotFoundError, BufferError) as e:
+            logger.debug("Could not release shared memory %s: %s", shm.name, e)
+
+class SharedFrameRegistry:
+    """Reference-counted publications of the owning process, keyed by any hashable key (e.g. a file identity)."""
+
+    def __init__(self):
+        self._frames = {}  # key: [SharedFrame, refcount]
+        self._lock = threading.Lock()
+
+    def publish(self, key, df, comments=None, metadata=None, filetype=None):
+        """Publish df under key, or reuse the existing publication. Each call must be paired with release(key)."""
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is not None:
+                entry[1] += 1
+                return entry[0]
+            shared = SharedFrame.publish(df, comments, metadata, filetype)
+            self._frames[key] = [shared, 1]
+        logger.debug("Published %s (%d bytes)", key, shared.nbytes)
+        return shared
+
+    def release(self, key):
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del self._frames[key]
+        entry[0].close()
+        logger.debug("Unpublished %s", key)
+
+    def clear(self):
+        with self._lock:
+            entries, self._frames = list(self._frames.values()), {}
+        for shared, _ in entries:
+            shared.close()
+
+shared_frames = SharedFrameRegistry()
+atexit.register(shared_frames.clear)
@@ -0,0 +1,129 @@
+"""
+Sweep segmentation: split a column that is swept up and down repeatedly (field, gate voltage) into monotonic branches.
+
+Direction changes are found once per file and column (ColumnIndex.segments caches them next to the sortedness
+information), so selecting "sweep 3, up branch" is a slice of the rows, not a mask over the whole file.
+A reversal only counts once the column has moved back by more than the hysteresis (SWEEP_HYSTERESIS of the
+column's range by default), so noise and holds at the end of a sweep do not start new segments.
+Neighbouring segments share their turning-point row, so every branch reaches its extreme.
+"""
+import numpy as np
+from localvars import SWEEP_HYSTERESIS
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+UP, DOWN = 'up', 'down'
+BRANCHES = (UP, DOWN)
+
+def _runs(values):
+    """(end position, direction) of the runs of rising/falling steps; flat steps continue the current run."""
+    steps = np.sign(np.diff(values))
+    moving = np.flatnonzero(steps)
+    if len(moving) == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.int8)
+    signs = steps[moving]
+    # A run ends where the sign of the next non-flat step differs
+    last = np.flatnonzero(signs[1:] != signs[:-1])
+    ends = np.append(moving[last], moving[-1]) + 1
+    return ends, signs[np.append(last, len(signs) - 1)].astype(np.int8)
+
+def find_segments(values, hysteresis=None):
+    """
+    Monotonic segments of a swept column, as dicts {'segment', 'start', 'stop', 'direction', 'sweep'}:
+    rows start:stop, direction UP or DOWN, 'segment' counts all segments and 'sweep' the segments of the same
+    direction (both from 1). hysteresis: absolute reversal threshold; None uses SWEEP_HYSTERESIS * range.
+    NaN rows are skipped when looking for reversals and stay inside the segment around them.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind not in 'iuf' or len(values) < 2:
+        return []
+    positions = None
+    if values.dtype.kind == 'f':
+        valid = ~np.isnan(values)
+        if not valid.all():
+            positions = np.flatnonzero(valid)
+            values = values[positions]
+            if len(values) < 2:
+                return []
+    if hysteresis is None:
+        hysteresis = SWEEP_HYSTERESIS * float(values.max() - values.min())
+    ends, signs = _runs(values)
+    # Zigzag over the runs (there are far fewer runs than rows): a run against the current direction only turns
+    # the sweep if it ends more than the hysteresis beyond the extreme reached so far
+    turns = []
+    direction, extreme = 0, None
+    lo = hi = 0 # Before the first sweep is established: lowest and highest rows so far
+    for end, sign in zip(ends.tolist(), signs.tolist()):
+        value = values[end]
+        if not direction:
+            lo = end if value < values[lo] else lo
+            hi = end if value > values[hi] else hi
+            if values[hi] - values[0] > hysteresis:
+                direction, extreme = 1, hi
+            elif values[0] - values[lo] > hysteresis:
+                direction, extreme = -1, lo
+            else:
+                continue
+            first = UP if direction > 0 else DOWN
+        if sign == direction:
+            if (value - values[extreme]) * direction > 0:
+                extreme = end
+        elif (values[extreme] - value) * direction > hysteresis:
+            turns.append(extreme)
+            direction, extreme = sign, end
+    if not direction:
+        # Never moved by more than the hysteresis: one segment in the overall direction, if any
+        change = values[-1] - values[0]
+        if change == 0:
+            return []
+        first = UP if change > 0 else DOWN
+    bounds = [0] + turns + [len(values) - 1]
+    if positions is not None:
+        bounds = [int(positions[b]) for b in bounds]
+        bounds[0], bounds[-1] = 0, len(valid) - 1
+    segments = []
+    counts = {UP: 0, DOWN: 0}
+    for i in range(len(bounds) - 1):
+        branch = first if i % 2 == 0 else (DOWN if first == UP else UP)
+        counts[branch] += 1
+        segments.append({'segment': i + 1, 'start': bounds[i], 'stop': bounds[i + 1] + 1,
+                         'direction': branch, 'sweep': counts[branch]})
+    return segments
+
+def select_segments(segments, sweep=None, branch=None):
+    """
+    Segments matching a sweep number and/or branch. With a branch, sweep counts the segments of that branch
+    ("sweep 3, up" is the third up segment); without one it counts all segments.
+    """
+    if branch:
+        if branch not in BRANCHES:
+            raise ValueError(f"Unknown sweep branch '{branch}' (choose from {', '.join(BRANCHES)})")
+        segments = [s for s in segments if s['direction'] == branch]
+    if sweep not in (None, ''):
+        key = 'sweep' if branch else 'segment'
+        segments = [s for s in segments if s[key] == int(sweep)]
+    return segments
+
+def segment_rows(segments):
+    """Rows covered by segments: a slice (zero-copy) for contiguous segments, else an ascending index array."""
+    if not segments:
+        return slice(0, 0)
+    if all(a['stop'] - 1 == b['start'] for a, b in zip(segments, segments[1:])):
+        return slice(segments[0]['start'], segments[-1]['stop'])
+    rows = np.concatenate([np.arange(s['start'], s['stop']) for s in segments])
+    return np.unique(rows) # Neighbouring segments share their turning point
+
+def sweep_params(params):
+    """(column, sweep, branch) requested by plot params, or None when the line is not restricted to sweeps."""
+    sweep, branch = params.get('sweep'), params.get('sweep_branch')
+    if sweep in (None, '') and not branch:
+        return None
+    return params.get('sweep_column') or params.get('x'), sweep, branch or None
+
+def summarize(segments):
+    """Short description such as '3 up, 2 down sweeps'."""
+    if not segments:
+        return "no sweeps"
+    ups = sum(1 for s in segments if s['direction'] == UP)
+    return f"{ups} up, {len(segments) - ups} down sweeps"
@@ -0,0 +1,49 @@
+"""
+Synthetic LabGUI data files for the benchmark suite.
+"""
+import os
+import numpy as np
+from localvars import DATA_DELIMITER
+
+def _channel_names(cols):
+    # First channel is a monotonic time axis, the rest are generic voltages
+    return ['Time'] + [f'V{i}' for i in range(1, cols)]
+
+def _write_rows(f, rows, cols, chunk_rows, seed):
+    rng = np.random.default_rng(seed)
+    written = 0
+    while written < rows:
+        n = min(chunk_rows, rows - written)
+        block = rng.standard_normal((n, cols))
+        block[:, 0] = np.arange(written, written + n, dtype=float) * 0.1
+        f.write('\n'.join(DATA_DELIMITER.join(map(str, row)) for row in block.tolist()))
+        f.write('\n')
+        written += n
+
+def write_raw_file(filepath, rows, cols, chunk_rows=100_000, seed=0):
+    """
+    Write a LabGUI raw file (#C/#I/#P/#T header) with rows x cols of random data.
+    Rows are generated in chunks so files up to 1e8 rows can be produced without holding them in memory.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+    names = _channel_names(cols)
+    with open(filepath, 'w') as f:
+        f.write("#C" + ' '.join(f"'{ch}'" for ch in names) + '\n')
+        f.write("#I" + ' '.join(f"'instrument{i}'" for i in range(cols)) + '\n')
+        f.write("#P" + ' '.join("'s'" if i == 0 else "'V'" for i in range(cols)) + '\n')
+        f.write("#T'1700000000.0'\n")
+        f.write("# Synthetic benchmark file\n")
+        _write_rows(f, rows, cols, chunk_rows, seed)
+    return filepath
+
+def write_processed_file(filepath, rows, cols, chunk_rows=100_000, seed=0):
+    """
+    Write a processed file (comment lines followed by a quoted column header) with rows x cols of random data.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+    names = _channel_names(cols)
+    with open(filepath, 'w') as f:
+        f.write("# Synthetic benchmark file\n")
+        f.write('#' + DATA_DELIMITER.join(f"'{ch}'" for ch in names) + '\n')
+        _write_rows(f, rows, cols, chunk_rows, seed)
+    return filepath
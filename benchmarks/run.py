@@ -0,0 +1,285 @@
+"""
+Benchmark suite for the reader, writer, plotting and processing hot paths.
+
+Run from the repository root:
+    python -m benchmarks.run --rows 1e5 --cols 20 --output bench.json
+    python -m benchmarks.run --rows 1e5 --cols 20 --compare bench.json --threshold 0.2
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# The canvas benchmark must never open a window
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generate import write_raw_file, write_processed_file
+from DataManagement.data_reader import read_data_file
+from DataManagement.data_writer import save_data_file
+
+BENCHMARKS = {}
+
+def benchmark(name):
+    """
+    Register a benchmark. The decorated function receives the context dict and
+    returns the zero-argument callable that is timed.
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+PLOT_PARAMS = {
+    'x': 'Time',
+    'y': 'V1',
+    'calc_y': 'sqrt(y**2 + x**2) / 1e-6',
+    'minx': '1',
+    'mask_exprs': ['abs(y) < 1e7', 'x > 0'],
+}
+
+# Elementwise expression timed with each expression backend (numexpr is skipped when not installed)
+EXPRESSION = PLOT_PARAMS['calc_y']
+
+EXTRACT_PARAMS = {
+    'columns': [
+        {'colname': 'Time'},
+        {'colname': 'V1', 'expression': '*1e3'},
+        {'colname': 'V2', 'expression': 'sqrt(abs(x))', 'collabel': 'sqrtV2'},
+        {'colname': 'V1', 'expression': 'x - x.mean()', 'collabel': 'V1centered'},  # Array methods must keep working
+    ],
+    'file_name': 'bench',
+}
+
+@benchmark('read_raw')
+def bench_read_raw(ctx):
+    return lambda: read_data_file(ctx['raw_file'])
+
+@benchmark('read_raw_projected')
+def bench_read_raw_projected(ctx):
+    return lambda: read_data_file(ctx['raw_file'], usecols=['Time', 'V1'])
+
+@benchmark('read_raw_gzip')
+def bench_read_raw_gzip(ctx):
+    import gzip
+    gz_file = ctx['raw_file'] + '.gz'
+    with open(ctx['raw_file'], 'rb') as src, gzip.open(gz_file, 'wb', compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst)
+    return lambda: read_data_file(gz_file)
+
+@benchmark('read_processed')
+def bench_read_processed(ctx):
+    return lambda: read_data_file(ctx['processed_file'])
+
+@benchmark('save_data_file')
+def bench_save_data_file(ctx):
+    df = ctx['df']
+    outpath = os.path.join(ctx['workdir'], 'saved.dat')
+    return lambda: save_data_file(df, outpath, comments=['benchmark'])
+
+@benchmark('prepare_plot_data')
+def bench_prepare_plot_data(ctx):
+    from DataManagement.plot_data import prepare_plot_data
+    df = ctx['df']
+    return lambda: prepare_plot_data(df, PLOT_PARAMS)
+
+@benchmark('extract_columns_with_math')
+def bench_extract_columns_with_math(ctx):
+    from processing_modules.template_extract_math import ExtractColumnsWithMath
+    df = ctx['df']
+    def run():
+        module = ExtractColumnsWithMath(ctx['raw_file'], ctx['workdir'], dict(EXTRACT_PARAMS), df)
+        module.process()
+        return module.result
+    return run
+
+def _expression_benchmark(ctx, backend_name):
+    from DataManagement.expression_backends import available_backends, make_backend
+    from DataManagement.expressions import ExpressionGraph
+    if backend_name not in available_backends():
+        return None
+    backend = make_backend(backend_name, min_rows=0)
+    arrays = {name: ctx['df'][name].to_numpy() for name in ('Time', 'V1')}
+    graph = ExpressionGraph()
+    tree = graph.add(graph.parse(EXPRESSION, {'x': graph.column('Time'), 'y': graph.column('V1')}))
+    return lambda: graph.evaluator(arrays, backend).value(tree)
+
+@benchmark('expression_numpy')
+def bench_expression_numpy(ctx):
+    return _expression_benchmark(ctx, 'numpy')
+
+@benchmark('expression_chunked')
+def bench_expression_chunked(ctx):
+    return _expression_benchmark(ctx, 'chunked')
+
+@benchmark('expression_numexpr')
+def bench_expression_numexpr(ctx):
+    return _expression_benchmark(ctx, 'numexpr')
+
+def _resample_benchmark(ctx, method, shuffle=False):
+    from DataManagement.resample import make_grid, resample
+    x = ctx['df']['Time'].to_numpy()
+    y = ctx['df']['V1'].to_numpy()
+    if shuffle:
+        order = np.random.default_rng(0).permutation(len(x))
+        x, y = x[order], y[order]
+    grid = make_grid(x.min(), x.max(), (x.max() - x.min()) / 1000)
+    return lambda: resample(x, y, grid, method)
+
+@benchmark('resample_interp')
+def bench_resample_interp(ctx):
+    return _resample_benchmark(ctx, 'interp')
+
+@benchmark('resample_mean')
+def bench_resample_mean(ctx):
+    return _resample_benchmark(ctx, 'mean')
+
+@benchmark('resample_mean_unsorted')
+def bench_resample_mean_unsorted(ctx):
+    return _resample_benchmark(ctx, 'mean', shuffle=True)
+
+@benchmark('canvas_draw')
+def bench_canvas_draw(ctx):
+    from PyQt5.QtWidgets import QApplication
+    import matplotlib.pyplot as plt
+    from gui.mpl_canvas import MplCanvas
+    if shutil.which('latex') is None:
+        plt.rcParams['text.usetex'] = False
+    ctx['qapp'] = QApplication.instance() or QApplication(sys.argv[:1])
+    canvas = MplCanvas(width=8, height=6, dpi=100)
+    df = ctx['df']
+    canvas.axes.plot(df['Time'].values, df['V1'].values, label='V1')
+    canvas.axes.plot(df['Time'].values, df['V2'].values, label='V2')
+    canvas.apply_plot_params({'legend': True, 'grid': True})
+    ctx['canvas'] = canvas  # Keep a reference alive for the duration of the run
+    return canvas.draw
+
+def measure(fn, repeat):
+    """Time fn `repeat` times, then run it once more under tracemalloc for the peak allocation."""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'median_s': statistics.median(times),
+        'min_s': min(times),
+        'max_s': max(times),
+        'peak_mb': peak / 2**20,
+        'repeat': repeat,
+    }
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+def run(rows, cols, repeat=3, only=None, workdir=None):
+    """Generate the synthetic inputs and run the selected benchmarks. Returns the results dict."""
+    cleanup = workdir is None
+    workdir = workdir or tempfile.mkdtemp(prefix='bench_')
+    try:
+        ctx = {'workdir': workdir}
+        ctx['raw_file'] = write_raw_file(os.path.join(workdir, 'raw', 'bench_raw.dat'), rows, cols)
+        ctx['processed_file'] = write_processed_file(os.path.join(workdir, 'processed', 'bench_processed.dat'), rows, cols)
+        ctx['df'], _, _, _ = read_data_file(ctx['raw_file'])
+        results = {}
+        for name, setup in BENCHMARKS.items():
+            if only and name not in only:
+                continue
+            fn = setup(ctx)
+            if fn is None:
+                print(f"Skipping {name} (not available)", file=sys.stderr)
+                continue
+            print(f"Running {name}...", file=sys.stderr)
+            results[name] = measure(fn, repeat)
+        return {
+            'meta': {
+                'revision': _git_revision(),
+                'timestamp': time.time(),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'pandas': pd.__version__,
+                'rows': rows,
+                'cols': cols,
+            },
+            'results': results,
+        }
+    finally:
+        if cleanup:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+def compare(current, baseline, threshold):
+    """
+    Compare two result dicts. A benchmark regresses if its median time or peak memory grew by more than threshold (fractional).
+    Returns a list of (name, metric, baseline, current) regressions.
+    """
+    regressions = []
+    for name, res in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            continue
+        for metric in ('median_s', 'peak_mb'):
+            if base[metric] > 0 and res[metric] > base[metric] * (1 + threshold):
+                regressions.append((name, metric, base[metric], res[metric]))
+    return regressions
+
+def _print_table(current, baseline=None):
+    print(f"{'benchmark':<28}{'median (s)':>12}{'peak (MB)':>12}{'vs base':>10}")
+    for name, res in current['results'].items():
+        ratio = ''
+        if baseline and name in baseline.get('results', {}):
+            base = baseline['results'][name]['median_s']
+            ratio = f"{res['median_s'] / base:.2f}x" if base else ''
+        print(f"{name:<28}{res['median_s']:>12.4f}{res['peak_mb']:>12.1f}{ratio:>10}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=float, default=1e5, help='Rows per synthetic file (1e3-1e8)')
+    parser.add_argument('--cols', type=int, default=20, help='Columns per synthetic file')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed repetitions per benchmark')
+    parser.add_argument('--only', nargs='*', choices=sorted(BENCHMARKS), help='Run only these benchmarks')
+    parser.add_argument('--workdir', help='Directory for generated files (kept); defaults to a temporary directory')
+    parser.add_argument('--output', help='Write results JSON to this path')
+    parser.add_argument('--compare', help='Baseline results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed fractional regression before failing')
+    args = parser.parse_args(argv)
+
+    current = run(int(args.rows), args.cols, repeat=args.repeat, only=args.only, workdir=args.workdir)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+    _print_table(current, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+    if baseline is not None:
+        regressions = compare(current, baseline, args.threshold)
+        for name, metric, base, cur in regressions:
+            print(f"REGRESSION {name} {metric}: {base:.4g} -> {cur:.4g}")
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
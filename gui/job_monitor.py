@@ -0,0 +1,85 @@
+import os
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QListWidget, QListWidgetItem, QMenu
+from PyQt5.QtCore import pyqtSignal, Qt, QTimer
+from DataManagement.module_executor import FINAL_STATES
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+class JobMonitorWidget(QWidget):
+    """
+    Lists the jobs of a ModuleExecutor with their state and progress, and drives the executor:
+    while any job is active it is polled from a timer, so the GUI never waits on a worker.
+    """
+    jobFinished = pyqtSignal(int, str, str)  # job_id, state, message
+    POLL_MS = 100
+
+    def __init__(self, executor, parent=None):
+        super().__init__(parent)
+        self.executor = executor
+        self.list_widget = QListWidget()
+        self.list_widget.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.list_widget.customContextMenuRequested.connect(self._show_context_menu)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.list_widget)
+        self.setLayout(layout)
+        self._items = {}  # job_id: QListWidgetItem
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.POLL_MS)
+        self.timer.timeout.connect(self.poll)
+
+    def submit(self, *args, **kwargs):
+        """Submit a job to the executor (same arguments as ModuleExecutor.submit) and start monitoring it."""
+        job_id = self.executor.submit(*args, **kwargs)
+        item = QListWidgetItem()
+        item.setData(Qt.UserRole, job_id)
+        self.list_widget.addItem(item)
+        self._items[job_id] = item
+        self._update_item(self.executor.jobs[job_id])
+        self.timer.start()
+        return job_id
+
+    def cancel(self, job_id):
+        if self.executor.cancel(job_id):
+            job = self.executor.jobs[job_id]
+            self._update_item(job)
+            self.jobFinished.emit(job.id, job.state, job.message)
+
+    def poll(self):
+        for job, event in self.executor.poll():
+            self._update_item(job)
+            if event in FINAL_STATES:
+                self.jobFinished.emit(job.id, job.state, job.message)
+        for job in self.executor.active():
+            self._update_item(job) # Queued jobs may have started
+        if not self.executor.active():
+            self.timer.stop()
+
+    def _update_item(self, job):
+        item = self._items.get(job.id)
+        if item is None:
+            return
+        text = f"[{job.state}] {job.name} on {os.path.basename(job.input_file)}"
+        if job.state == 'running':
+            text += f" ({job.progress:.0%})"
+        if job.message:
+            text += f": {job.message.splitlines()[0]}"
+        item.setText(text)
+        item.setToolTip(job.message)
+
+    def _show_context_menu(self, pos):
+        item = self.list_widget.itemAt(pos)
+        menu = QMenu(self)
+        if item is not None:
+            job_id = item.data(Qt.UserRole)
+            if self.executor.jobs[job_id].state not in FINAL_STATES:
+                menu.addAction("Cancel job", lambda: self.cancel(job_id))
+        menu.addAction("Clear finished", self.clear_finished)
+        menu.exec_(self.list_widget.viewport().mapToGlobal(pos))
+
+    def clear_finished(self):
+        for job_id, item in list(self._items.items()):
+            if self.executor.jobs[job_id].state in FINAL_STATES:
+                self.list_widget.takeItem(self.list_widget.row(item))
+                del self._items[job_id]
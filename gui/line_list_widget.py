@@ -1,110 +1,267 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QCheckBox, QListWidget, QListWidgetItem, QSizePolicy
-from PyQt5.QtCore import pyqtSignal, Qt
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QListView, QStyledItemDelegate, QStyle, QStyleOptionButton, QApplication, QSizePolicy, QAbstractItemView, QMenu, QColorDialog, QInputDialog
+from PyQt5.QtCore import pyqtSignal, Qt, QAbstractListModel, QModelIndex, QEvent, QRect, QSize
 from logger import get_logger
 
 logger = get_logger(__name__)
 
+LineIdRole = Qt.UserRole + 1
+
+class LineListModel(QAbstractListModel):
+    """
+    Model holding one row per plotted line, addressed by a stable line id.
+    Rows are plain (id, label, visible) records, so adding, toggling and relabelling never touch other rows.
+    Row positions are renumbered lazily: a removal only marks the positions after it as stale, and they are
+    recomputed the next time a line at or after that row is looked up.
+    """
+    visibilityChanged = pyqtSignal(str, bool)  # line_id, visible
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._ids = []      # Row order
+        self._rows = {}     # line_id: row, exact for rows before self._fresh (stale ones are too high)
+        self._fresh = 0     # Rows before this have up-to-date positions in self._rows
+        self._labels = {}   # line_id: label
+        self._visible = {}  # line_id: bool
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._ids)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not (0 <= index.row() < len(self._ids)):
+            return None
+        line_id = self._ids[index.row()]
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return self._labels[line_id]
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if self._visible[line_id] else Qt.Unchecked
+        if role == LineIdRole:
+            return line_id
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.CheckStateRole:
+            return False
+        line_id = self._ids[index.row()]
+        visible = Qt.CheckState(value) == Qt.Checked
+        if self._visible[line_id] != visible:
+            self._visible[line_id] = visible
+            self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+            self.visibilityChanged.emit(line_id, visible)
+        return True
+
+    def row_of(self, line_id):
+        row = self._rows.get(line_id)
+        if row is None:
+            return -1
+        if row >= self._fresh:
+            # Rows only move up, so a stale position is at or after the first stale row: renumber up to the line
+            for i in range(self._fresh, len(self._ids)):
+                self._rows[self._ids[i]] = i
+                if self._ids[i] == line_id:
+                    break
+            self._fresh = i + 1
+            row = self._rows[line_id]
+        return row
+
+    def line_id_at(self, row):
+        return self._ids[row] if 0 <= row < len(self._ids) else None
+
+    def add_line(self, line_id, label, visible=True):
+        row = len(self._ids)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._ids.append(line_id)
+        self._rows[line_id] = row
+        self._labels[line_id] = label
+        self._visible[line_id] = visible
+        self.endInsertRows()
+
+    def remove_line(self, line_id):
+        return self.remove_lines([line_id]) == 1
+
+    def remove_lines(self, line_ids):
+        """Remove many lines, one beginRemoveRows/endRemoveRows per run of adjacent rows. Returns the number removed."""
+        rows = sorted({row for row in map(self.row_of, line_ids) if row >= 0}, reverse=True)
+        if not rows:
+            return 0
+        runs = []
+        for row in rows: # Descending, so removing a run does not move the rows of the runs still to come
+            if runs and runs[-1][0] == row + 1:
+                runs[-1][0] = row
+            else:
+                runs.append([row, row])
+        for first, last in runs:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            for line_id in self._ids[first:last + 1]:
+                del self._rows[line_id], self._labels[line_id], self._visible[line_id]
+            del self._ids[first:last + 1]
+            self.endRemoveRows()
+        self._fresh = min(self._fresh, rows[-1])
+        return len(rows)
+
+    def set_visible(self, line_id, visible):
+        row = self.row_of(line_id)
+        if row < 0:
+            return False
+        if self._visible[line_id] != visible:
+            self._visible[line_id] = visible
+            idx = self.index(row)
+            self.dataChanged.emit(idx, idx, [Qt.CheckStateRole])
+        return True
+
+    def set_label(self, line_id, label):
+        row = self.row_of(line_id)
+        if row < 0:
+            return False
+        self._labels[line_id] = label
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx, [Qt.DisplayRole])
+        return True
+
+    def clear(self):
+        self.beginResetModel()
+        self._ids.clear()
+        self._rows.clear()
+        self._labels.clear()
+        self._visible.clear()
+        self._fresh = 0
+        self.endResetModel()
+
+class LineItemDelegate(QStyledItemDelegate):
+    """Paints the checkbox and label (standard item painting) plus a "Remove" button on the right of each row."""
+    removeClicked = pyqtSignal(QModelIndex)
+    BUTTON_WIDTH = 60
+
+    def _button_rect(self, option):
+        rect = option.rect
+        return QRect(rect.right() - self.BUTTON_WIDTH, rect.top() + 1, self.BUTTON_WIDTH, rect.height() - 2)
+
+    def paint(self, painter, option, index):
+        item_option = type(option)(option)
+        item_option.rect = option.rect.adjusted(0, 0, -self.BUTTON_WIDTH - 4, 0)
+        super().paint(painter, item_option, index)
+        button = QStyleOptionButton()
+        button.rect = self._button_rect(option)
+        button.text = "Remove"
+        button.state = QStyle.State_Enabled
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.CE_PushButton, button, painter)
+
+    def sizeHint(self, option, index):
+        size = super().sizeHint(option, index)
+        return QSize(size.width() + self.BUTTON_WIDTH + 4, max(size.height(), 24))
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and self._button_rect(option).contains(event.pos()):
+            self.removeClicked.emit(index)
+            return True
+        if event.type() in (QEvent.MouseButtonPress, QEvent.MouseButtonDblClick) and self._button_rect(option).contains(event.pos()):
+            return True # Swallow so the button does not also toggle/edit the row
+        item_option = type(option)(option)
+        item_option.rect = option.rect.adjusted(0, 0, -self.BUTTON_WIDTH - 4, 0)
+        return super().editorEvent(event, model, item_option, index)
+
 class LineListWidget(QWidget):
-    showHideToggled = pyqtSignal(int, bool)  # index, visible
-    removeRequested = pyqtSignal(int)        # index
-    editRequested = pyqtSignal(int)          # index (for editing params)
+    showHideToggled = pyqtSignal(str, bool)  # line_id, visible
+    removeRequested = pyqtSignal(str)        # line_id
+    editRequested = pyqtSignal(str)          # line_id (for editing params)
+    bulkVisibilityRequested = pyqtSignal(list, bool)  # line_ids, visible
+    bulkRemoveRequested = pyqtSignal(list)            # line_ids
+    bulkRestyleRequested = pyqtSignal(list, dict)     # line_ids, {color/linestyle/marker}
 
     def __init__(self, parent=None):
         super().__init__(parent)
         logger.debug('LineListWidget initialized')
         self.vbox = QVBoxLayout()
         self.setLayout(self.vbox)
-        self.list_widget = QListWidget()
-        self.vbox.addWidget(self.list_widget)
-        self.line_items = []  # Store (widget, QListWidgetItem)
+        self.model = LineListModel(self)
+        self.delegate = LineItemDelegate(self)
+        self.list_view = QListView()
+        self.list_view.setModel(self.model)
+        self.list_view.setItemDelegate(self.delegate)
+        self.list_view.setUniformItemSizes(True) # Lets the view lay out and paint only the visible rows
+        self.list_view.setEditTriggers(QListView.NoEditTriggers)
+        self.list_view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.list_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.list_view.customContextMenuRequested.connect(self._show_context_menu)
+        self.vbox.addWidget(self.list_view)
         self.vbox.setContentsMargins(0, 0, 0, 0)
-        self.list_widget.itemDoubleClicked.connect(self._on_item_double_clicked)
-        self.list_widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.model.visibilityChanged.connect(self.showHideToggled.emit)
+        self.delegate.removeClicked.connect(lambda index: self.removeRequested.emit(index.data(LineIdRole)))
+        self.list_view.doubleClicked.connect(self._on_item_double_clicked)
+        self.list_view.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.setMinimumSize(0, 0)
         self.vbox.setStretch(0, 0)
 
-    def _bind_signals(self):
-        """
-        Rebind all signals for all items to ensure correct indices after add/remove.
-        Didn't feel like keeping track of the individual buttons so we iterate over them instead until we find them.
-        """
-        for idx, (widget, item) in enumerate(self.line_items):
-            hbox = widget.layout()
-            checkbox = None
-            remove_btn = None
-            for i in range(hbox.count()):
-                w = hbox.itemAt(i).widget()
-                if isinstance(w, QCheckBox):
-                    checkbox = w
-                if isinstance(w, QPushButton) and w.text() == "Remove":
-                    remove_btn = w
-            # Defensive: only bind if found
-            if checkbox is not None:
-                try:
-                    checkbox.toggled.disconnect()
-                except Exception:
-                    pass
-                checkbox.toggled.connect(lambda checked, i=idx: self.showHideToggled.emit(i, checked))
-            if remove_btn is not None:
-                try:
-                    remove_btn.clicked.disconnect()
-                except Exception:
-                    pass
-                remove_btn.clicked.connect(lambda _, i=idx: self.removeRequested.emit(i))
-
-    def add_line(self, label, visible=True):
-        logger.debug(f'Adding line: {label}, visible={visible}')
-        widget = QWidget()
-        hbox = QHBoxLayout()
-        hbox.setContentsMargins(0, 0, 0, 0)
-        checkbox = QCheckBox()
-        checkbox.setChecked(visible)
-        hbox.addWidget(checkbox)
-        lbl = QLabel(label)
-        hbox.addWidget(lbl)
-        hbox.addStretch(1)
-        remove_btn = QPushButton("Remove")
-        remove_btn.setMaximumWidth(60)
-        hbox.addWidget(remove_btn)
-        widget.setLayout(hbox)
-        item = QListWidgetItem()
-        self.list_widget.addItem(item)
-        self.list_widget.setItemWidget(item, widget)
-        item.setSizeHint(widget.sizeHint())
-        idx = self.list_widget.count() - 1
-        self.line_items.append((widget, item))
-        self._bind_signals()
-        logger.info(f'Line added: {label}')
-
-    def _on_item_double_clicked(self, item):
-        idx = self.list_widget.row(item)
-        logger.debug(f'Double-clicked line idx={idx}')
-        self.editRequested.emit(idx)
-
-    def remove_line(self, idx):
-        logger.debug(f'Removing line idx={idx}')
-        if 0 <= idx < len(self.line_items):
-            _, item = self.line_items.pop(idx)
-            self.list_widget.takeItem(idx)
-            logger.info(f'Line removed idx={idx}')
-            self._bind_signals()
+    def selected_ids(self):
+        return [index.data(LineIdRole) for index in self.list_view.selectionModel().selectedIndexes()]
+
+    def all_ids(self):
+        return [self.model.line_id_at(row) for row in range(self.model.rowCount())]
+
+    def _show_context_menu(self, pos):
+        ids = self.selected_ids()
+        all_ids = self.all_ids()
+        menu = QMenu(self)
+        if ids:
+            menu.addAction(f"Show selected ({len(ids)})", lambda: self.bulkVisibilityRequested.emit(ids, True))
+            menu.addAction(f"Hide selected ({len(ids)})", lambda: self.bulkVisibilityRequested.emit(ids, False))
+            menu.addAction("Set color of selected...", lambda: self._request_color(ids))
+            menu.addAction("Set line style of selected...", lambda: self._request_linestyle(ids))
+            menu.addAction(f"Remove selected ({len(ids)})", lambda: self.bulkRemoveRequested.emit(ids))
+            menu.addSeparator()
+        menu.addAction("Show all", lambda: self.bulkVisibilityRequested.emit(all_ids, True))
+        menu.addAction("Hide all", lambda: self.bulkVisibilityRequested.emit(all_ids, False))
+        menu.exec_(self.list_view.viewport().mapToGlobal(pos))
+
+    def _request_color(self, ids):
+        color = QColorDialog.getColor(parent=self, title="Choose Color")
+        if color.isValid():
+            self.bulkRestyleRequested.emit(ids, {'color': color.name()})
+
+    def _request_linestyle(self, ids):
+        linestyle, ok = QInputDialog.getItem(self, "Line Style", "Line style:", ['-', '--', '-.', ':', 'None'], 0, False)
+        if ok:
+            self.bulkRestyleRequested.emit(ids, {'linestyle': linestyle})
+
+    def add_line(self, line_id, label, visible=True):
+        logger.debug('Adding line: %s (%s), visible=%s', label, line_id, visible)
+        self.model.add_line(line_id, label, visible)
+        logger.info('Line added: %s', label)
+
+    def _on_item_double_clicked(self, index):
+        line_id = index.data(LineIdRole)
+        logger.debug('Double-clicked line id=%s', line_id)
+        self.editRequested.emit(line_id)
+
+    def remove_line(self, line_id):
+        logger.debug('Removing line id=%s', line_id)
+        if self.model.remove_line(line_id):
+            logger.info('Line removed id=%s', line_id)
         else:
-            logger.error(f'Tried to remove invalid line idx={idx}')
-    
-
-    def set_line_visible(self, idx, visible):
-        logger.debug(f'Setting line idx={idx} visible={visible}')
-        if 0 <= idx < len(self.line_items):
-            widget, item = self.line_items[idx]
-            checkbox = widget.layout().itemAt(0).widget()
-            checkbox.setChecked(visible)
-            logger.info(f'Line visibility set idx={idx} visible={visible}')
+            logger.error('Tried to remove invalid line id=%s', line_id)
+
+    def remove_lines(self, line_ids):
+        removed = self.model.remove_lines(line_ids)
+        logger.info('Removed %d of %d lines', removed, len(line_ids))
+
+    def set_line_visible(self, line_id, visible):
+        logger.debug('Setting line id=%s visible=%s', line_id, visible)
+        if self.model.set_visible(line_id, visible):
+            logger.info('Line visibility set id=%s visible=%s', line_id, visible)
         else:
-            logger.error(f'Tried to set visibility for invalid line idx={idx}')
+            logger.error('Tried to set visibility for invalid line id=%s', line_id)
+
+    def set_line_label(self, line_id, label):
+        if not self.model.set_label(line_id, label):
+            logger.error('Tried to set label for invalid line id=%s', line_id)
 
     def clear(self):
         logger.debug('Clearing all lines from LineListWidget')
-        self.list_widget.clear()
-        self.line_items.clear()
-        logger.info('All lines cleared from LineListWidget') 
\ No newline at end of file
+        self.model.clear()
+        logger.info('All lines cleared from LineListWidget')
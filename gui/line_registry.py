@@ -0,0 +1,149 @@
+import uuid
+from collections import OrderedDict
+from DataManagement.data_reader import file_identity
+from DataManagement.memory_manager import resident_nbytes
+from DataManagement.minmax_pyramid import decimate_minmax
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+STYLE_KEYS = ('color', 'linestyle', 'marker')
+
+class LineRegistry:
+    """
+    Ordered registry of plotted lines keyed by a stable line id (uuid hex).
+    Each entry is a dict: {id, file, source, params, comments, line, x, y, decimated}
+    - line: the matplotlib artist
+    - x, y: the prepared arrays the artist was drawn from (so redraws never re-read the file)
+    - source: file identity (path, mtime, size) the arrays were computed from
+    - decimated: True once x, y were reduced to min/max samples to stay within the memory budget
+    Lookup, insertion and removal are O(1); iteration follows insertion order.
+    """
+
+    def __init__(self):
+        self._lines = OrderedDict()
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __iter__(self):
+        return iter(self._lines.values())
+
+    def __contains__(self, line_id):
+        return line_id in self._lines
+
+    def __getitem__(self, line_id):
+        return self._lines[line_id]
+
+    def get(self, line_id, default=None):
+        return self._lines.get(line_id, default)
+
+    def ids(self):
+        return list(self._lines.keys())
+
+    def items(self):
+        return self._lines.items()
+
+    def add(self, file_path, params, line, x=None, y=None, comments=None, line_id=None):
+        line_id = line_id or uuid.uuid4().hex
+        try:
+            source = file_identity(file_path)
+        except OSError:
+            source = None
+        self._lines[line_id] = {
+            'id': line_id,
+            'file': file_path,
+            'source': source,
+            'params': params,
+            'comments': comments or [],
+            'line': line,
+            'x': x,
+            'y': y,
+            'decimated': False,
+        }
+        return line_id
+
+    def update(self, line_id, **fields):
+        if 'x' in fields:
+            fields.setdefault('decimated', False)
+        self._lines[line_id].update(fields)
+
+    def remove(self, line_id):
+        """Remove a line and its artist. Returns the removed entry, or None if it does not exist."""
+        info = self._lines.pop(line_id, None)
+        if info is not None and info['line'] is not None:
+            try:
+                info['line'].remove()
+            except Exception as e:
+                logger.error(f"Error removing line: {e}")
+        return info
+
+    def remove_many(self, line_ids):
+        return [info for info in (self.remove(line_id) for line_id in line_ids) if info is not None]
+
+    def clear(self):
+        self.remove_many(self.ids())
+
+    def set_visible_many(self, line_ids, visible):
+        changed = []
+        for line_id in line_ids:
+            info = self._lines.get(line_id)
+            if info is not None and info['line'] is not None:
+                info['line'].set_visible(visible)
+                changed.append(line_id)
+        return changed
+
+    def restyle_many(self, line_ids, style, apply_style):
+        """
+        Merge style (subset of color/linestyle/marker) into each line's params and apply it to the artist
+        with apply_style(artist, params). Returns the ids that were restyled.
+        """
+        style = {k: v for k, v in style.items() if k in STYLE_KEYS}
+        changed = []
+        for line_id in line_ids:
+            info = self._lines.get(line_id)
+            if info is None:
+                continue
+            info['params'] = {**info['params'], **style}
+            if info['line'] is not None:
+                apply_style(info['line'], info['params'])
+            changed.append(line_id)
+        return changed
+
+    def is_stale(self, line_id):
+        """True if the source file changed since the cached arrays were computed."""
+        info = self._lines[line_id]
+        try:
+            return info['source'] != file_identity(info['file'])
+        except OSError:
+            return True
+
+    def memory_report(self):
+        """(kind, label, file, arrays) for every line, for the memory manager."""
+        for info in list(self._lines.values()):
+            yield 'line', info['line'].get_label() if info['line'] is not None else info['id'], info['file'], (info['x'], info['y'])
+
+    def decimate(self, excess, points, skip=None):
+        """
+        Replace the arrays of the largest lines (and their artists' data) with min/max decimated ones until about
+        `excess` bytes are freed. skip(artist) -> True excludes a line (e.g. one drawn from pyramids).
+        Returns the ids of the decimated lines.
+        """
+        candidates = []
+        for info in self._lines.values():
+            if info['decimated'] or info['x'] is None or (skip is not None and info['line'] is not None and skip(info['line'])):
+                continue
+            nbytes = resident_nbytes(info['x']) + resident_nbytes(info['y'])
+            if nbytes and len(info['x']) > points:
+                candidates.append((nbytes, info))
+        changed, freed = [], 0
+        for nbytes, info in sorted(candidates, key=lambda item: -item[0]):
+            if freed >= excess:
+                break
+            x, y = decimate_minmax(info['x'], info['y'], points)
+            info['x'], info['y'], info['decimated'] = x, y, True
+            if info['line'] is not None:
+                info['line'].set_data(x, y)
+            freed += nbytes - x.nbytes - y.nbytes
+            changed.append(info['id'])
+        return changed
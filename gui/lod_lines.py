@@ -0,0 +1,58 @@
+import weakref
+from logger import get_logger
+from tracing import span
+
+logger = get_logger(__name__)
+
+class LodLineManager:
+    """
+    Keeps pyramid-backed lines (see DataManagement.minmax_pyramid.LodSource) at screen resolution.
+    Whenever an axes' x limits change (zoom, pan, shared x), the lines on it and on the axes sharing its x
+    are re-sampled from their pyramids for the new range and the axes' pixel width.
+    """
+
+    def __init__(self):
+        self._sources = weakref.WeakKeyDictionary()  # Line2D: LodSource
+        self._connected = weakref.WeakKeyDictionary()  # Axes: callback id
+
+    def attach(self, line, source):
+        """Register a line and set its data for the current view."""
+        ax = line.axes
+        self._sources[line] = source
+        if ax not in self._connected:
+            self._connected[ax] = ax.callbacks.connect('xlim_changed', self._on_xlim_changed)
+        x, y = source.envelope(None, self._pixels(ax))
+        line.set_data(x, y)
+
+    def detach(self, line):
+        self._sources.pop(line, None)
+
+    def is_lod(self, line):
+        return line in self._sources
+
+    def view_arrays(self, line, dpi):
+        """
+        (x, y) of a pyramid-backed line over its axes' current x range, at the resolution of the axes rendered at
+        dpi, or None if the line is not pyramid-backed. Only the envelope is returned, never the full columns.
+        """
+        source = self._sources.get(line)
+        if source is None or line.axes is None:
+            return None
+        ax = line.axes
+        pixels = max(int(ax.figure.get_figwidth() * ax.get_position().width * dpi), 100)
+        return source.envelope(ax.get_xlim(), pixels)
+
+    @staticmethod
+    def _pixels(ax):
+        return max(int(ax.bbox.width), 100)
+
+    def _on_xlim_changed(self, ax):
+        axes = ax.get_shared_x_axes().get_siblings(ax)
+        with span('lod_update'):
+            for line, source in list(self._sources.items()):
+                if line.axes is None:
+                    self._sources.pop(line, None) # Removed or its axes was cleared
+                    continue
+                if line.axes in axes:
+                    x, y = source.envelope(line.axes.get_xlim(), self._pixels(line.axes))
+                    line.set_data(x, y)
@@ -2,84 +2,41 @@ import sys
 from PyQt5.QtWidgets import QApplication, QMainWindow, QDialog
 from gui.mpl_canvas import MplCanvas
 from gui.plot_dialog import PlotParamDialog
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTreeView, QFileSystemModel, QTabWidget, QAction, QFileDialog, QMenuBar, QListWidget, QListWidgetItem, QMessageBox, QDockWidget, QLabel, QSizePolicy, QPushButton, QInputDialog, QMenu)
-from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTreeView, QFileSystemModel, QTabWidget, QAction, QFileDialog, QMenuBar, QListWidget, QListWidgetItem, QMessageBox, QDockWidget, QLabel, QSizePolicy, QPushButton, QInputDialog, QMenu, QAbstractItemView, QProgressDialog)
+from PyQt5.QtCore import Qt, QTimer
 import os
-from DataManagement.data_reader import read_data_file
-import pandas as pd
+import threading
+from DataManagement.binary_cache import read_header
+from DataManagement.ingest import ingest_directory, format_stats
+from DataManagement.plot_data import PlotLineJobs, format_legend
+from DataManagement.data_cache import data_cache
+from DataManagement.minmax_pyramid import lod_source
+from DataManagement.pipeline import load_pipeline, run_pipeline
+from DataManagement.module_executor import ModuleExecutor, DONE
+from DataManagement.memory_manager import memory_manager, format_bytes
 from gui.param_widget import ParamWidget
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 import matplotlib.pyplot as plt
-import numpy as np
 import json
+from contextlib import contextmanager
 from gui.line_list_widget import LineListWidget
+from gui.line_registry import LineRegistry
+from gui.lod_lines import LodLineManager
+from gui.job_monitor import JobMonitorWidget
+from gui.memory_panel import MemoryPanel
 from logger import get_logger
+from tracing import dump_trace, enable_trace, trace_enabled
 import logging
-from localvars import RAW_DATA_DIR, PREPROCESSED_DATA_DIR, POSTPROCESSED_DATA_DIR, PLOTS_DIR, DEFAULT_PLOT_CONFIG, DEFAULT_PLOT_SAVE, PROCESSING_MODULES_DIR
+from localvars import LOG_LEVEL, PYRAMID_MIN_POINTS, MEMORY_DECIMATED_POINTS, RAW_DATA_DIR, PREPROCESSED_DATA_DIR, POSTPROCESSED_DATA_DIR, PLOTS_DIR, DEFAULT_PLOT_CONFIG, DEFAULT_PLOT_SAVE, PROCESSING_MODULES_DIR, EXPORT_DPI, PLOT_FLOAT32
 from gui.processing_dialog import ProcessingDialog
+from rendering import ExportJobs, EXPORT_FORMATS, DONE as EXPORT_DONE, draw_snapshot, line_label
 
 logger = get_logger(__name__)
 
-def prepare_plot_data(df, params, logger=None):
-    """
-    Given a DataFrame and params dict, return processed x, y arrays for plotting.
-    Handles calculation fields, min/max masks, and custom mask expressions.
-    """
-    if 'x' not in params or 'y' not in params:
-        raise ValueError("x and y must be specified in params")
-    x = df[params['x']]
-    y = df[params['y']]
-    if x is None or y is None:
-        raise ValueError("x and y must be valid columns in the DataFrame")
-    # Calculation for x
-    if 'calc_x' in params:
-        np_env = {k: getattr(np, k) for k in dir(np) if not k.startswith('_')}
-        local_env = {'x': x, 'y': y}
-        local_env.update(np_env)
-        try:
-            x = eval(params['calc_x'], {"__builtins__": {}}, local_env)
-        except Exception as e:
-            if logger:
-                logger.error(f"X calculation error: {params['calc_x']}: {e}")
-    # Calculation for y
-    if 'calc_y' in params:
-        np_env = {k: getattr(np, k) for k in dir(np) if not k.startswith('_')}
-        local_env = {'x': x, 'y': y}
-        local_env.update(np_env)
-        try:
-            y = eval(params['calc_y'], {"__builtins__": {}}, local_env)
-        except Exception as e:
-            if logger:
-                logger.error(f"Y calculation error: {params['calc_y']}: {e}")
-    mask = np.ones(len(x), dtype=bool)
-    if 'minx' in params:
-        mask &= x >= float(params['minx'])
-    if 'maxx' in params:
-        mask &= x <= float(params['maxx'])
-    if 'miny' in params:
-        mask &= y >= float(params['miny'])
-    if 'maxy' in params:
-        mask &= y <= float(params['maxy'])
-    # Custom mask expressions
-    if 'mask_exprs' in params:
-        np_env = {k: getattr(np, k) for k in dir(np) if not k.startswith('_')}
-        local_env = {'x': x, 'y': y}
-        local_env.update(np_env)
-        for expr in params['mask_exprs']:
-            try:
-                mask_expr = eval(expr, {"__builtins__": {}}, local_env)
-                mask &= mask_expr
-            except Exception as e:
-                if logger:
-                    logger.error(f"Mask expression error: {expr}: {e}")
-    x = x[mask]
-    y = y[mask]
-    return x, y
-
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.verbosity = 'DEBUG'  # Can be set to INFO, WARNING, etc.
+        self.verbosity = LOG_LEVEL  # Can be set to INFO, WARNING, etc.
         logger.setLevel(getattr(logging, self.verbosity, logging.DEBUG))
         logger.debug('MainWindow initialized with verbosity %s', self.verbosity)
         self.setWindowTitle("Corbino Analysis GUI")
@@ -104,6 +61,7 @@ class MainWindow(QMainWindow):
         self.raw_tree.setColumnWidth(0, 250)
         self.raw_tree.setHeaderHidden(True)
         self.raw_tree.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Expanding)
+        self.raw_tree.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.tabs.addTab(self._make_tab_widget(self.raw_tree, "Raw Data"), "Raw Data")
 
         # Preprocessed Data tab (inserted between Raw and Postprocessed)
@@ -117,6 +75,7 @@ class MainWindow(QMainWindow):
         self.pre_tree.setColumnWidth(0, 250)
         self.pre_tree.setHeaderHidden(True)
         self.pre_tree.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Expanding)
+        self.pre_tree.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.tabs.insertTab(1, self._make_tab_widget(self.pre_tree, "Preprocessed Data"), "Preprocessed Data")
 
         # Postprocessed Data tab
@@ -130,6 +89,7 @@ class MainWindow(QMainWindow):
         self.post_tree.setColumnWidth(0, 250)
         self.post_tree.setHeaderHidden(True)
         self.post_tree.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Expanding)
+        self.post_tree.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.tabs.addTab(self._make_tab_widget(self.post_tree, "Postprocessed Data"), "Postprocessed Data")
 
         # Data Browser Dock
@@ -159,11 +119,30 @@ class MainWindow(QMainWindow):
         self.line_list_widget.showHideToggled.connect(self.toggle_line_visibility)
         self.line_list_widget.removeRequested.connect(self.remove_plot_line)
         self.line_list_widget.editRequested.connect(self.edit_line_params)
-        #self.line_list_widget.list_widget.itemDoubleClicked.connect(self._on_item_double_clicked)
+        self.line_list_widget.bulkVisibilityRequested.connect(self.set_lines_visible)
+        self.line_list_widget.bulkRemoveRequested.connect(self.remove_plot_lines)
+        self.line_list_widget.bulkRestyleRequested.connect(self.restyle_plot_lines)
         self.lines_dock = QDockWidget("Plotted Lines", self)
         self.lines_dock.setWidget(self.line_list_widget)
         self.addDockWidget(Qt.BottomDockWidgetArea, self.lines_dock)
 
+        # Processing jobs dock (modules run in worker processes)
+        self.executor = ModuleExecutor()
+        self.job_monitor = JobMonitorWidget(self.executor)
+        self.job_monitor.jobFinished.connect(self._on_job_finished)
+        self.jobs_dock = QDockWidget("Processing Jobs", self)
+        self.jobs_dock.setWidget(self.job_monitor)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.jobs_dock)
+        self.tabifyDockWidget(self.lines_dock, self.jobs_dock)
+
+        # Memory diagnostics dock
+        self.memory_panel = MemoryPanel(memory_manager)
+        self.memory_dock = QDockWidget("Memory", self)
+        self.memory_dock.setWidget(self.memory_panel)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.memory_dock)
+        self.tabifyDockWidget(self.jobs_dock, self.memory_dock)
+        self.lines_dock.raise_()
+
         # Parameter controls widget (already dockable)
         self.param_widget = ParamWidget(current_params=None)
         self.addDockWidget(Qt.RightDockWidgetArea, self.param_widget)
@@ -176,7 +155,33 @@ class MainWindow(QMainWindow):
         self.plot_dock.raise_()
 
         # Store plot info
-        self.plotted_lines = []  # List of dicts: {file, params, line}
+        self.plotted_lines = LineRegistry()  # line_id: {id, file, source, params, comments, line, x, y}
+        self._batch_depth = 0
+        self._batch_panels = set()  # Panels touched inside batch_update; None entry means the whole figure
+        self.lod_lines = LodLineManager()  # Very long lines drawn from min/max pyramids at screen resolution
+
+        # Memory accounting: totals in the status bar, budget enforced from the GUI thread once a second
+        memory_manager.register('plotted_lines', self.plotted_lines.memory_report, self._reclaim_line_memory, priority=1)
+        self.memory_label = QLabel()
+        self.statusBar.addPermanentWidget(self.memory_label)
+        self.memory_timer = QTimer(self)
+        self.memory_timer.setInterval(1000)
+        self.memory_timer.timeout.connect(self._update_memory_status)
+        self.memory_timer.start()
+
+        # Figure exports render in worker processes; finished jobs are collected by a timer while any are pending
+        self.exports = ExportJobs()
+        self._export_progress = None
+        self.export_timer = QTimer(self)
+        self.export_timer.setInterval(200)
+        self.export_timer.timeout.connect(self._poll_exports)
+
+        # Batch plots load in worker processes too; lines are added in file order as they arrive
+        self.plot_jobs = PlotLineJobs()
+        self._plot_batches = {}  # batch id: {'results' (position: result), 'next', 'errors'}
+        self.plot_timer = QTimer(self)
+        self.plot_timer.setInterval(100)
+        self.plot_timer.timeout.connect(self._poll_plot_batches)
 
         # Connect file tree double-clicks
         self.raw_tree.doubleClicked.connect(lambda idx: self.handle_file_double_click(idx, 'raw'))
@@ -222,7 +227,31 @@ class MainWindow(QMainWindow):
         append_cfg_action.triggered.connect(self.append_plot_config)
         file_menu.addAction(append_cfg_action)
 
+        batch_export_action = QAction("Export Plot Configurations...", self)
+        batch_export_action.triggered.connect(self.export_plot_configs)
+        file_menu.addAction(batch_export_action)
+
+        ingest_action = QAction("Ingest Directory...", self)
+        ingest_action.triggered.connect(lambda: self.ingest_directory())
+        file_menu.addAction(ingest_action)
+
+        # Performance tracing
+        trace_action = QAction("Record Performance Trace", self)
+        trace_action.setCheckable(True)
+        trace_action.setChecked(trace_enabled())
+        trace_action.toggled.connect(enable_trace)
+        edit_menu.addAction(trace_action)
+        dump_trace_action = QAction("Export Performance Trace", self)
+        dump_trace_action.triggered.connect(self.export_performance_trace)
+        edit_menu.addAction(dump_trace_action)
+
+        # Subplot grid
+        layout_action = QAction("Subplot Layout...", self)
+        layout_action.triggered.connect(self.choose_subplot_layout)
+        edit_menu.addAction(layout_action)
+
     def save_plot(self):
+        """Render the current figure to a file in a worker process; the window stays usable meanwhile."""
         options = QFileDialog.Options()
         # Ensure plots directory exists
         if not os.path.exists(PLOTS_DIR):
@@ -231,11 +260,91 @@ class MainWindow(QMainWindow):
             self,
             "Save Plot As",
             DEFAULT_PLOT_SAVE,
-            "PDF Files (*.pdf);;PNG Files (*.png);;JPEG Files (*.jpg);;All Files (*)",
+            "PDF Files (*.pdf);;PNG Files (*.png);;SVG Files (*.svg);;JPEG Files (*.jpg);;All Files (*)",
             options=options
         )
         if file_path:
-            self.canvas.figure.savefig(file_path)
+            self.exports.submit(self.plot_snapshot(), file_path)
+            self.set_status_message(f"Exporting plot to {file_path}...")
+            self.export_timer.start()
+
+    def plot_snapshot(self):
+        """
+        Picklable copy of the current figure for rendering.render_figure: the visible lines' prepared arrays
+        (never re-read from disk), the global params, each panel's current (zoomed/panned) limits, the subplot
+        layout and the text rendering mode. Pyramid-backed lines contribute their envelope over the current view
+        at EXPORT_DPI rather than their full columns.
+        """
+        lines = []
+        for info in self.plotted_lines:
+            if info['line'] is not None and not info['line'].get_visible():
+                continue
+            view = self.lod_lines.view_arrays(info['line'], EXPORT_DPI) if info['line'] is not None else None
+            if view is not None:
+                x, y = view
+            else:
+                x, y = info['x'], info['y']
+            if x is None or (view is None and info['decimated']):
+                x, y = data_cache.plot_arrays(info['file'], info['params'])
+            label = info['line'].get_label() if info['line'] is not None else line_label(info['file'], info['params'])
+            lines.append({'x': x, 'y': y, 'label': label, 'params': info['params']})
+        return {
+            'layout': {'rows': self.canvas.nrows, 'cols': self.canvas.ncols, 'sharex': self.canvas.sharex},
+            'global_params': dict(self.global_params),
+            'views': [{'xlim': tuple(map(float, ax.get_xlim())), 'ylim': tuple(map(float, ax.get_ylim()))} for ax in self.canvas.axes_list],
+            'lines': lines,
+            'size': tuple(self.canvas.figure.get_size_inches()),
+            'dpi': EXPORT_DPI,
+            'rc': {'text.usetex': plt.rcParams['text.usetex']},
+        }
+
+    def export_plot_configs(self):
+        """Render many saved plot configurations to figures in worker processes, with a cancellable progress dialog."""
+        config_paths, _ = QFileDialog.getOpenFileNames(self, "Export Plot Configurations", DEFAULT_PLOT_CONFIG, "JSON Files (*.json)")
+        if not config_paths:
+            return
+        output_dir = QFileDialog.getExistingDirectory(self, "Output Directory", PLOTS_DIR)
+        if not output_dir:
+            return
+        formats = sorted(set(EXPORT_FORMATS.values()))
+        fmt, ok = QInputDialog.getItem(self, "Export Format", "Format:", formats, formats.index('pdf'), False)
+        if not ok:
+            return
+        rc = {'text.usetex': plt.rcParams['text.usetex']}
+        for config_path in config_paths:
+            stem = os.path.splitext(os.path.basename(config_path))[0]
+            self.exports.submit_config(config_path, os.path.join(output_dir, f"{stem}.{fmt}"), fmt, rc)
+        progress = QProgressDialog(f"Exporting {len(config_paths)} plots...", "Cancel", 0, len(config_paths), self)
+        progress.setWindowTitle("Export Plot Configurations")
+        progress.setMinimumDuration(0)
+        progress.canceled.connect(self.exports.cancel)
+        self._export_progress = {'dialog': progress, 'total': len(config_paths), 'done': 0, 'failed': []}
+        self.export_timer.start()
+
+    def _poll_exports(self):
+        for job in self.exports.poll():
+            batch = self._export_progress
+            if batch is not None and job['source'] != 'snapshot':
+                batch['done'] += 1
+                if job['state'] != EXPORT_DONE:
+                    batch['failed'].append(f"{os.path.basename(job['source'])}: {job['error'] or job['state']}")
+                batch['dialog'].setValue(batch['done'])
+                batch['dialog'].setLabelText(f"Exported {batch['done']}/{batch['total']} plots")
+            elif job['state'] == EXPORT_DONE:
+                self.set_status_message(f"Saved plot to {job['path']} ({job['elapsed']:.1f} s)", 5000)
+            else:
+                QMessageBox.warning(self, "Save Plot", f"Could not save {job['path']}:\n{job['error'] or job['state']}")
+                self.clear_status_message()
+        if self.exports.pending():
+            return
+        self.export_timer.stop()
+        batch, self._export_progress = self._export_progress, None
+        if batch is not None:
+            batch['dialog'].reset()
+            self.set_status_message(f"Exported {batch['done'] - len(batch['failed'])}/{batch['total']} plots", 10000)
+            if batch['failed']:
+                QMessageBox.warning(self, "Export Plot Configurations", f"{len(batch['failed'])} plots could not be exported:\n" +
+                                    '\n'.join(batch['failed'][:20]))
 
     def _make_tab_widget(self, tree, label):
         widget = QWidget()
@@ -259,25 +368,34 @@ class MainWindow(QMainWindow):
         if os.path.isdir(file_path):
             return
         try:
-            df, comments, meta, ftype = read_data_file(file_path)
+            columns, comments, _, _ = read_header(file_path)
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Could not read file:\n{file_path}\n{e}")
             return
-        columns = list(df.columns)
-        self._last_file_info = {'comments': comments, 'meta': meta, 'filetype': ftype, 'file_path': file_path, 'df': df}
-        dialog = PlotParamDialog(columns, parent=self, comments=comments)
-        dialog.paramsSelected.connect(lambda params, fp=file_path, d=df: self.add_plot_line(fp, d, params, comments))
+        dialog = PlotParamDialog(columns, parent=self, comments=comments, panels=self.canvas.panel_count(),
+                                 sweeps=lambda column, fp=file_path: data_cache.sweep_segments(fp, column))
+        dialog.paramsSelected.connect(lambda params, fp=file_path: self._read_and_add_plot_line(fp, params, comments))
         dialog.exec_()
 
-    def add_plot_line(self, file_path, df, params, comments):
-        logger.debug(f"Adding plot line for file: {file_path}, params: {params}")
+    def _read_and_add_plot_line(self, file_path, params, comments):
         self.set_status_message("Adding plot line...")
         try:
-            x, y = prepare_plot_data(df, params, logger)
+            x, y = data_cache.plot_arrays(file_path, params)
         except Exception as e:
             logger.error(f"Error preparing plot data for file: {file_path}, params: {params}, error: {e}")
             QMessageBox.warning(self, "Error", f"Could not prepare plot data for file:\n{file_path}\n{e}")
+            self.clear_status_message()
             return
+        self._plot_line(file_path, x, y, params, comments)
+        self._refresh_canvas([params.get('panel', 0)])
+        rejected = data_cache.rejected_rows(file_path)
+        if rejected:
+            self.set_status_message(f"Skipped {rejected['rows']} malformed rows in {os.path.basename(file_path)}", 10000)
+        else:
+            self.clear_status_message()
+
+    def _plot_line(self, file_path, x, y, params, comments):
+        """Create the artist and register the line, without redrawing the canvas."""
         if 'legend' in params:
             label = params['legend']
         else:
@@ -289,64 +407,196 @@ class MainWindow(QMainWindow):
             plot_kwargs['linestyle'] = params['linestyle']
         if 'marker' in params:
             plot_kwargs['marker'] = params['marker']
-        
-        line, = self.canvas.axes.plot(x, y, label=label, **plot_kwargs)
+
+        line = self._plot_artist(self.canvas.get_axes(params.get('panel', 0)), file_path, x, y, params, label=label, **plot_kwargs)
         self.canvas.set_line_style_and_color(line, params)
-        self.canvas.apply_plot_params(self.global_params) # Reapply global params
-        self.canvas.figure.tight_layout()
-        self.canvas.draw()
-        line_info = {'file': file_path, 'params': params, 'line': line, 'comments': comments}
-        self.plotted_lines.append(line_info)
-        self.line_list_widget.add_line(label, visible=True)
-        logger.info(f"Plot line added: {label}")
-        self.clear_status_message()
+        line_id = self.plotted_lines.add(file_path, params, line, x=x, y=y, comments=comments)
+        self.line_list_widget.add_line(line_id, label, visible=True)
+        logger.info("Plot line added: %s", label)
+        return line_id
 
-    def edit_line_params(self, idx):
-        logger.debug(f"Editing line params idx={idx}")
-        if 0 <= idx < len(self.plotted_lines):
-            line_info = self.plotted_lines[idx]
+    def _plot_artist(self, ax, file_path, x, y, params, **kwargs):
+        """Plot x, y on ax. Lines long enough to have min/max pyramids are drawn at screen resolution instead."""
+        source = lod_source(file_path, params) if len(x) >= PYRAMID_MIN_POINTS else None
+        if source is None:
+            line, = ax.plot(x, y, **kwargs)
+            return line
+        line, = ax.plot([], [], **kwargs)
+        self.lod_lines.attach(line, source)
+        return line
+
+    @contextmanager
+    def batch_update(self):
+        """Group several line operations into a single canvas update."""
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                panels, self._batch_panels = self._batch_panels, set()
+                self._refresh_canvas(None if None in panels or not panels else panels)
+
+    def _refresh_canvas(self, panels=None):
+        """
+        Reapply global params and redraw. panels: panel indices whose lines changed; None refreshes the whole figure
+        (and re-runs tight_layout). Panel refreshes are scheduled, so several in a row cost one render.
+        """
+        if self._batch_depth:
+            # The outermost batch_update redraws once at the end
+            self._batch_panels.update([None] if panels is None else panels)
+            return
+        if panels is None:
+            self.canvas.apply_plot_params(self.global_params) # Reapply global params
+            self.canvas.figure.tight_layout()
+            self.canvas.draw()
+            return
+        self.canvas.apply_plot_params(self.global_params, panels)
+        for panel in panels:
+            self.canvas.schedule_redraw(panel)
+
+    def _line_panel(self, line_id):
+        return self.canvas.panel_index(self.plotted_lines[line_id]['params'].get('panel', 0))
+
+    def choose_subplot_layout(self):
+        rows, ok1 = QInputDialog.getInt(self, "Subplot Layout", "Rows:", self.canvas.nrows, 1, 8)
+        if not ok1:
+            return
+        cols, ok2 = QInputDialog.getInt(self, "Subplot Layout", "Columns:", self.canvas.ncols, 1, 8)
+        if not ok2:
+            return
+        self.set_subplot_layout(rows, cols)
+
+    def set_subplot_layout(self, nrows, ncols=1, sharex=True):
+        """Rebuild the canvas as an nrows x ncols grid and re-plot every line into its panel from cached arrays."""
+        logger.debug("Setting subplot layout to %dx%d (sharex=%s)", nrows, ncols, sharex)
+        self.canvas.set_grid(nrows, ncols, sharex)
+        self.redraw_plot()
+        self._refresh_canvas()
+
+    def plot_files_batch(self, file_paths):
+        """Open one PlotParamDialog and apply its params to every file in file_paths."""
+        columns = None
+        for fp in file_paths:
+            try:
+                cols, _, _, _ = read_header(fp)
+            except Exception as e:
+                logger.warning(f"Could not read header of {fp}: {e}")
+                continue
+            # Only offer columns every file has
+            columns = cols if columns is None else [c for c in columns if c in cols]
+        if not columns:
+            QMessageBox.warning(self, "Error", "The selected files have no columns in common.")
+            return
+        dialog = PlotParamDialog(columns, parent=self, default_legend='{filename}', panels=self.canvas.panel_count())
+        dialog.paramsSelected.connect(lambda params, fps=list(file_paths): self.add_plot_lines_batch(fps, params))
+        dialog.exec_()
+
+    def add_plot_lines_batch(self, file_paths, params):
+        """Parse all files in worker processes without blocking the window; lines are added as they arrive."""
+        batch_id = self.plot_jobs.submit(list(file_paths), params)
+        self._plot_batches[batch_id] = {'results': {}, 'next': 0, 'errors': []}
+        self.set_status_message(f"Loading {len(file_paths)} files...")
+        self.plot_timer.start()
+
+    def _poll_plot_batches(self):
+        finished = self.plot_jobs.poll()
+        if finished:
+            touched = {}
+            for batch, i, res in finished:
+                self._plot_batches[batch['id']]['results'][i] = res
+                touched[batch['id']] = batch
+            with self.batch_update():
+                for batch_id, batch in touched.items():
+                    self._add_batch_lines(self._plot_batches[batch_id], batch['files'], batch['params'])
+            for batch_id, batch in touched.items():
+                state = self._plot_batches[batch_id]
+                if batch['done'] < batch['total']:
+                    self.set_status_message(f"Loaded {batch['done']}/{batch['total']} files...")
+                    continue
+                del self._plot_batches[batch_id]
+                self.clear_status_message()
+                if state['errors']:
+                    QMessageBox.warning(self, "Error", "Could not plot some files:\n" + '\n'.join(state['errors']))
+        if not self.plot_jobs.pending():
+            self.plot_timer.stop()
+
+    def _add_batch_lines(self, state, files, params):
+        """Plot the loaded files of a batch that are next in file order (so colours follow the selection order)."""
+        results = state['results']
+        while state['next'] in results:
+            fp = files[state['next']]
+            res = results.pop(state['next'])
+            state['next'] += 1
+            if isinstance(res, Exception) or res is None:
+                logger.error("Error preparing plot data for file: %s, params: %s, error: %s", fp, params, res)
+                state['errors'].append(f"{fp}: {res}")
+                continue
+            x, y, comments, meta = res
+            if not PLOT_FLOAT32:
+                # Workers read float32 when PLOT_FLOAT32 is on; those must not be cached where plot_arrays keeps float64
+                data_cache.put_plot_arrays(fp, params, x, y)
+            line_params = dict(params)
+            line_params['legend'] = format_legend(params.get('legend', '{filename}'), fp, meta if isinstance(meta, dict) else None)
+            self._plot_line(fp, x, y, line_params, comments)
+
+    def edit_line_params(self, line_id):
+        logger.debug("Editing line params id=%s", line_id)
+        if line_id in self.plotted_lines:
+            line_info = self.plotted_lines[line_id]
             file_path = line_info['file']
             params = line_info['params']
             comments = line_info.get('comments', [])
             try:
-                df, _, _, _ = read_data_file(file_path)
+                columns, _, _, _ = read_header(file_path)
             except Exception as e:
                 logger.error(f"Could not read file {file_path}: {e}")
                 QMessageBox.warning(self, "Error", f"Could not read file:\n{file_path}\n{e}")
                 return
-            columns = list(df.columns)
-            dialog = PlotParamDialog(columns, current_params=params, parent=self, comments=comments)
-            dialog.paramsSelected.connect(lambda new_params, fp=file_path, d=df, idx=idx: self.update_plot_line(fp, d, new_params, idx))
+            dialog = PlotParamDialog(columns, current_params=params, parent=self, comments=comments, panels=self.canvas.panel_count(),
+                                     sweeps=lambda column, fp=file_path: data_cache.sweep_segments(fp, column))
+            dialog.paramsSelected.connect(lambda new_params, fp=file_path, line_id=line_id: self._read_and_update_plot_line(fp, new_params, line_id))
             dialog.exec_()
 
-    def update_plot_line(self, file_path, df, params, idx):
-        logger.debug(f"Updating plot line idx={idx}, file={file_path}, params={params}")
+    def _read_and_update_plot_line(self, file_path, params, line_id):
         self.set_status_message("Updating plot line...")
         try:
-            x, y = prepare_plot_data(df, params, logger)
+            x, y = data_cache.plot_arrays(file_path, params)
         except Exception as e:
             logger.error(f"Error preparing updated plot data for file: {file_path}, params: {params}, error: {e}")
             QMessageBox.warning(self, "Error", f"Could not prepare updated plot data for file:\n{file_path}\n{e}")
+            self.clear_status_message()
             return
-        line = self.plotted_lines[idx]['line']
-        line.set_xdata(x)
-        line.set_ydata(y)
+        self._update_plot_line_arrays(file_path, x, y, params, line_id)
+
+    def _update_plot_line_arrays(self, file_path, x, y, params, line_id):
+        if line_id not in self.plotted_lines:
+            logger.error(f"Error updating line: {line_id} does not exist")
+            return
+        old_panel = self._line_panel(line_id)
+        new_panel = self.canvas.panel_index(params.get('panel', 0))
+        line = self.plotted_lines[line_id]['line']
+        if new_panel != old_panel or self.lod_lines.is_lod(line) or len(x) >= PYRAMID_MIN_POINTS:
+            # Replace the artist (new panel, or drawn from pyramids)
+            visible = line.get_visible()
+            self.lod_lines.detach(line)
+            line.remove()
+            line = self._plot_artist(self.canvas.get_axes(new_panel), file_path, x, y, params, color=line.get_color())
+            line.set_visible(visible)
+        else:
+            line.set_xdata(x)
+            line.set_ydata(y)
         if 'legend' in params:
             line.set_label(params['legend'])
         else:
             line.set_label(f"{params['y']} vs {params['x']}")
-        self.plotted_lines[idx]['params'] = params
-        self.plotted_lines[idx]['line'] = line
+        self.plotted_lines.update(line_id, params=params, line=line, x=x, y=y)
         # Update label in custom widget
         
         self.canvas.set_line_style_and_color(line, params)
-        # TODO: make this better?
-        self.line_list_widget.list_widget.itemWidget(self.line_list_widget.list_widget.item(idx)).layout().itemAt(1).widget().setText(line.get_label())
-        self.canvas.axes.relim()
-        self.canvas.apply_plot_params(self.global_params)
-        self.canvas.figure.tight_layout()
-        self.canvas.draw()
-        logger.info(f"Plot line updated at idx={idx}")
+        self.line_list_widget.set_line_label(line_id, line.get_label())
+        self._refresh_canvas(sorted({old_panel, new_panel}))
+        logger.info("Plot line updated id=%s", line_id)
         self.clear_status_message()
         
 
@@ -369,22 +619,24 @@ class MainWindow(QMainWindow):
 
     def redraw_plot(self):
         logger.debug("Redrawing plot with current plotted_lines.")
-        self.canvas.axes.clear()
+        for ax in self.canvas.axes_list:
+            ax.clear()
         for line_info in self.plotted_lines:
-            try:
-                df, _, _, _ = read_data_file(line_info['file'])
-            except Exception as e:
-                logger.error(f"Error reading file {line_info['file']}: {e}")
-                continue
             params = line_info['params']
-            try:
-                x, y = prepare_plot_data(df, params, logger)
-            except Exception as e:
-                logger.error(f"Error redrawing plot data for file: {line_info['file']}, params: {params}, error: {e}")
-                QMessageBox.warning(self, "Error", f"Could not redraw plot data for file:\n{line_info['file']}\n{e}")
-                continue
+            if line_info['x'] is not None and not self.plotted_lines.is_stale(line_info['id']):
+                # Cached arrays are still valid for the file on disk
+                x, y = line_info['x'], line_info['y']
+            else:
+                try:
+                    x, y = data_cache.plot_arrays(line_info['file'], params)
+                except Exception as e:
+                    logger.error(f"Error redrawing plot data for file: {line_info['file']}, params: {params}, error: {e}")
+                    QMessageBox.warning(self, "Error", f"Could not redraw plot data for file:\n{line_info['file']}\n{e}")
+                    continue
+                self.plotted_lines.add(line_info['file'], params, None, x=x, y=y, comments=line_info['comments'], line_id=line_info['id'])
+                line_info = self.plotted_lines[line_info['id']]
             label = params.get('legend', line_info['file'])
-            line, = self.canvas.axes.plot(x, y, label=label)
+            line = self._plot_artist(self.canvas.get_axes(params.get('panel', 0)), line_info['file'], x, y, params, label=label)
             line_info['line'] = line
             self.canvas.set_line_style_and_color(line, params)
         logger.info("Plot redrawn.")
@@ -419,58 +671,22 @@ class MainWindow(QMainWindow):
         h, ok2 = QInputDialog.getDouble(self, "Figure Height", "Height (inches):", 6.0, 1.0, 30.0, 1)
         if not (ok1 and ok2):
             return
-        fig, ax = plt.subplots(figsize=(w, h))
-        for line_info in self.plotted_lines:
-            df, _, _, _ = read_data_file(line_info['file'])
-            params = line_info['params']
-            try:
-                x, y = prepare_plot_data(df, params, logger)
-            except Exception as e:
-                logger.error(f"Error preparing for export plot data for file: {line_info['file']}, params: {params}, error: {e}")
-                QMessageBox.warning(self, "Error", f"Could not prepare for export plot data for file:\n{line_info['file']}\n{e}")
-                continue
-            label = params.get('legend', line_info['file'])
-            plot_kwargs = {}
-            if 'color' in params:
-                plot_kwargs['color'] = params['color']
-            if 'linestyle' in params:
-                plot_kwargs['linestyle'] = params['linestyle']
-            if 'marker' in params:
-                plot_kwargs['marker'] = params['marker']
-            ax.plot(x, y, label=label, **plot_kwargs)
-        # Apply global params
-        global_params = self.canvas.get_plot_params()
-        ax.set_title(global_params.get('title', ''))
-        ax.set_xlabel(global_params.get('xlabel', ''))
-        ax.set_ylabel(global_params.get('ylabel', ''))
-        xlim = global_params.get('xlim', (None, None))
-        if xlim and xlim[0] is not None and xlim[1] is not None:
-            ax.set_xlim(xlim)
-        ylim = global_params.get('ylim', (None, None))
-        if ylim and ylim[0] is not None and ylim[1] is not None:
-            ax.set_ylim(ylim)
-        if global_params.get('grid', False):
-            ax.grid(True)
-        if global_params.get('legend', True):
-            ax.legend()
-        xticks = global_params.get('xticks', '')
-        if xticks:
-            try:
-                xtick_vals = [float(x.strip()) for x in xticks.split(',') if x.strip()]
-                ax.set_xticks(xtick_vals)
-            except Exception:
-                pass
-        yticks = global_params.get('yticks', '')
-        if yticks:
-            try:
-                ytick_vals = [float(y.strip()) for y in yticks.split(',') if y.strip()]
-                ax.set_yticks(ytick_vals)
-            except Exception:
-                pass
-        fig.tight_layout()
+        # Drawn from the lines' prepared arrays, so nothing is re-read or recomputed
+        fig = plt.figure(figsize=(w, h))
+        draw_snapshot(fig, self.plot_snapshot())
         plt.show()
         self.clear_status_message()
 
+    def export_performance_trace(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Performance Trace", "trace.json", "JSON Files (*.json)")
+        if not file_path:
+            return
+        try:
+            dump_trace(file_path)
+            self.set_status_message(f"Exported performance trace to {file_path}", 5000)
+        except Exception as e:
+            self.set_status_message(f"Trace export failed: {e}", 5000)
+
     def export_plot_config(self):
         self.set_status_message("Exporting plot configuration...")
         from PyQt5.QtWidgets import QFileDialog
@@ -487,7 +703,8 @@ class MainWindow(QMainWindow):
                     'comments': line.get('comments', [])
                 } for line in self.plotted_lines
             ],
-            'global_params': self.global_params
+            'global_params': self.global_params,
+            'layout': {'rows': self.canvas.nrows, 'cols': self.canvas.ncols, 'sharex': self.canvas.sharex},
         }
         try:
             with open(file_path, 'w') as f:
@@ -497,16 +714,24 @@ class MainWindow(QMainWindow):
             self.set_status_message(f"Export failed: {e}", 5000)
 
 
-    def __add_plot_line_from_config(self, line_info):
-        file = line_info['file']
-        params = line_info['params']
-        comments = line_info.get('comments', [])
-        try:
-            df, _, _, _ = read_data_file(file)
-        except Exception as e:
-            logger.error(f"Could not read file {file}: {e}")
-            return
-        self.add_plot_line(file, df, params, comments)
+    def __add_plot_lines_from_config(self, lines):
+        """Plot config lines in order. Lines of the same file are prepared together (see DataCache.plot_arrays_many)."""
+        by_file = {}
+        for i, line_info in enumerate(lines):
+            by_file.setdefault(line_info['file'], []).append(i)
+        arrays = {}
+        for file, indices in by_file.items():
+            for i, result in zip(indices, data_cache.plot_arrays_many(file, [lines[i]['params'] for i in indices])):
+                arrays[i] = result
+        for i, line_info in enumerate(lines):
+            file = line_info['file']
+            params = line_info['params']
+            if isinstance(arrays[i], Exception):
+                logger.error(f"Could not read file {file}: {arrays[i]}")
+                continue
+            x, y = arrays[i]
+            self._plot_line(file, x, y, params, line_info.get('comments', []))
+            self._refresh_canvas([params.get('panel', 0)])
 
     def import_plot_config(self):
         self.set_status_message("Importing plot configuration...")
@@ -519,18 +744,14 @@ class MainWindow(QMainWindow):
             with open(file_path, 'r') as f:
                 config = json.load(f)
             # Clear current plot
-            self.canvas.axes.clear()
             self.line_list_widget.clear()
-            self.plotted_lines = []
-            # Restore lines
-            for line_info in config.get('plotted_lines', []):
-                self.__add_plot_line_from_config(line_info)
-            # Restore global params
-            global_params = config.get('global_params', {})
-            self.global_params = global_params
-            self.canvas.apply_plot_params(global_params)
-            self.canvas.figure.tight_layout()
-            self.canvas.draw()
+            self.plotted_lines.clear() # In place: the memory manager reports on this registry
+            layout = config.get('layout', {})
+            self.canvas.set_grid(layout.get('rows', 1), layout.get('cols', 1), layout.get('sharex', True))
+            # Restore lines and global params with a single redraw
+            with self.batch_update():
+                self.__add_plot_lines_from_config(config.get('plotted_lines', []))
+                self.global_params = config.get('global_params', {})
             self.update_param_widget_fields_from_plot()
             self.set_status_message(f"Imported plot configuration from {file_path}", 5000)
         except Exception as e:
@@ -546,15 +767,10 @@ class MainWindow(QMainWindow):
         try:
             with open(file_path, 'r') as f:
                 config = json.load(f)
-            # Restore lines
-            for line_info in config.get('plotted_lines', []):
-                self.__add_plot_line_from_config(line_info)
-            # Restore global params
-            global_params = config.get('global_params', {})
-            self.global_params = global_params
-            self.canvas.apply_plot_params(global_params)
-            self.canvas.figure.tight_layout()
-            self.canvas.draw()
+            # Restore lines and global params with a single redraw
+            with self.batch_update():
+                self.__add_plot_lines_from_config(config.get('plotted_lines', []))
+                self.global_params = config.get('global_params', {})
             self.update_param_widget_fields_from_plot()
             self.set_status_message(f"Appended plot configuration from {file_path}", 5000)
         except Exception as e:
@@ -569,37 +785,43 @@ class MainWindow(QMainWindow):
     def clear_status_message(self):
         self.statusBar.clearMessage()
 
-    def toggle_line_visibility(self, idx, visible):
-        logger.debug(f"Toggling line visibility idx={idx}, visible={visible}")
-        if 0 <= idx < len(self.plotted_lines):
-            line = self.plotted_lines[idx]['line']
-            line.set_visible(visible)
-            self.canvas.draw()
-            logger.info(f"Line visibility toggled idx={idx}, visible={visible}")
+    def toggle_line_visibility(self, line_id, visible):
+        logger.debug("Toggling line visibility id=%s, visible=%s", line_id, visible)
+        if self.plotted_lines.set_visible_many([line_id], visible):
+            self.canvas.schedule_redraw(self._line_panel(line_id))
+            logger.info("Line visibility toggled id=%s, visible=%s", line_id, visible)
         else:
-            logger.error(f"Error toggling line visibility: {idx} is out of range")
+            logger.error(f"Error toggling line visibility: {line_id} does not exist")
 
-    def remove_plot_line(self, idx):
-        logger.debug(f"Removing plot line idx={idx}")
-        if 0 <= idx < len(self.plotted_lines):
-            line = self.plotted_lines[idx]['line']
-            try:
-                line.remove()
-            except Exception as e:
-                logger.error(f"Error removing line: {e}")
-            self.plotted_lines.pop(idx)
-            self.line_list_widget.remove_line(idx)
-            self.redraw_plot()
-            self.canvas.apply_plot_params(self.global_params)
-            self.canvas.figure.tight_layout()
-            self.canvas.draw()
-            logger.info(f"Plot line removed idx={idx}")
+    def set_lines_visible(self, line_ids, visible):
+        """Show or hide many lines with one canvas update."""
+        changed = self.plotted_lines.set_visible_many(line_ids, visible)
+        for line_id in changed:
+            self.line_list_widget.set_line_visible(line_id, visible)
+            self.canvas.schedule_redraw(self._line_panel(line_id))
+
+    def remove_plot_line(self, line_id):
+        logger.debug("Removing plot line id=%s", line_id)
+        panel = self._line_panel(line_id) if line_id in self.plotted_lines else None
+        if self.plotted_lines.remove(line_id) is not None:
+            self.line_list_widget.remove_line(line_id)
+            self._refresh_canvas([panel])
+            logger.info("Plot line removed id=%s", line_id)
         else:
-            logger.error(f"Error removing line: {idx} is out of range")
+            logger.error(f"Error removing line: {line_id} does not exist")
+
+    def remove_plot_lines(self, line_ids):
+        """Remove many lines with one canvas update."""
+        with self.batch_update():
+            removed = self.plotted_lines.remove_many(line_ids)
+            self.line_list_widget.remove_lines([info['id'] for info in removed])
+            self._refresh_canvas(sorted({self.canvas.panel_index(info['params'].get('panel', 0)) for info in removed}))
 
-    #def _on_item_double_clicked(self, item):
-    #    idx = self.line_list_widget.list_widget.row(item)
-    #    self.edit_line_params(idx)
+    def restyle_plot_lines(self, line_ids, style):
+        """Apply a style dict (color/linestyle/marker) to many lines with one canvas update."""
+        with self.batch_update():
+            changed = self.plotted_lines.restyle_many(line_ids, style, self.canvas.set_line_style_and_color)
+            self._refresh_canvas(sorted({self._line_panel(line_id) for line_id in changed}))
 
     def _setup_file_tree_context_menu(self):
         self.raw_tree.setContextMenuPolicy(Qt.CustomContextMenu)
@@ -624,25 +846,37 @@ class MainWindow(QMainWindow):
             logging.error(f"Invalid tree type: {tree_type}")
             return
         file_path = model.filePath(index)
+        menu = QMenu()
         if os.path.isdir(file_path):
+            ingest_action = QAction('Ingest directory...', self)
+            ingest_action.triggered.connect(lambda: self.ingest_directory(file_path))
+            menu.addAction(ingest_action)
+            menu.exec_(tree.viewport().mapToGlobal(pos))
             return
-        menu = QMenu()
+        selected = [model.filePath(i) for i in tree.selectionModel().selectedRows(0)]
+        selected = [fp for fp in selected if not os.path.isdir(fp)]
+        if len(selected) > 1:
+            batch_action = QAction(f'Plot {len(selected)} selected files...', self)
+            batch_action.triggered.connect(lambda: self.plot_files_batch(selected))
+            menu.addAction(batch_action)
+            menu.addSeparator()
         preprocess_action = QAction('Preprocess with...', self)
         postprocess_action = QAction('Postprocess with...', self)
         preprocess_action.triggered.connect(lambda: self._run_processing_dialog(file_path, 'pre'))
         postprocess_action.triggered.connect(lambda: self._run_processing_dialog(file_path, 'post'))
         menu.addAction(preprocess_action)
         menu.addAction(postprocess_action)
+        pipeline_action = QAction('Run pipeline...', self)
+        pipeline_action.triggered.connect(lambda: self._run_pipeline(file_path))
+        menu.addAction(pipeline_action)
         menu.exec_(tree.viewport().mapToGlobal(pos))
 
     def _run_processing_dialog(self, file_path, mode):
         # Load columns for dropdowns using data_reader
         self.set_status_message(f"Waiting on processing dialog for {file_path} in {mode} mode...")
         columns = []
-        df = None
         try:
-            df, _, _, _ = read_data_file(file_path)
-            columns = list(df.columns)
+            columns, _, _, _ = read_header(file_path)
         except Exception as e:
             logger.warning(f'Could not read columns from {file_path}: {e}')
         try:
@@ -652,27 +886,139 @@ class MainWindow(QMainWindow):
                 if module_name is None:
                     logger.warning(f"No module selected for {file_path} in {mode} mode")
                     raise Exception("No module selected")
-                logger.info(f"Processing {file_path} with {module_name} in {mode} mode...")
-                self.set_status_message(f"Processing {file_path} with {module_name} in {mode} mode...")
                 # Determine output dir based on mode
                 if mode == 'pre':
                     output_dir = PREPROCESSED_DATA_DIR
                 else:
                     output_dir = POSTPROCESSED_DATA_DIR
-                module = module_cls(file_path, output_dir, params, df)
-                try:
-                    module.load()
-                    module.process()
-                    module.save()
-                    QMessageBox.information(self, "Processing Complete", f"Processing complete. Output saved to {output_dir}")
-                except Exception as e:
-                    QMessageBox.warning(self, "Processing Error", str(e))
+                df, _, _, _ = data_cache.get_frame(file_path)
+                # Runs in a worker process; the result is reported through the Processing Jobs dock
+                self.job_monitor.submit(module_cls, file_path, output_dir, params, df)
+                logger.info("Submitted %s with %s in %s mode", file_path, module_name, mode)
+                self.jobs_dock.raise_()
+                self.set_status_message(f"Processing {os.path.basename(file_path)} with {module_name} in the background...", 5000)
+                return
         except Exception as e:
             QMessageBox.critical(self, "Dialog Error", str(e))
             #raise e
 
         self.clear_status_message()
 
+    def _on_job_finished(self, job_id, state, message):
+        job = self.executor.jobs[job_id]
+        if state == DONE:
+            self.set_status_message(f"{job.name} on {os.path.basename(job.input_file)}: {message}", 5000)
+        else:
+            QMessageBox.warning(self, "Processing Error", f"{job.name} on {job.input_file} {state}:\n{message}")
+
+    def _update_memory_status(self):
+        if memory_manager.budget is not None and memory_manager.total() > memory_manager.budget:
+            memory_manager.enforce()
+        records = memory_manager.usage()
+        total = memory_manager.totals(records)['total']
+        budget = f" / {format_bytes(memory_manager.budget)}" if memory_manager.budget else ""
+        self.memory_label.setText(f"Memory: {format_bytes(total)}{budget}")
+        if self.memory_dock.isVisible() and not self.memory_dock.visibleRegion().isEmpty():
+            self.memory_panel.refresh(records)
+
+    def _reclaim_line_memory(self, excess):
+        """Memory manager reclaimer: keep only min/max decimated arrays for the largest plotted lines."""
+        changed = self.plotted_lines.decimate(excess, MEMORY_DECIMATED_POINTS, skip=self.lod_lines.is_lod)
+        if changed:
+            self._refresh_canvas(sorted({self._line_panel(line_id) for line_id in changed}))
+            self.set_status_message(f"Memory budget exceeded: {len(changed)} lines reduced to {MEMORY_DECIMATED_POINTS} points", 10000)
+
+    def closeEvent(self, event):
+        self.memory_timer.stop()
+        memory_manager.unregister('plotted_lines')
+        self.executor.shutdown()
+        self.export_timer.stop()
+        self.exports.shutdown()
+        self.plot_timer.stop()
+        self.plot_jobs.shutdown()
+        super().closeEvent(event)
+
+    def ingest_directory(self, directory=None):
+        """Binary-cache every data file under a directory in worker processes, with a cancellable progress dialog."""
+        if directory is None:
+            directory = QFileDialog.getExistingDirectory(self, "Ingest Directory", RAW_DATA_DIR)
+            if not directory:
+                return
+        progress = QProgressDialog(f"Ingesting {directory}...", "Cancel", 0, 0, self)
+        progress.setWindowTitle("Ingest Directory")
+        progress.setMinimumDuration(0)
+        cancel = threading.Event()
+        progress.canceled.connect(cancel.set)
+        state = {'stats': None, 'result': None, 'error': None}
+        def run():
+            try:
+                state['result'] = ingest_directory(directory, progress=lambda stats: state.update(stats=stats), cancel=cancel)
+            except Exception as e:
+                state['error'] = e
+        worker = threading.Thread(target=run, daemon=True, name='ingest')
+        timer = QTimer(self)
+        def poll():
+            stats = state['stats']
+            if stats is not None:
+                progress.setMaximum(stats['total'])
+                progress.setValue(stats['done'])
+                progress.setLabelText(f"Ingesting {directory}\n{format_stats(stats)}")
+            if worker.is_alive():
+                return
+            timer.stop()
+            progress.reset()
+            if state['error'] is not None:
+                QMessageBox.warning(self, "Ingest Error", str(state['error']))
+                return
+            result = state['result']
+            self.set_status_message(f"Ingested {directory}: {format_stats(result)}", 10000)
+            if result['errors']:
+                QMessageBox.warning(self, "Ingest", f"{len(result['errors'])} files could not be ingested:\n" +
+                                    '\n'.join(f"{os.path.basename(p)}: {m}" for p, m in list(result['errors'].items())[:20]))
+        timer.timeout.connect(poll)
+        worker.start()
+        timer.start(200)
+
+    def _run_pipeline(self, file_path):
+        """Run a pipeline on a file in a background thread; step progress goes to the status bar and the results are reported when it ends."""
+        pipeline_path, _ = QFileDialog.getOpenFileName(self, "Run Pipeline", "", "Pipelines (*.json *.yaml *.yml)")
+        if not pipeline_path:
+            return
+        try:
+            pipeline = load_pipeline(pipeline_path)
+        except Exception as e:
+            QMessageBox.warning(self, "Pipeline Error", str(e))
+            return
+        state = {'step': None, 'results': None, 'error': None}
+        def run():
+            try:
+                state['results'] = run_pipeline(pipeline, file_path, progress=lambda step_id, step_state: state.update(step=(step_id, step_state)))
+            except Exception as e:
+                state['error'] = e
+        worker = threading.Thread(target=run, daemon=True, name='pipeline')
+        timer = QTimer(self)
+        def poll():
+            if state['step'] is not None:
+                self.set_status_message("Pipeline step %s: %s" % state['step'])
+            if worker.is_alive():
+                return
+            timer.stop()
+            timer.deleteLater()
+            self.clear_status_message()
+            if state['error'] is not None:
+                QMessageBox.warning(self, "Pipeline Error", str(state['error']))
+                return
+            results = state['results']
+            failed = [f"{step_id}: {res}" for step_id, res in results.items() if isinstance(res, Exception)]
+            if failed:
+                QMessageBox.warning(self, "Pipeline Error", "Some steps failed:\n" + '\n'.join(failed))
+            else:
+                QMessageBox.information(self, "Pipeline Complete", f"Ran {len(results)} steps on {file_path}")
+        timer.timeout.connect(poll)
+        self.set_status_message(f"Running pipeline {os.path.basename(pipeline_path)} on {os.path.basename(file_path)}...")
+        worker.start()
+        timer.start(200)
+
 def main():
     app = QApplication(sys.argv)
     window = MainWindow()
@@ -0,0 +1,61 @@
+import os
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTreeWidget, QTreeWidgetItem, QHeaderView
+from PyQt5.QtCore import Qt
+from DataManagement.memory_manager import format_bytes
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+class MemoryPanel(QWidget):
+    """
+    Diagnostics view of the memory manager: the total against the budget, and the bytes held per file,
+    broken down into cached frames, prepared arrays and plotted lines.
+    """
+
+    def __init__(self, manager, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self.summary = QLabel()
+        trim_button = QPushButton("Trim to budget")
+        trim_button.setToolTip("Spill cached files to the binary cache, drop prepared arrays and decimate lines now")
+        trim_button.clicked.connect(self.trim)
+        top = QHBoxLayout()
+        top.addWidget(self.summary, 1)
+        top.addWidget(trim_button)
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["File / holder", "Kind", "Memory"])
+        self.tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.tree.setSortingEnabled(False)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(top)
+        layout.addWidget(self.tree)
+        self.setLayout(layout)
+
+    def refresh(self, records=None):
+        records = self.manager.usage() if records is None else records
+        totals = self.manager.totals(records)
+        budget = f" of {format_bytes(self.manager.budget)}" if self.manager.budget else ""
+        kinds = ', '.join(f"{kind}: {format_bytes(n)}" for kind, n in sorted(totals['by_kind'].items()))
+        self.summary.setText(f"{format_bytes(totals['total'])}{budget} ({kinds})" if kinds else f"0 B{budget}")
+        expanded = {self.tree.topLevelItem(i).data(0, Qt.UserRole) for i in range(self.tree.topLevelItemCount())
+                    if self.tree.topLevelItem(i).isExpanded()}
+        self.tree.clear()
+        by_file = {}
+        for rec in records:
+            by_file.setdefault(rec['file'] or '', []).append(rec)
+        for file_path, recs in sorted(by_file.items(), key=lambda item: -sum(r['bytes'] for r in item[1])):
+            parent = QTreeWidgetItem([os.path.basename(file_path) or '(none)', '', format_bytes(sum(r['bytes'] for r in recs))])
+            parent.setData(0, Qt.UserRole, file_path)
+            parent.setToolTip(0, file_path)
+            for rec in sorted(recs, key=lambda r: -r['bytes']):
+                child = QTreeWidgetItem([str(rec['label']), rec['kind'], format_bytes(rec['bytes'])])
+                child.setToolTip(0, str(rec['label']))
+                parent.addChild(child)
+            self.tree.addTopLevelItem(parent)
+            parent.setExpanded(file_path in expanded)
+
+    def trim(self):
+        freed = self.manager.enforce()
+        logger.info("Trimmed %s", format_bytes(freed))
+        self.refresh()
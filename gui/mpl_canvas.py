@@ -2,6 +2,10 @@ import matplotlib
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from matplotlib.transforms import Bbox
+from PyQt5.QtCore import QTimer
+from rendering import apply_rc_params, apply_axes_params, set_line_style_and_color
+from tracing import span
 
 # Set some default rcParams
 """
@@ -21,44 +25,121 @@ matplotlib.rcParams.update({
 })
 """
 
-plt.rcParams.update({
-    'xtick.direction':'in',
-    'axes.linewidth': 1,
-    'lines.linewidth':1,
-    'axes.labelsize': 24,
-    'axes.titlesize':24,
-    'ytick.direction':'in',
-    'xtick.top': False,
-    'xtick.bottom': True,
-    'ytick.right': False,
-    'ytick.left': True,
-    'ytick.major.width':1.5,
-    'xtick.major.width':1.5,
-    'text.usetex':True,
-    'xtick.major.pad': 5, #spacing between tick and label, moves axis label too
-    'xtick.major.size': 7,
-    'xtick.minor.pad': 5,
-    'xtick.minor.size': 7,
-    'ytick.major.pad': 5,
-    'ytick.major.size': 7,
-    'ytick.minor.pad': 5,
-    'ytick.minor.size': 7,
-    'legend.fontsize': 12,
-    'font.family': 'sans-serif',
-})
+apply_rc_params()
 
 class MplCanvas(FigureCanvas):
+    """
+    Figure canvas holding a grid of subplot panels (a single panel by default).
+    self.axes is always the first panel; self.axes_list holds every panel in row-major order.
+    Redraws can be scheduled per panel with schedule_redraw(); requests made in the same event loop
+    iteration are coalesced and only the dirty panels are re-rendered and blitted, falling back to a
+    full draw when other panels are affected (e.g. shared x limits changed).
+    """
     def __init__(self, parent=None, width=11, height=8.5, dpi=300):
         self.figure = Figure(figsize=(width, height), dpi=dpi)
         self.axes = self.figure.add_subplot(111)
+        self.axes_list = [self.axes]
+        self.nrows, self.ncols, self.sharex = 1, 1, True
         super().__init__(self.figure)
         self.setParent(parent)
+        self._dirty_panels = set()
+        self._full_redraw = False
+        self._redraw_pending = False
+        self._panel_state = {}  # panel index: (tight bbox, xlim, ylim) as of the last render
+        self.mpl_connect('draw_event', self._on_draw_event)
+
+    def draw(self):
+        with span('draw'):
+            super().draw()
+
+    def set_grid(self, nrows, ncols=1, sharex=True):
+        """Replace the panels with an nrows x ncols grid. Existing artists are discarded; callers re-plot their lines."""
+        self.figure.clear()
+        grid = self.figure.subplots(nrows, ncols, sharex=sharex, squeeze=False)
+        self.axes_list = list(grid.flat)
+        self.axes = self.axes_list[0]
+        self.nrows, self.ncols, self.sharex = nrows, ncols, sharex
+        self._panel_state.clear()
+        self._dirty_panels.clear()
+
+    def panel_count(self):
+        return len(self.axes_list)
+
+    def panel_index(self, panel):
+        """Clamp a (possibly stale or missing) panel index to the current grid."""
+        try:
+            panel = int(panel or 0)
+        except (TypeError, ValueError):
+            panel = 0
+        return min(max(panel, 0), len(self.axes_list) - 1)
+
+    def get_axes(self, panel=0):
+        return self.axes_list[self.panel_index(panel)]
+
+    def schedule_redraw(self, panel=None):
+        """Request a redraw of one panel (or of the whole figure if panel is None) on the next event loop iteration."""
+        if panel is None:
+            self._full_redraw = True
+        else:
+            self._dirty_panels.add(self.panel_index(panel))
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            QTimer.singleShot(0, self.flush_redraws)
+
+    def flush_redraws(self):
+        """Perform all scheduled redraws now."""
+        self._redraw_pending = False
+        panels, self._dirty_panels = self._dirty_panels, set()
+        full, self._full_redraw = self._full_redraw, False
+        if not full and not panels:
+            return
+        if full or self._panels_affected_outside(panels) or not self._can_blit(panels):
+            self.draw()
+            return
+        with span('draw_panels', panels=len(panels)):
+            renderer = self.get_renderer()
+            for panel in sorted(panels):
+                self._redraw_panel(panel, renderer)
+
+    def _panels_affected_outside(self, panels):
+        """True if a panel that is not being redrawn changed limits since it was last rendered (e.g. via sharex)."""
+        for i, ax in enumerate(self.axes_list):
+            if i in panels:
+                continue
+            state = self._panel_state.get(i)
+            if state is None or state[1] != tuple(ax.get_xlim()) or state[2] != tuple(ax.get_ylim()):
+                return True
+        return False
+
+    def _can_blit(self, panels):
+        return len(self.axes_list) > 1 and self.supports_blit and all(i in self._panel_state for i in panels)
+
+    def _redraw_panel(self, panel, renderer):
+        ax = self.axes_list[panel]
+        old_bbox = self._panel_state[panel][0]
+        bbox = Bbox.union([old_bbox, ax.get_tightbbox(renderer)]).padded(2)
+        # Erase the panel region with the figure background, then render just this axes into it
+        patch = self.figure.patch
+        patch.set_clip_box(bbox)
+        patch.draw(renderer)
+        patch.set_clip_box(None)
+        ax.draw(renderer)
+        self.blit(bbox)
+        self._record_panel_state(panel, renderer)
+
+    def _record_panel_state(self, panel, renderer):
+        ax = self.axes_list[panel]
+        self._panel_state[panel] = (ax.get_tightbbox(renderer), tuple(ax.get_xlim()), tuple(ax.get_ylim()))
+
+    def _on_draw_event(self, event):
+        for i in range(len(self.axes_list)):
+            self._record_panel_state(i, event.renderer)
 
     def get_plot_params(self):
         axes = self.axes
         params = {
             'title': axes.get_title(),
-            'xlabel': axes.get_xlabel(),
+            'xlabel': self.axes_list[-1].get_xlabel(),
             'ylabel': axes.get_ylabel(),
             'xlim': axes.get_xlim(),
             'ylim': axes.get_ylim(),
@@ -69,90 +150,17 @@ class MplCanvas(FigureCanvas):
         }
         return params
 
-    def apply_plot_params(self, params):
-        self.axes.relim()
-        self.axes.autoscale_view()
-        # Set title
-        self.axes.set_title(params.get('title', ''))
-        # Set x/y labels
-        self.axes.set_xlabel(params.get('xlabel', ''))
-        self.axes.set_ylabel(params.get('ylabel', ''))
-        # Set x/y limits
-        xlim = params.get('xlim', (None, None))
-        try:
-            left = xlim[0] if xlim and len(xlim) > 0 and xlim[0] not in (None, '', 'None') else None
-            right = xlim[1] if xlim and len(xlim) > 1 and xlim[1] not in (None, '', 'None') else None
-            if left is not None and right is not None:
-                self.axes.set_xlim(float(left), float(right))
-            elif left is not None:
-                self.axes.set_xlim(left=float(left))
-            elif right is not None:
-                self.axes.set_xlim(right=float(right))
-            else:
-                self.axes.set_xlim(auto=True)
-        except Exception as e:
-            print(f"Error setting xlim: {xlim}, {e}")
-        ylim = params.get('ylim', (None, None))
-        try:
-            bottom = ylim[0] if ylim and len(ylim) > 0 and ylim[0] not in (None, '', 'None') else None
-            top = ylim[1] if ylim and len(ylim) > 1 and ylim[1] not in (None, '', 'None') else None
-            if bottom is not None and top is not None:
-                self.axes.set_ylim(float(bottom), float(top))
-            elif bottom is not None:
-                self.axes.set_ylim(bottom=float(bottom))
-            elif top is not None:
-                self.axes.set_ylim(top=float(top))
-            else:
-                self.axes.set_ylim(auto=True)
-        except Exception as e:
-            print(f"Error setting ylim: {ylim}, {e}")
-        # Set grid
-        self.axes.grid(params.get('grid', False))
-        # Set x/y ticks
-        xticks = params.get('xticks', '')
-        if xticks:
-            try:
-                xtick_vals = [float(x.strip()) for x in xticks.split(',') if x.strip()]
-                self.axes.set_xticks(xtick_vals)
-            except Exception:
-                pass
-        yticks = params.get('yticks', '')
-        if yticks:
-            try:
-                ytick_vals = [float(y.strip()) for y in yticks.split(',') if y.strip()]
-                self.axes.set_yticks(ytick_vals)
-            except Exception:
-                pass
-        # Set legend
-        show_legend = params.get('legend', True)
-        if show_legend:
-            handles, labels = self.axes.get_legend_handles_labels()
-            if handles and labels:
-                self.axes.legend()
-        else:
-            legend = self.axes.get_legend()
-            if legend is not None:
-                legend.remove()
-
-    @staticmethod
-    def set_line_style_and_color(line, params):
-        # Set color, linestyle, and marker if present in params, otherwise use matplotlib default
-        color = params.get('color', None)
-        if color:
-            try:
-                line.set_color(color)
-            except Exception:
-                pass  # Ignore invalid color
-        linestyle = params.get('linestyle', None)
-        if linestyle:
-            try:
-                line.set_linestyle(linestyle)
-            except Exception:
-                pass  # Ignore invalid linestyle
-        marker = params.get('marker', None)
-        if marker:
-            try:
-                line.set_marker(marker)
-            except Exception:
-                pass  # Ignore invalid marker
+    def apply_plot_params(self, params, panels=None):
+        """
+        Apply global plot params to every panel (or only the given panel indices).
+        The title goes on the top row and the x label on the bottom row; everything else applies per panel.
+        """
+        indices = range(len(self.axes_list)) if panels is None else sorted(set(self.panel_index(p) for p in panels))
+        for i in indices:
+            row = i // self.ncols
+            self._apply_axes_params(self.axes_list[i], params, top=(row == 0), bottom=(row == self.nrows - 1))
+
+    def _apply_axes_params(self, axes, params, top=True, bottom=True):
+        apply_axes_params(axes, params, top=top, bottom=bottom, sharex=self.sharex)
 
+    set_line_style_and_color = staticmethod(set_line_style_and_color)
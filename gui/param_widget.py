@@ -115,7 +115,7 @@ class ParamWidget(QDockWidget):
             'xticks': self.xticks_edit.text().strip(),
             'yticks': self.yticks_edit.text().strip(),
         }
-        logger.debug(f'Exported params: {params}')
+        logger.debug('Exported params: %s', params)
         return params
 
     def apply(self):
@@ -137,7 +137,7 @@ class ParamWidget(QDockWidget):
         super().focusInEvent(event)
 
     def update_fields_from_params(self, params):
-        logger.debug(f'Updating fields from params: {params}')
+        logger.debug('Updating fields from params: %s', params)
         self.title_edit.setText(params.get('title', ''))
         self.xlabel_edit.setText(params.get('xlabel', ''))
         self.ylabel_edit.setText(params.get('ylabel', ''))
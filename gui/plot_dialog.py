@@ -1,6 +1,8 @@
-from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QLineEdit, QPushButton, QFormLayout, QTextEdit, QColorDialog, QLayout)
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QLineEdit, QPushButton, QFormLayout, QTextEdit, QColorDialog, QLayout, QSpinBox, QMessageBox)
 from PyQt5.QtCore import pyqtSignal, QSize, Qt
 from PyQt5.QtGui import QColor, QPainter, QPen
+from DataManagement.sweeps import summarize
+from DataManagement.resample import check_grid
 
 class ColorButton(QPushButton):
     def __init__(self, color=None, parent=None):
@@ -44,13 +46,16 @@ class ColorButton(QPushButton):
 class PlotParamDialog(QDialog):
     paramsSelected = pyqtSignal(dict)
 
-    def __init__(self, columns, current_params=None, comments=None, parent=None):
+    def __init__(self, columns, current_params=None, comments=None, parent=None, default_legend=None, panels=1, sweeps=None):
         super().__init__(parent)
         self.setWindowTitle("Plot Parameters")
         self.setMinimumWidth(300)
         self.columns = columns
         self.current_params = current_params or {}
         self.comments = comments or []
+        self.default_legend = default_legend # Used when the legend field is left blank, e.g. "{filename}" for batches
+        self.panels = panels # Number of subplot panels on the canvas; the panel selector is only shown if > 1
+        self.sweeps = sweeps # Optional callable(column) -> sweep segments of the file, for the "Find sweeps" button
         self._init_ui()
 
     def _init_ui(self):
@@ -109,6 +114,48 @@ class PlotParamDialog(QDialog):
         if 'maxy' in self.current_params:
             self.maxy_edit.setText(str(self.current_params['maxy']))
         form.addRow("Max Y:", self.maxy_edit)
+        # Sweep segments: restrict the line to one sweep and/or branch of a column swept up and down
+        self.sweep_column_combo = QComboBox()
+        self.sweep_column_combo.addItem("(X column)", "")
+        for column in self.columns:
+            self.sweep_column_combo.addItem(column, column)
+        if self.current_params.get('sweep_column') in self.columns:
+            self.sweep_column_combo.setCurrentIndex(self.columns.index(self.current_params['sweep_column']) + 1)
+        form.addRow("Sweep column:", self.sweep_column_combo)
+        self.sweep_spin = QSpinBox()
+        self.sweep_spin.setRange(0, 9999)
+        self.sweep_spin.setSpecialValueText("All")
+        self.sweep_spin.setValue(int(self.current_params.get('sweep') or 0))
+        self.branch_combo = QComboBox()
+        self.branch_combo.addItems(['both', 'up', 'down'])
+        if self.current_params.get('sweep_branch') in ('up', 'down'):
+            self.branch_combo.setCurrentText(self.current_params['sweep_branch'])
+        sweep_row = QHBoxLayout()
+        sweep_row.addWidget(self.sweep_spin)
+        sweep_row.addWidget(QLabel("Branch:"))
+        sweep_row.addWidget(self.branch_combo)
+        form.addRow("Sweep:", sweep_row)
+        if self.sweeps is not None:
+            self.sweep_info = QLabel("")
+            find_btn = QPushButton("Find sweeps")
+            find_btn.clicked.connect(self.find_sweeps)
+            info_row = QHBoxLayout()
+            info_row.addWidget(find_btn)
+            info_row.addWidget(self.sweep_info)
+            form.addRow("", info_row)
+        # Resampling onto a common grid (for comparing files)
+        self.resample_combo = QComboBox()
+        self.resample_combo.addItems(['none', 'interp', 'mean'])
+        if self.current_params.get('resample') in ('interp', 'mean'):
+            self.resample_combo.setCurrentText(self.current_params['resample'])
+        self.resample_grid_edit = QLineEdit()
+        self.resample_grid_edit.setPlaceholderText("start:stop:step, e.g. -9:9:0.01")
+        if 'resample_grid' in self.current_params:
+            self.resample_grid_edit.setText(str(self.current_params['resample_grid']))
+        resample_row = QHBoxLayout()
+        resample_row.addWidget(self.resample_combo)
+        resample_row.addWidget(self.resample_grid_edit)
+        form.addRow("Resample:", resample_row)
         # Arbitrary mask expressions
         self.mask_expr_edits = []
         self.mask_expr_layout = QVBoxLayout()
@@ -135,7 +182,7 @@ class PlotParamDialog(QDialog):
         layout.addLayout(self.mask_expr_layout)
         # Legend label
         self.legend_edit = QLineEdit()
-        self.legend_edit.setPlaceholderText("Legend label")
+        self.legend_edit.setPlaceholderText(self.default_legend or "Legend label")
         if 'legend' in self.current_params:
             self.legend_edit.setText(self.current_params['legend'])
         form.addRow("Legend:", self.legend_edit)
@@ -165,6 +212,13 @@ class PlotParamDialog(QDialog):
         self.color_btn = ColorButton(self.color)
         self.color_btn.clicked.connect(self.choose_color)
         form.addRow("Color:", self.color_btn)
+        # Target panel (1-based in the UI, stored 0-based)
+        self.panel_spin = None
+        if self.panels > 1:
+            self.panel_spin = QSpinBox()
+            self.panel_spin.setRange(1, self.panels)
+            self.panel_spin.setValue(min(int(self.current_params.get('panel', 0)), self.panels - 1) + 1)
+            form.addRow("Panel:", self.panel_spin)
         layout.addLayout(form)
         btns = QHBoxLayout()
         apply_btn = QPushButton("Apply")
@@ -185,6 +239,19 @@ class PlotParamDialog(QDialog):
             self.color = None
         self.color_btn.set_color(self.color)
 
+    def find_sweeps(self):
+        """Show how many sweeps the sweep column has and limit the sweep selector accordingly."""
+        column = self.sweep_column_combo.currentData() or self.x_combo.currentText()
+        try:
+            segments = self.sweeps(column)
+        except Exception as e:
+            self.sweep_info.setText(f"Error: {e}")
+            return
+        self.sweep_info.setText(summarize(segments))
+        branch = self.branch_combo.currentText()
+        count = len(segments) if branch == 'both' else sum(1 for s in segments if s['direction'] == branch)
+        self.sweep_spin.setMaximum(max(count, 1))
+
     def add_mask_expr_field(self, value=""):
         edit = QLineEdit()
         edit.setPlaceholderText("e.g. abs(x) <= 10")
@@ -222,12 +289,31 @@ class PlotParamDialog(QDialog):
             params['miny'] = miny_val
         if maxy_val:
             params['maxy'] = maxy_val
+        if self.sweep_spin.value():
+            params['sweep'] = self.sweep_spin.value()
+        if self.branch_combo.currentText() != 'both':
+            params['sweep_branch'] = self.branch_combo.currentText()
+        if ('sweep' in params or 'sweep_branch' in params) and self.sweep_column_combo.currentData():
+            params['sweep_column'] = self.sweep_column_combo.currentData()
+        if self.resample_combo.currentText() != 'none':
+            grid = self.resample_grid_edit.text().strip()
+            try:
+                check_grid(grid)
+            except ValueError as e:
+                # The step has no sensible default, so keep the dialog open until the grid is fixed
+                QMessageBox.warning(self, "Resampling Grid", f"{e}\nEnter start:stop:step, e.g. -9:9:0.01 or ::0.01 for the data's range.")
+                self.resample_grid_edit.setFocus()
+                return
+            params['resample'] = self.resample_combo.currentText()
+            params['resample_grid'] = grid
         mask_exprs = [edit.text().strip() for edit in self.mask_expr_edits if edit.text().strip()]
         if mask_exprs:
             params['mask_exprs'] = mask_exprs
         legend = self.legend_edit.text().strip()
         if legend:
             params['legend'] = legend
+        elif self.default_legend:
+            params['legend'] = self.default_legend
         else:
             params['legend'] = f"{self.x_combo.currentText()} vs {self.y_combo.currentText()}"
         linestyle = self.linestyle_combo.currentText()
@@ -240,5 +326,9 @@ class PlotParamDialog(QDialog):
             color = self.color.name()
             if color:
                 params['color'] = color
+        if self.panel_spin is not None:
+            params['panel'] = self.panel_spin.value() - 1
+        elif 'panel' in self.current_params:
+            params['panel'] = self.current_params['panel']
         self.paramsSelected.emit(params)
         super().accept() 
\ No newline at end of file
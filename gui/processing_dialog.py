@@ -3,6 +3,7 @@ from PyQt5.QtCore import Qt
 import json
 import os
 from DataManagement.module_loader import discover_modules
+from DataManagement.path_resolver import path_resolver
 from processing_base import BaseProcessingModule
 import re
 from localvars import PROCESSING_MODULES_DIR
@@ -40,22 +41,11 @@ class ProcessingDialog(QDialog):
 
     def _extract_cooldown(self, file_path):
         # Find the first folder after any of 'raw', 'preprocessed', or 'postprocessed' in the file path
-        parts = os.path.normpath(file_path).split(os.sep)
-        for key in ('raw', 'preprocessed', 'postprocessed'):
-            try:
-                idx = parts.index(key)
-                if idx+1 < len(parts):
-                    return parts[idx+1]
-            except ValueError:
-                logger.warning(f"No {key} folder found in {file_path}")
-                continue
-        return ''
+        return path_resolver.cooldown(file_path)
 
     def _extract_prefix_options(self, file_path):
         # If filename starts with 6 digits, treat as date prefix
-        fname = os.path.basename(file_path)
-        m = re.match(r'(\d{6})', fname)
-        return [m.group(1)] if m else []
+        return path_resolver.prefix_options(file_path)
 
     def _init_ui(self):
         layout = QVBoxLayout()
@@ -180,7 +170,7 @@ class ProcessingDialog(QDialog):
                 continue
             # Multi-value (single type, not dict)
             elif m:
-                logger.debug(f"Multi-value param: {name}")
+                logger.debug("Multi-value param: %s", name)
                 base_name = m.group(1)
                 if base_name not in multi_param_widgets:
                     multi_param_widgets[base_name] = []
@@ -16,4 +16,88 @@ DEFAULT_PLOT_SAVE = os.path.join(PLOTS_DIR, 'plot.pdf')
 # Reading/writing data file formats
 DATA_DELIMITER = '  '
 
+# Logging level for all project loggers (DEBUG, INFO, WARNING, ...), can be overridden with the LOG_LEVEL environment variable
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'DEBUG')
+
+# Tracing: if set, spans are recorded and dumped as Chrome trace JSON to this path on exit
+TRACE_FILE = os.environ.get('TRACE_FILE', None)
+TRACE_MAX_SAMPLES = 1000  # Latency samples kept per span name for percentiles
+TRACE_MAX_EVENTS = 100000  # Trace events kept while tracing (the oldest are dropped first)
+
+# Worker processes for parallel file parsing (None: one per CPU core)
+MAX_WORKERS = None
+
+# Shared in-memory data cache: parsed files and prepared plot arrays kept (LRU)
+DATA_CACHE_FILES = 32
+DATA_CACHE_DERIVED = 256
+
+# Binary sidecar cache (one .npy per column, memory-mapped) for files of at least BINARY_CACHE_MIN_BYTES
+CACHE_DIR = os.path.join('data', '.cache')
+BINARY_CACHE_MIN_BYTES = 8 * 1024 * 1024
+
+# Min/max pyramids for instant zoom on long columns (built when the binary cache is written)
+PYRAMID_MIN_POINTS = 200000  # Columns shorter than this are drawn from raw samples
+PYRAMID_BASE = 64            # Samples per level-0 bucket
+PYRAMID_FACTOR = 4           # Buckets combined per level
+PYRAMID_CHUNK = 1 << 20      # Samples processed at a time while building
+LOD_OVERSAMPLE = 2           # Buckets drawn per horizontal pixel
+
+# Processing modules run in worker processes; default per-job timeout in seconds (None: no limit)
+PROCESSING_TIMEOUT = None
+
+# Format written by save_data_file/BaseProcessingModule.save_data: 'text' (two-space .dat), or binary 'npz' (numpy only),
+# 'feather' (requires pyarrow) or 'hdf5' (requires h5py). Modules can override it with an OUTPUT_FORMAT attribute or an
+# 'output_format' parameter. Binary files are read back transparently by read_data_file.
+OUTPUT_FORMAT = 'text'
+
+# Compressed data files (.gz/.zst/.xz) are decompressed by a background thread in blocks of this size,
+# at most DECOMPRESS_QUEUE_BLOCKS ahead of the parser
+DECOMPRESS_BLOCK_SIZE = 1 << 20
+DECOMPRESS_QUEUE_BLOCKS = 8
+
+# Declared column dtypes used when parsing data files (see DataManagement/schema.py): by column name, then by #P unit.
+# Undeclared columns keep the numeric dtype they parse as; columns that do not parse as numbers become DEFAULT_DTYPE,
+# with malformed rows rejected ('drop') or kept as NaN ('nan') and reported, unless most of the column is text.
+DTYPE_MAP = {'Time': 'float64'}  # e.g. {'Counter': 'int64', 'Sample': 'str'}
+UNIT_DTYPES = {'s': 'float64'}    # e.g. {'counts': 'int64'}
+DEFAULT_DTYPE = 'float64'
+MALFORMED_ROWS = 'drop'
+
+# Plot-only loads (plot lines, batch overlays) downcast float columns to float32 unless declared float64 above
+PLOT_FLOAT32 = False
+
+# Memory budget for loaded data in bytes (None: unlimited). Over budget, cached files are spilled to the binary cache,
+# prepared arrays are dropped and plotted lines keep only MEMORY_DECIMATED_POINTS min/max samples
+MEMORY_BUDGET = 4 * 1024 ** 3
+MEMORY_DECIMATED_POINTS = 20000
+
+# Directory ingest (python -m DataManagement.ingest, or "Ingest directory..." in the GUI): file extensions treated
+# as data (also when compressed)
+INGEST_EXTENSIONS = ('.dat', '.txt')
+
+# Figure export (Save Plot, batch export of plot configs): worker processes rendering at once, and the resolution
+# of raster formats (dots per inch)
+EXPORT_WORKERS = 2
+EXPORT_DPI = 300
+
+# Evaluation of elementwise column expressions: 'auto' (numexpr if installed, else chunked), 'numexpr', 'chunked'
+# (cache-sized blocks of rows split across threads) or 'numpy' (whole columns, single-threaded). Columns shorter than
+# EXPRESSION_MIN_ROWS always use plain numpy; EXPRESSION_THREADS None means one thread per CPU core
+EXPRESSION_BACKEND = 'auto'
+EXPRESSION_BLOCK_ROWS = 16384
+EXPRESSION_THREADS = None
+EXPRESSION_MIN_ROWS = 1 << 17
+
+# Range limits (minx/maxx) on a column that is sorted become a binary search. With COLUMN_SORT_INDEX, unsorted columns
+# also get a cached sort permutation, used when a range keeps at most COLUMN_SORT_MAX_FRACTION of the rows
+COLUMN_SORT_INDEX = False
+COLUMN_SORT_MAX_FRACTION = 0.125
+
+# Sweep segmentation (sweep / sweep_branch plot params): a swept column only reverses direction once it has moved back
+# by more than this fraction of its range, so noise and holds at the end of a sweep do not split a branch
+SWEEP_HYSTERESIS = 0.01
+
+# Rows per chunk when resampling a file onto a grid in streaming form (resample.resample_file)
+RESAMPLE_CHUNK_ROWS = 1 << 20
+
 # Any other constants can be added here 
\ No newline at end of file
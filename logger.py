@@ -1,11 +1,13 @@
 import logging
+from localvars import LOG_LEVEL
 
-def get_logger(name=__name__):
+def get_logger(name=__name__, level=None):
     logger = logging.getLogger(name)
     if not logger.hasHandlers():
         handler = logging.StreamHandler()
         formatter = logging.Formatter('[%(asctime)s][%(levelname)s][%(name)s] %(message)s')
         handler.setFormatter(formatter)
         logger.addHandler(handler)
-    logger.setLevel(logging.DEBUG)
-    return logger 
\ No newline at end of file
+    level = level or LOG_LEVEL
+    logger.setLevel(getattr(logging, level, logging.DEBUG) if isinstance(level, str) else level)
+    return logger
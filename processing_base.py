@@ -2,6 +2,11 @@ import os
 from abc import ABC, abstractmethod
 from typing import List, Tuple, Any
 from DataManagement.data_writer import save_data_file
+from DataManagement.path_resolver import path_resolver
+from DataManagement.column_index import ColumnIndex
+from DataManagement.sweeps import select_segments, segment_rows
+from localvars import OUTPUT_FORMAT
+from tracing import span
 
 class BaseProcessingModule(ABC):
     """
@@ -9,6 +14,15 @@ class BaseProcessingModule(ABC):
     """
     # If we define it here, they will all be blank. They must form this typing however
     # PARAMETERS: List[Tuple[str, str, type, bool]] = []  # (name, label, type, required)
+    OUTPUT_FORMAT = OUTPUT_FORMAT  # 'text', 'npz', 'feather' or 'hdf5'; a module can set its own, params['output_format'] overrides it
+
+    def __init_subclass__(cls, **kwargs):
+        # Time every module's process/save without requiring the module author to do anything
+        # ('module_save' covers the whole save method; the file write inside it is the 'save' span)
+        super().__init_subclass__(**kwargs)
+        for method, span_name in (('process', 'process'), ('save', 'module_save')):
+            if method in cls.__dict__ and not getattr(cls.__dict__[method], '__isabstractmethod__', False):
+                setattr(cls, method, span(span_name, module=cls.__name__)(cls.__dict__[method]))
 
     def __init__(self, input_file: str, output_dir: str, params: dict):
         self.input_file = input_file
@@ -16,6 +30,8 @@ class BaseProcessingModule(ABC):
         self.params = params
         self.data = None
         self.result = None
+        self.progress_callback = None  # Set by the executor running the module: callback(fraction, message)
+        self._column_index = None  # Sweep segments of self.data, found on first use
 
     # @abstractmethod, we should probably not define this here, otherwise we are forced to overload it
     def load(self):
@@ -34,30 +50,44 @@ class BaseProcessingModule(ABC):
 
     # Helper functions
 
+    def report_progress(self, fraction: float, message: str = ''):
+        """Report progress (0 to 1) to whoever runs the module; does nothing when run directly."""
+        if self.progress_callback is not None:
+            self.progress_callback(fraction, message)
+
+    def sweeps(self, column: str, hysteresis=None) -> list:
+        """Sweep segments of a column of self.data ({'segment', 'start', 'stop', 'direction', 'sweep'}), found once."""
+        if self._column_index is None:
+            self._column_index = ColumnIndex()
+        return self._column_index.segments(column, self.data[column], hysteresis)
+
+    def sweep_data(self, column: str, sweep=None, branch=None, hysteresis=None):
+        """
+        Rows of self.data in the selected sweep segments of a column (e.g. sweep=3, branch='up' is the third up sweep).
+        Contiguous segments are a row slice, so no column is copied.
+        """
+        rows = segment_rows(select_segments(self.sweeps(column, hysteresis), sweep, branch))
+        return self.data.iloc[rows]
+
     def get_cooldown_name(self):
         """Extract cooldown name as the first folder after 'raw', 'preprocessed', or 'postprocessed' in the input_file path."""
-        parts = os.path.normpath(self.input_file).split(os.sep)
-        for key in ('raw', 'preprocessed', 'postprocessed'):
-            try:
-                idx = parts.index(key)
-                if idx+1 < len(parts):
-                    return parts[idx+1]
-            except ValueError:
-                continue
-        return ''
+        return path_resolver.cooldown(self.input_file)
 
     def get_output_path(self, filename: str) -> str:
         """Get full output path in the output_dir/cooldown folder."""
-        cooldown = self.get_cooldown_name()
-        outdir = os.path.join(self.output_dir, cooldown)
-        os.makedirs(outdir, exist_ok=True)
-        return os.path.join(outdir, filename)
+        return os.path.join(path_resolver.output_dir(self.output_dir, self.get_cooldown_name()), filename)
 
     def save_data(self, df, filename, comments=None, metadata=None, subfolder=None):
-        """Save data using the standard format (calls data_writer.save_data_file)."""
+        """Save data using the standard format (calls data_writer.save_data_file). Returns the path written."""
         # Use cooldown from params if present, else use get_cooldown_name()
         cooldown = self.params.get('cooldown', self.get_cooldown_name())
-        outdir = os.path.join(self.output_dir, cooldown, subfolder) if subfolder else os.path.join(self.output_dir, cooldown)
-        os.makedirs(outdir, exist_ok=True)
+        outdir = path_resolver.output_dir(self.output_dir, cooldown, subfolder)
         outpath = os.path.join(outdir, filename)
-        save_data_file(df, outpath, comments=comments, metadata=metadata)
+        fmt = self.params.get('output_format') or self.OUTPUT_FORMAT
+        try:
+            return save_data_file(df, outpath, comments=comments, metadata=metadata, fmt=fmt)
+        except FileNotFoundError:
+            # The directory was removed since it was created; create it again
+            path_resolver.forget_dir(outdir)
+            path_resolver.ensure_dir(outdir)
+            return save_data_file(df, outpath, comments=comments, metadata=metadata, fmt=fmt)
@@ -0,0 +1,78 @@
+from processing_base import BaseProcessingModule
+import numpy as np
+import os
+from logger import get_logger
+from tracing import lazy
+from DataManagement.resample import METHODS, parse_grid, resample_frame
+
+logger = get_logger(__name__)
+
+MODE = ['pre', 'post']
+
+PARAMETERS = [
+    ('x_column', 'X Column', 'dropdown_column', True),
+    ('y_column_%d', 'Y Column(s)', 'dropdown_column', True),
+    ('method', 'Method', METHODS, True),
+    ('start', 'Grid Start', float, False, 'Optional, defaults to the smallest x'),
+    ('stop', 'Grid Stop', float, False, 'Optional, defaults to the largest x'),
+    ('step', 'Grid Step', float, True),
+    ('sweep_branch', 'Sweep Branch', ('both', 'up', 'down'), False),
+    ('sweep', 'Sweep Number', int, False, 'Optional, e.g. 2 for the second sweep of the branch'),
+    ('file_name', 'File Name', str, True),
+    ('output_folder', 'Subfolder Folder Name', str, False),
+    ('chunk_size', 'Chunk Size (rows)', int, False, 'Optional, for very large files'),
+]
+
+class ResampleBin(BaseProcessingModule):
+    """
+    Put one or more columns on a common, evenly spaced x grid, by linear interpolation ('interp') or by averaging
+    the samples in each grid point's bin ('mean'), so files with different x points can be compared or subtracted.
+    """
+    name = 'Resample / Bin'
+    description = 'Interpolates or bin-averages columns onto a common x grid'
+    PARAMETERS = PARAMETERS
+
+    def __init__(self, input_file, output_dir, params, data):
+        super().__init__(input_file, output_dir, params)
+        self.data = data  # DataFrame supplied by GUI
+
+    def load(self):
+        pass  # Data is already loaded and supplied
+
+    def _grid(self, x):
+        """Grid from the start/stop/step params; a missing start or stop comes from the range of x."""
+        ends = ['' if self.params.get(key) in (None, '') else self.params[key] for key in ('start', 'stop')]
+        return parse_grid(f"{ends[0]}:{ends[1]}:{self.params['step']}", x)
+
+    def process(self):
+        x_column = self.params.get('x_column')
+        y_columns = self.params.get('y_column', [])
+        if not isinstance(y_columns, list):
+            y_columns = [y_columns]
+        y_columns = [c for c in y_columns if c and c != x_column]
+        if not y_columns:
+            raise ValueError("No Y columns selected.")
+        method = self.params.get('method') or METHODS[0]
+        logger.debug("Resampling %s of %s by %s", y_columns, self.input_file, method)
+        data = self.data
+        branch = self.params.get('sweep_branch')
+        branch = None if branch in (None, '', 'both') else branch
+        if branch or self.params.get('sweep') not in (None, ''):
+            # Restrict to sweeps of x first (a slice of the rows, not a copy)
+            data = self.sweep_data(x_column, self.params.get('sweep'), branch)
+        if x_column not in data.columns:
+            raise ValueError(f"Column '{x_column}' not found in input data.")
+        grid = self._grid(data[x_column].to_numpy())
+        chunk_size = self.params.get('chunk_size', None)
+        chunk_size = int(chunk_size) if chunk_size not in (None, '') else None
+        self.result = resample_frame(data, x_column, y_columns, grid, method, chunk_size, self.report_progress)
+        logger.debug("Resampled onto %d grid points (%s with data)", len(grid),
+                     lazy(lambda: np.isfinite(self.result[y_columns[0]].to_numpy()).sum()))
+
+    def save(self):
+        file_name = self.params.get('file_name', '')
+        if not file_name:
+            file_name = f"{os.path.splitext(os.path.basename(self.input_file))[0]}_resampled"
+        filename = f"{file_name}.dat"
+        comments = [f"Resampled by {self.params.get('method') or METHODS[0]} onto {len(self.result)} points of {self.params.get('x_column')}"]
+        self.save_data(self.result, filename, comments=comments, metadata=None, subfolder=self.params.get('output_folder', ''))
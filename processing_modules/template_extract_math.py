@@ -3,6 +3,9 @@ import numpy as np
 import pandas as pd
 import os
 from logger import get_logger
+from DataManagement.expressions import ExpressionGraph
+from DataManagement.expression_backends import is_elementwise
+from tracing import lazy
 
 logger = get_logger(__name__)
 
@@ -14,13 +17,14 @@ PARAMETERS = [
         'fields': [
             ('colname', 'Column Name', 'dropdown_column', True),
             ('collabel', 'Column Label', str, False),
-            ('expression', 'Expression', str, False, 'e.g. "(x-100)/100" or "*100"')
+            ('expression', 'Expression', str, False, 'e.g. "(x-100)/100", "*100" or "x/I" (other columns by name)')
         ]
     }, True),
     ('test_%d', 'Test', str, True),
     ('prepend_date', 'Prepend Prefix', 'checkbox', False, True),
     ('file_name', 'File Name', str, True),
     ('output_folder', 'Subfolder Folder Name', str, False),
+    ('chunk_size', 'Chunk Size (rows)', int, False, 'Optional, for very large files (non-elementwise expressions still use whole columns)'),
 ]
 
 class ExtractColumnsWithMath(BaseProcessingModule):
@@ -34,38 +38,103 @@ class ExtractColumnsWithMath(BaseProcessingModule):
     def load(self):
         pass  # Data is already loaded and supplied
 
+    @staticmethod
+    def _parse_expression(graph, expr, colname):
+        """Parse a column expression; x is the column itself and a leading operator applies to it (e.g. "*100")."""
+        source = f"x{expr}" if expr.startswith(('/', '*', '+', '-')) else expr
+        try:
+            return graph.parse(source, {'x': graph.column(colname)})
+        except SyntaxError as e:
+            logger.error("Error compiling expression '%s' for column '%s': %s", expr, colname, e)
+            raise ValueError(f"Error evaluating expression '{expr}' for column '{colname}': {e}")
+
+    @staticmethod
+    def _evaluate(evaluator, tree, expr, colname, length):
+        try:
+            y = evaluator.value(tree)
+        except Exception as e:
+            logger.error("Error evaluating expression '%s' for column '%s': %s", expr, colname, e)
+            raise ValueError(f"Error evaluating expression '{expr}' for column '{colname}': {e}")
+        y = np.asarray(y)
+        if y.ndim == 0: # Constant expressions fill the whole column
+            y = np.full(length, y)
+        return y
+
     def process(self):
-        logger.debug(f"Processing columns with math for file: {self.input_file}")
+        logger.debug("Processing columns with math for file: %s", self.input_file)
         col_entries = self.params.get('columns', [])
         if not isinstance(col_entries, list):
             col_entries = [col_entries]
-        result = pd.DataFrame()
+        # Validate and parse every entry into one expression graph before evaluating anything,
+        # so subexpressions shared between columns are evaluated once
+        graph = ExpressionGraph()
+        entries = []
         for entry in col_entries:
             colname = entry.get('colname')
             expr = entry.get('expression', '').strip()
             if not colname or colname not in self.data.columns:
-                logger.error(f"Column '{colname}' not found in input data.")
+                logger.error("Column '%s' not found in input data.", colname)
                 raise ValueError(f"Column '{colname}' not found in input data.")
-            x = self.data[colname]
             collabel = entry.get('collabel', None)
-            if expr:
-                # Safe eval: only allow numpy and x
-                np_env = {k: getattr(np, k) for k in dir(np) if not k.startswith('_')}
-                local_env = {'x': x}
-                local_env.update(np_env)
-                try:
-                    y = eval(f"x{expr}" if expr.startswith(('/', '*', '+', '-')) else expr, {"__builtins__": {}}, local_env)
-                except Exception as e:
-                    logger.error(f"Error evaluating expression '{expr}' for column '{colname}': {e}")
-                    raise ValueError(f"Error evaluating expression '{expr}' for column '{colname}': {e}")
-                
-                result[collabel if collabel else colname + (expr if expr else '')] = y
-            else:
-                result[collabel if collabel else colname] = x
-        self.result = result
+            label = collabel if collabel else colname + (expr if expr else '')
+            tree = graph.add(self._parse_expression(graph, expr, colname)) if expr else None
+            entries.append((colname, label, expr, tree))
+        logger.debug("Shared subexpressions: %s", lazy(graph.shared))
+
+        # One float64 array per column the expressions reference
+        arrays = {}
+        for name in graph.columns.values():
+            if name not in self.data.columns:
+                logger.error("Column '%s' not found in input data.", name)
+                raise ValueError(f"Column '{name}' not found in input data.")
+            arrays[name] = self.data[name].to_numpy(dtype=np.float64)
+        n = len(self.data)
+
+        chunk_size = self.params.get('chunk_size', None)
+        chunk_size = int(chunk_size) if chunk_size not in (None, '') else 0
+        columns = {}
+        if chunk_size and chunk_size < n:
+            # Chunked mode: elementwise expressions are evaluated chunk by chunk into preallocated columns. Anything
+            # else (x - mean(x), cumsum(x), x - x[0], ...) depends on rows outside the chunk and is evaluated over
+            # the whole columns instead, so no per-chunk results are ever written
+            whole = None
+            chunked = []
+            for colname, label, expr, tree in entries:
+                if tree is None:
+                    columns[label] = self.data[colname].to_numpy()
+                elif is_elementwise(tree):
+                    chunked.append((colname, label, expr, tree))
+                else:
+                    logger.debug("Expression '%s' for column '%s' is not elementwise, evaluating it over whole columns", expr, colname)
+                    if whole is None:
+                        whole = graph.evaluator(arrays)
+                    columns[label] = self._evaluate(whole, tree, expr, colname, n)
+            for start in range(0, n, chunk_size):
+                stop = min(start + chunk_size, n)
+                self.report_progress(start / n, f"Rows {start}-{stop}")
+                evaluator = graph.evaluator({name: values[start:stop] for name, values in arrays.items()})
+                for colname, label, expr, tree in chunked:
+                    y = self._evaluate(evaluator, tree, expr, colname, stop - start)
+                    if y.shape[0] != stop - start:
+                        raise ValueError(f"Expression '{expr}' for column '{colname}' is not elementwise and cannot be evaluated in chunks.")
+                    if label not in columns:
+                        columns[label] = np.empty(n, dtype=y.dtype)
+                    columns[label][start:stop] = y
+            # Keep the configured column order
+            columns = {label: columns[label] for _, label, _, _ in entries}
+        else:
+            evaluator = graph.evaluator(arrays)
+            for i, (colname, label, expr, tree) in enumerate(entries):
+                self.report_progress(i / len(entries), f"Column {label}")
+                if tree is None:
+                    columns[label] = self.data[colname].to_numpy()
+                    continue
+                columns[label] = self._evaluate(evaluator, tree, expr, colname, n)
+        # Build the frame once instead of growing it column by column
+        self.result = pd.DataFrame(columns, copy=False)
 
     def save(self):
-        logger.debug(f"Saving processed columns for file: {self.input_file}")
+        logger.debug("Saving processed columns for file: %s", self.input_file)
         prefix = self.params.get('prefix', '')
         file_name = self.params.get('file_name', '')
         output_folder = self.params.get('output_folder', '')
@@ -79,4 +148,4 @@ class ExtractColumnsWithMath(BaseProcessingModule):
         filename = f"{base_name}.dat"
         # Let the base module handle the output directory and cooldown
         self.save_data(self.result, filename, comments=None, metadata=None, subfolder=output_folder)
-        logger.info(f"Saved processed columns to {filename}") 
\ No newline at end of file
+        logger.info("Saved processed columns to %s", filename) 
\ No newline at end of file
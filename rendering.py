@@ -0,0 +1,431 @@
+"""
+Qt-free figure rendering shared by the GUI canvas, background exports and headless rendering.
+
+A figure is described by a snapshot: a plain dict that pickles cheaply to a worker process.
+    {
+        'layout': {'rows', 'cols', 'sharex'},
+        'global_params': {...},        # as edited in the parameter widget (title, labels, limits, ...)
+        'lines': [{'x', 'y', 'label', 'params'}, ...],
+        'size': (width, height),        # inches
+        'dpi': 300,
+        'rc': {...},                    # rcParams overrides in effect where the snapshot was taken
+    }
+render_figure() draws a snapshot on a new Figure (no pyplot, so no GUI backend is involved) and saves it.
+ExportJobs renders snapshots or saved plot configs in spawned worker processes and is polled, so a GUI
+can drive it from a timer without blocking.
+
+Saved plot configs can also be rendered headless (no display or Qt needed), with the referenced data files
+parsed in parallel on all cores. Run from the repository root:
+    python -m rendering reports/*.json -o data/plots --workers 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+import matplotlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from matplotlib.figure import Figure
+from localvars import EXPORT_WORKERS, EXPORT_DPI, MAX_WORKERS
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+EXPORT_FORMATS = {'.pdf': 'pdf', '.png': 'png', '.svg': 'svg', '.jpg': 'jpg', '.jpeg': 'jpg'}
+
+RC_PARAMS = {
+    'xtick.direction':'in',
+    'axes.linewidth': 1,
+    'lines.linewidth':1,
+    'axes.labelsize': 24,
+    'axes.titlesize':24,
+    'ytick.direction':'in',
+    'xtick.top': False,
+    'xtick.bottom': True,
+    'ytick.right': False,
+    'ytick.left': True,
+    'ytick.major.width':1.5,
+    'xtick.major.width':1.5,
+    'text.usetex':True,
+    'xtick.major.pad': 5, #spacing between tick and label, moves axis label too
+    'xtick.major.size': 7,
+    'xtick.minor.pad': 5,
+    'xtick.minor.size': 7,
+    'ytick.major.pad': 5,
+    'ytick.major.size': 7,
+    'ytick.minor.pad': 5,
+    'ytick.minor.size': 7,
+    'legend.fontsize': 12,
+    'font.family': 'sans-serif',
+}
+
+def apply_rc_params(overrides=None):
+    """Install the plot style (RC_PARAMS plus overrides). LaTeX text is turned off when no latex binary is installed."""
+    rc = {**RC_PARAMS, **(overrides or {})}
+    if rc.get('text.usetex') and shutil.which('latex') is None:
+        logger.warning("latex not found, rendering text with mathtext")
+        rc['text.usetex'] = False
+    matplotlib.rcParams.update(rc)
+
+def export_format(path):
+    """Output format of path from its extension ('pdf' when it has none or an unknown one)."""
+    return EXPORT_FORMATS.get(os.path.splitext(path)[1].lower(), 'pdf')
+
+def line_kwargs(params):
+    """Style keyword arguments of a line for Axes.plot."""
+    return {key: params[key] for key in ('color', 'linestyle', 'marker') if key in params}
+
+def line_label(file_path, params):
+    return params['legend'] if 'legend' in params else os.path.basename(file_path)
+
+def set_line_style_and_color(line, params):
+    # Set color, linestyle, and marker if present in params, otherwise use matplotlib default
+    color = params.get('color', None)
+    if color:
+        try:
+            line.set_color(color)
+        except Exception:
+            pass  # Ignore invalid color
+    linestyle = params.get('linestyle', None)
+    if linestyle:
+        try:
+            line.set_linestyle(linestyle)
+        except Exception:
+            pass  # Ignore invalid linestyle
+    marker = params.get('marker', None)
+    if marker:
+        try:
+            line.set_marker(marker)
+        except Exception:
+            pass  # Ignore invalid marker
+
+def _limits(lim):
+    low = lim[0] if lim and len(lim) > 0 and lim[0] not in (None, '', 'None') else None
+    high = lim[1] if lim and len(lim) > 1 and lim[1] not in (None, '', 'None') else None
+    return low, high
+
+def _ticks(ticks):
+    return [float(t.strip()) for t in ticks.split(',') if t.strip()]
+
+def apply_axes_params(axes, params, top=True, bottom=True, sharex=True):
+    """
+    Apply global plot params to one panel. The title only goes on the top row, and with a shared x axis
+    the x label only on the bottom row.
+    """
+    axes.relim()
+    axes.autoscale_view()
+    # Set title
+    axes.set_title(params.get('title', '') if top else '')
+    # Set x/y labels
+    axes.set_xlabel(params.get('xlabel', '') if bottom or not sharex else '')
+    axes.set_ylabel(params.get('ylabel', ''))
+    # Set x/y limits
+    xlim = params.get('xlim', (None, None))
+    try:
+        left, right = _limits(xlim)
+        if left is not None and right is not None:
+            axes.set_xlim(float(left), float(right))
+        elif left is not None:
+            axes.set_xlim(left=float(left))
+        elif right is not None:
+            axes.set_xlim(right=float(right))
+        else:
+            axes.set_xlim(auto=True)
+    except Exception as e:
+        logger.error(f"Error setting xlim: {xlim}, {e}")
+    ylim = params.get('ylim', (None, None))
+    try:
+        bottom_lim, top_lim = _limits(ylim)
+        if bottom_lim is not None and top_lim is not None:
+            axes.set_ylim(float(bottom_lim), float(top_lim))
+        elif bottom_lim is not None:
+            axes.set_ylim(bottom=float(bottom_lim))
+        elif top_lim is not None:
+            axes.set_ylim(top=float(top_lim))
+        else:
+            axes.set_ylim(auto=True)
+    except Exception as e:
+        logger.error(f"Error setting ylim: {ylim}, {e}")
+    # Set grid
+    axes.grid(params.get('grid', False))
+    # Set x/y ticks
+    xticks = params.get('xticks', '')
+    if xticks:
+        try:
+            axes.set_xticks(_ticks(xticks))
+        except Exception:
+            pass
+    yticks = params.get('yticks', '')
+    if yticks:
+        try:
+            axes.set_yticks(_ticks(yticks))
+        except Exception:
+            pass
+    # Set legend
+    show_legend = params.get('legend', True)
+    if show_legend:
+        handles, labels = axes.get_legend_handles_labels()
+        if handles and labels:
+            axes.legend()
+    else:
+        legend = axes.get_legend()
+        if legend is not None:
+            legend.remove()
+
+def draw_snapshot(figure, snapshot):
+    """Draw the lines, global params and panel views of a snapshot on an empty figure. Returns the panels."""
+    layout = snapshot.get('layout', {})
+    nrows, ncols, sharex = layout.get('rows', 1), layout.get('cols', 1), layout.get('sharex', True)
+    panels = list(figure.subplots(nrows, ncols, sharex=sharex, squeeze=False).flat)
+    for line_info in snapshot['lines']:
+        params = line_info['params']
+        try:
+            panel = min(max(int(params.get('panel', 0) or 0), 0), len(panels) - 1)
+        except (TypeError, ValueError):
+            panel = 0
+        line, = panels[panel].plot(line_info['x'], line_info['y'], label=line_info['label'], **line_kwargs(params))
+        set_line_style_and_color(line, params)
+    global_params = snapshot.get('global_params', {})
+    for i, axes in enumerate(panels):
+        row = i // ncols
+        apply_axes_params(axes, global_params, top=(row == 0), bottom=(row == nrows - 1), sharex=sharex)
+    # Limits the panels were zoomed/panned to when the snapshot was taken override the global ones
+    for axes, view in zip(panels, snapshot.get('views') or []):
+        axes.set_xlim(view['xlim'])
+        axes.set_ylim(view['ylim'])
+    figure.tight_layout()
+    return panels
+
+def render_figure(snapshot, path, fmt=None, dpi=None):
+    """Render a snapshot to path (pdf/png/svg, from the extension unless fmt is given). Returns path."""
+    apply_rc_params(snapshot.get('rc'))
+    figure = Figure(figsize=snapshot.get('size', (11, 8.5)))
+    draw_snapshot(figure, snapshot)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    figure.savefig(path, format=fmt or export_format(path), dpi=dpi or snapshot.get('dpi') or EXPORT_DPI)
+    return path
+
+def snapshot_from_config(config, load_line, size=(11, 8.5), dpi=None):
+    """
+    Snapshot of a saved plot config (MainWindow.export_plot_config).
+    load_line(file, params) -> (x, y) prepares the arrays of one line; lines that fail are logged and skipped.
+    """
+    lines = []
+    for line_info in config.get('plotted_lines', []):
+        file_path, params = line_info['file'], line_info['params']
+        try:
+            x, y = load_line(file_path, params)
+        except Exception as e:
+            logger.error(f"Could not prepare plot data for file: {file_path}, params: {params}, error: {e}")
+            continue
+        lines.append({'x': x, 'y': y, 'label': line_label(file_path, params), 'params': params})
+    return {
+        'layout': config.get('layout', {}),
+        'global_params': config.get('global_params', {}),
+        'lines': lines,
+        'size': size,
+        'dpi': dpi or EXPORT_DPI,
+    }
+
+def _line_key(file_path, params):
+    return file_path, json.dumps(params, sort_keys=True, default=str)
+
+def _config_files(configs):
+    """{file: {line key: params}} of every distinct line referenced by the configs."""
+    files = {}
+    for config in configs:
+        for line_info in config.get('plotted_lines', []):
+            key = _line_key(line_info['file'], line_info['params'])
+            files.setdefault(line_info['file'], {}).setdefault(key, line_info['params'])
+    return files
+
+def _load_file(file_path, lines):
+    """Worker: prepare the lines {key: params} of one file, reading it once. Returns {key: (x, y) or Exception}."""
+    from DataManagement.plot_data import load_file_lines
+    try:
+        return dict(zip(lines, load_file_lines(file_path, list(lines.values()))))
+    except Exception as e:
+        return {key: e for key in lines}
+
+def _arrays_loader(arrays):
+    def load_line(file_path, params):
+        result = arrays[_line_key(file_path, params)]
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return load_line
+
+def render_config(config_path, path, fmt=None, dpi=None, rc=None):
+    """Render a saved plot config file to path, reading its data files. Returns path."""
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    arrays = {}
+    for file_path, lines in _config_files([config]).items():
+        arrays.update(_load_file(file_path, lines))
+    snapshot = snapshot_from_config(config, _arrays_loader(arrays), dpi=dpi)
+    snapshot['rc'] = rc
+    return render_figure(snapshot, path, fmt)
+
+def render_configs(config_paths, output_dir=None, fmt='pdf', max_workers=MAX_WORKERS, dpi=None, rc=None, progress=None):
+    """
+    Render many saved plot configs headless. Every data file referenced by any config is read once, in parallel
+    worker processes, preparing all of its distinct lines together; then the figures are rendered in parallel too.
+    output_dir: where to write <config stem>.<fmt> (default: next to each config)
+    progress: optional callable(done, total) over files read plus figures rendered
+    Returns: dict config_path -> output path, or the Exception raised for that config
+    """
+    results, configs = {}, {}
+    for config_path in config_paths:
+        try:
+            with open(config_path, 'r') as f:
+                configs[config_path] = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error("Could not read plot config %s: %s", config_path, e)
+            results[config_path] = e
+    files = _config_files(configs.values())
+    total, done = len(files) + len(configs), 0
+    notify = progress or (lambda done, total: None)
+    arrays = {}
+    load_line = _arrays_loader(arrays)
+    def output_path(config_path):
+        stem = os.path.splitext(os.path.basename(config_path))[0]
+        return os.path.join(output_dir or os.path.dirname(config_path), f"{stem}.{fmt}")
+    workers = min(max(len(files), len(configs), 1), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        for file_path, lines in files.items():
+            arrays.update(_load_file(file_path, lines))
+            done += 1
+            notify(done, total)
+        for config_path, config in configs.items():
+            snapshot = snapshot_from_config(config, load_line, dpi=dpi)
+            snapshot['rc'] = rc
+            try:
+                results[config_path] = render_figure(snapshot, output_path(config_path), fmt)
+            except Exception as e:
+                results[config_path] = e
+            done += 1
+            notify(done, total)
+        return results
+    # spawn: the same start method as the GUI uses, so rendering never inherits a display connection
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = {pool.submit(_load_file, file_path, lines): lines for file_path, lines in files.items()}
+        for future in as_completed(futures):
+            try:
+                arrays.update(future.result())
+            except Exception as e:
+                arrays.update({key: e for key in futures[future]})
+            done += 1
+            notify(done, total)
+        futures = {}
+        for config_path, config in configs.items():
+            snapshot = snapshot_from_config(config, load_line, dpi=dpi)
+            snapshot['rc'] = rc
+            futures[pool.submit(render_figure, snapshot, output_path(config_path), fmt)] = config_path
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                results[futures[future]] = e
+            done += 1
+            notify(done, total)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render saved plot configurations (File > Export Plot Configuration) without the GUI.")
+    parser.add_argument('configs', nargs='+', help="Plot configuration JSON files")
+    parser.add_argument('-o', '--output-dir', help="Directory for the figures (default: next to each configuration)")
+    parser.add_argument('--format', default='pdf', choices=sorted(set(EXPORT_FORMATS.values())), help="Output format (default: pdf)")
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help="Worker processes (default: one per CPU core)")
+    parser.add_argument('--dpi', type=int, default=EXPORT_DPI, help=f"Resolution of raster formats (default: {EXPORT_DPI})")
+    parser.add_argument('--no-tex', action='store_true', help="Render text with mathtext instead of LaTeX")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    results = render_configs(args.configs, args.output_dir, args.format, args.workers, args.dpi,
+                             rc={'text.usetex': False} if args.no_tex else None,
+                             progress=lambda done, total: print(f"\r{done}/{total}", end='', file=sys.stderr, flush=True))
+    print(file=sys.stderr)
+    failed = 0
+    for config_path, result in results.items():
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"{config_path}: {result}", file=sys.stderr)
+        else:
+            print(result)
+    print(f"Rendered {len(results) - failed}/{len(results)} figures in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    return 1 if failed else 0
+
+# Export job states
+RUNNING, DONE, FAILED, CANCELLED = 'running', 'done', 'failed', 'cancelled'
+
+class ExportJobs:
+    """
+    Figures rendered in spawned worker processes (at most max_workers at once), so the caller never waits for
+    LaTeX or a 300 dpi raster. Jobs are dicts {id, path, source, state, error, started, elapsed}; poll() returns
+    the jobs that finished since the last call.
+    """
+
+    def __init__(self, max_workers=EXPORT_WORKERS):
+        self.max_workers = max_workers or 1
+        self._pool = None
+        self._futures = {}
+        self.jobs = {}
+        self._next_id = 0
+
+    def _submit(self, path, source, fn, *args):
+        if self._pool is None:
+            # spawn: never fork the GUI process
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+        self._next_id += 1
+        job = {'id': self._next_id, 'path': path, 'source': source, 'state': RUNNING, 'error': None,
+               'started': time.perf_counter(), 'elapsed': None}
+        self.jobs[job['id']] = job
+        self._futures[job['id']] = self._pool.submit(fn, *args)
+        logger.info("Export %d queued: %s", job['id'], path)
+        return job['id']
+
+    def submit(self, snapshot, path, fmt=None):
+        """Render a snapshot to path. Returns the job id."""
+        return self._submit(path, 'snapshot', render_figure, snapshot, path, fmt)
+
+    def submit_config(self, config_path, path, fmt=None, rc=None):
+        """Render a saved plot config to path; its data files are read in the worker. Returns the job id."""
+        return self._submit(path, config_path, render_config, config_path, path, fmt, None, rc)
+
+    def poll(self):
+        finished = []
+        for job_id, future in list(self._futures.items()):
+            if not future.done():
+                continue
+            del self._futures[job_id]
+            job = self.jobs[job_id]
+            job['elapsed'] = time.perf_counter() - job['started']
+            if future.cancelled():
+                job['state'] = CANCELLED
+            else:
+                error = future.exception()
+                job['state'], job['error'] = (FAILED, error) if error is not None else (DONE, None)
+            if job['state'] == DONE:
+                logger.info("Export %d done in %.1f s: %s", job_id, job['elapsed'], job['path'])
+            else:
+                logger.error("Export %d %s: %s %s", job_id, job['state'], job['path'], job['error'] or '')
+            finished.append(job)
+        return finished
+
+    def pending(self):
+        return len(self._futures)
+
+    def cancel(self):
+        """Cancel the jobs that have not started (running renders finish)."""
+        for future in self._futures.values():
+            future.cancel()
+
+    def shutdown(self):
+        self.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+if __name__ == '__main__':
+    sys.exit(main())
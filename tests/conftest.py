@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+# Modules import each other from the repository root (from DataManagement..., from localvars ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def write_raw(tmp_path):
+    """Write a small raw data file: write_raw(columns, rows) with rows as lists of strings. Returns its path."""
+    def write(columns, rows, name='data.dat'):
+        path = tmp_path / name
+        lines = ["#C" + " ".join(f"'{c}'" for c in columns),
+                 "#I" + " ".join(f"'inst{i}'" for i in range(len(columns))),
+                 "#P" + " ".join("'V'" for _ in columns)]
+        lines += ["  ".join(str(value) for value in row) for row in rows]
+        path.write_text("\n".join(lines) + "\n")
+        return str(path)
+    return write
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from DataManagement.data_reader import read_data_file, read_data_header
+from DataManagement.expressions import required_columns
+from DataManagement.plot_data import load_plot_line
+
+COLUMNS = ['T', 'V', 'I', 'R']
+ROWS = [[t, 2 * t + 1, t * t, 0.5 - t] for t in range(20)]
+
+@pytest.fixture
+def raw_file(write_raw):
+    return write_raw(COLUMNS, ROWS)
+
+@pytest.mark.parametrize('usecols', [['T'], ['V', 'R'], ['R', 'T'], COLUMNS])
+def test_projected_read_matches_full_read(raw_file, usecols):
+    full, full_comments, _, _ = read_data_file(raw_file)
+    df, comments, _, filetype = read_data_file(raw_file, usecols=usecols)
+    assert filetype == 'raw'
+    assert sorted(df.columns) == sorted(usecols)
+    assert comments == full_comments
+    for name in usecols:
+        np.testing.assert_array_equal(df[name].to_numpy(), full[name].to_numpy())
+
+def test_header_lists_columns_without_parsing(raw_file):
+    columns, _, _, filetype = read_data_header(raw_file)
+    assert columns == COLUMNS
+    assert filetype == 'raw'
+
+@pytest.mark.parametrize('params, expected', [
+    ({'x': 'T', 'y': 'V'}, ['T', 'V']),
+    ({'x': 'T', 'y': 'V', 'calc_y': 'y / R'}, ['R', 'T', 'V']),
+    ({'x': 'T', 'y': 'V', 'mask_exprs': ['I > 4']}, ['I', 'T', 'V']),
+    ({'x': 'T', 'y': 'V', 'calc_x': 'log(x)'}, ['T', 'V']),
+])
+def test_required_columns(params, expected):
+    assert required_columns(params) == expected
+
+def test_projected_plot_line_matches_full_read(raw_file):
+    params = {'x': 'T', 'y': 'V', 'calc_y': 'y / (R - 1)', 'mask_exprs': ['I > 4']}
+    x, y, _, _ = load_plot_line(raw_file, params)
+    full, _, _, _ = read_data_file(raw_file)
+    keep = full['I'].to_numpy() > 4
+    np.testing.assert_allclose(x, full['T'].to_numpy()[keep])
+    np.testing.assert_allclose(y, (full['V'] / (full['R'] - 1)).to_numpy()[keep], rtol=1e-6)
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from DataManagement.column_index import ColumnIndex
+from DataManagement.data_cache import DataCache
+from DataManagement.plot_data import prepare_plot_data
+
+RANGE = {'x': 'T', 'y': 'V', 'minx': 0.5, 'maxx': 1.0}
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({'T': np.linspace(0, 1, 11), 'V': np.arange(11.0)})
+
+@pytest.mark.parametrize('extra', [
+    {},
+    {'calc_y': 'y * 2 + 1'},
+    {'calc_y': 'y - y.mean()'},
+    {'calc_y': 'y / y.max()'},
+    {'mask_exprs': ['y > y.mean()']},
+    {'miny': 6.0, 'mask_exprs': ['x < 0.95']},
+])
+def test_range_selection_matches_unindexed(frame, extra):
+    params = dict(RANGE, **extra)
+    x, y = prepare_plot_data(frame, params)
+    x_index, y_index = prepare_plot_data(frame, params, index=ColumnIndex())
+    np.testing.assert_array_equal(np.asarray(x_index), np.asarray(x))
+    np.testing.assert_array_equal(np.asarray(y_index), np.asarray(y))
+
+def test_non_elementwise_calc_sees_whole_column(frame):
+    _, y = prepare_plot_data(frame, dict(RANGE, calc_y='y - y.mean()'), index=ColumnIndex())
+    np.testing.assert_array_equal(np.asarray(y), np.arange(6.0))
+
+def test_data_cache_range_matches_unindexed(write_raw):
+    path = write_raw(['T', 'V'], [[t / 10, t] for t in range(11)])
+    params = dict(RANGE, calc_y='y - y.mean()')
+    x, y = DataCache().plot_arrays(path, params)
+    np.testing.assert_allclose(x, np.linspace(0, 1, 11)[5:])
+    np.testing.assert_array_equal(y, np.arange(6.0))
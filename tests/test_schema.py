@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from DataManagement.data_cache import DataCache
+from DataManagement.data_reader import read_data_file
+from DataManagement.schema import apply_schema
+
+ROWS = [[0, 10, 100], [1, 'abc', 101], [2, 12, 102], [3, 13, 103]]
+
+def test_malformed_rows_are_rejected_and_reported(write_raw):
+    path = write_raw(['T', 'V', 'I'], ROWS)
+    df, _, meta, _ = read_data_file(path)
+    np.testing.assert_array_equal(df['T'], [0, 2, 3])
+    np.testing.assert_array_equal(df['V'], [10, 12, 13])
+    assert df['V'].dtype.kind in 'if'
+    report = df.attrs['rejected']
+    assert report['rows'] == 1
+    assert report['columns'] == {'V': 1}
+    assert report['examples'] == [1]
+    assert meta['rejected'] == report
+
+def test_rows_with_wrong_field_count_are_reported(write_raw):
+    path = write_raw(['T', 'V'], [[0, 10], [1, 11, 99], [2, 12]])
+    df, _, _, _ = read_data_file(path)
+    np.testing.assert_array_equal(df['T'], [0, 2])
+    assert df.attrs['rejected']['bad_lines'] == 1
+
+def test_clean_file_has_no_report(write_raw):
+    df, _, _, _ = read_data_file(write_raw(['T', 'V'], [[0, 10], [1, 11]]))
+    assert 'rejected' not in df.attrs
+
+def test_text_column_is_kept():
+    df = pd.DataFrame({'name': ['a', 'b', 'c'], 'V': ['1', '2', 'x']})
+    df, report = apply_schema(df, {'name': None, 'V': None})
+    assert list(df['name']) == ['a', 'b']
+    assert report['columns'] == {'V': 1}
+
+def test_cache_merges_partial_reads_row_aligned(write_raw):
+    path = write_raw(['T', 'V', 'I'], ROWS)
+    cache = DataCache()
+    df, _, _, _ = cache.get_frame(path, ['T', 'I'])
+    np.testing.assert_array_equal(df['T'], [0, 1, 2, 3])
+    df, _, _, _ = cache.get_frame(path, ['T', 'V'])
+    df, _, _, _ = cache.get_frame(path, ['T', 'V', 'I'])
+    full, _, _, _ = read_data_file(path)
+    for name in ['T', 'V', 'I']:
+        np.testing.assert_array_equal(df[name], full[name])
+    assert cache.rejected_rows(path)['rows'] == 1
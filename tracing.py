@@ -0,0 +1,161 @@
+"""
+Lightweight tracing and metrics for the hot paths (read, parse, prepare, draw, process, save).
+
+    from tracing import span, metrics
+
+    with span('read', file=filepath):
+        ...
+
+    @span('prepare')
+    def prepare_plot_data(...):
+        ...
+
+Every span feeds the process-wide `metrics` registry (count, p50/p95 latency). When tracing is
+enabled (TRACE_FILE in localvars, or enable_trace()) spans are also recorded as Chrome trace
+events that can be written with dump_trace() and opened in chrome://tracing or Perfetto.
+"""
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from localvars import TRACE_FILE, TRACE_MAX_SAMPLES, TRACE_MAX_EVENTS
+
+class MetricsRegistry:
+    """Process-wide counters, latency samples and byte totals, keyed by span name."""
+
+    def __init__(self, max_samples=TRACE_MAX_SAMPLES):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = defaultdict(int)
+            self._totals = defaultdict(float)
+            self._samples = defaultdict(lambda: deque(maxlen=self.max_samples))
+            self._bytes = defaultdict(int)
+
+    def record(self, name, duration):
+        with self._lock:
+            self._counts[name] += 1
+            self._totals[name] += duration
+            self._samples[name].append(duration)
+
+    def add_bytes(self, name, nbytes):
+        with self._lock:
+            self._bytes[name] += int(nbytes)
+
+    @staticmethod
+    def _percentile(sorted_samples, q):
+        if not sorted_samples:
+            return None
+        idx = min(len(sorted_samples) - 1, int(round(q * (len(sorted_samples) - 1))))
+        return sorted_samples[idx]
+
+    def summary(self):
+        """Returns {name: {'count', 'total_s', 'p50_s', 'p95_s', 'bytes'}}."""
+        with self._lock:
+            names = set(self._counts) | set(self._bytes)
+            out = {}
+            for name in sorted(names):
+                samples = sorted(self._samples[name]) if name in self._samples else []
+                out[name] = {
+                    'count': self._counts.get(name, 0),
+                    'total_s': self._totals.get(name, 0.0),
+                    'p50_s': self._percentile(samples, 0.50),
+                    'p95_s': self._percentile(samples, 0.95),
+                    'bytes': self._bytes.get(name, 0),
+                }
+            return out
+
+metrics = MetricsRegistry()
+
+_trace_lock = threading.Lock()
+_trace_events = deque(maxlen=TRACE_MAX_EVENTS) # Most recent events only, so a long session stays bounded
+_trace_enabled = bool(TRACE_FILE)
+_t0 = time.perf_counter()
+
+def enable_trace(enabled=True):
+    """Start (or stop) recording Chrome trace events."""
+    global _trace_enabled
+    _trace_enabled = enabled
+
+def trace_enabled():
+    return _trace_enabled
+
+class span:
+    """
+    Time a block of code, usable as a context manager or a decorator.
+    Extra keyword arguments are attached to the trace event (they are only kept when tracing is enabled).
+    """
+    __slots__ = ('name', 'args', '_start')
+
+    def __init__(self, name, **args):
+        self.name = name
+        self.args = args
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        metrics.record(self.name, end - self._start)
+        if _trace_enabled:
+            event = {
+                'name': self.name,
+                'ph': 'X',
+                'ts': (self._start - _t0) * 1e6,
+                'dur': (end - self._start) * 1e6,
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+            }
+            if self.args:
+                event['args'] = {k: str(v) for k, v in self.args.items()}
+            if exc_type is not None:
+                event.setdefault('args', {})['error'] = repr(exc)
+            with _trace_lock:
+                _trace_events.append(event)
+        return False
+
+    def __call__(self, func):
+        name, args = self.name, self.args
+        @functools.wraps(func)
+        def wrapper(*a, **kw):
+            with span(name, **args):
+                return func(*a, **kw)
+        return wrapper
+
+def dump_trace(path):
+    """Write recorded trace events and the metrics summary as Chrome trace JSON."""
+    with _trace_lock:
+        events = list(_trace_events)
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'metrics': metrics.summary()}, f)
+    return path
+
+def clear_trace():
+    with _trace_lock:
+        _trace_events.clear()
+
+class lazy:
+    """
+    Defer building an expensive log argument until the record is actually emitted:
+        logger.debug("Params: %s", lazy(lambda: json.dumps(params)))
+    """
+    __slots__ = ('func',)
+
+    def __init__(self, func):
+        self.func = func
+
+    def __str__(self):
+        return str(self.func())
+
+    __repr__ = __str__
+
+if TRACE_FILE:
+    atexit.register(dump_trace, TRACE_FILE)